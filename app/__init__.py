@@ -52,8 +52,9 @@ def create_app(config_name='default'):
         """Agrega headers para prevenir caché del navegador en páginas protegidas"""
         from flask_login import current_user
 
-        # Solo aplicar a páginas protegidas (cuando el usuario está autenticado)
-        if current_user.is_authenticated:
+        # Solo aplicar a páginas protegidas (cuando el usuario está autenticado).
+        # Los archivos enviados con enviar_archivo_privado ya traen su caché privada
+        if current_user.is_authenticated and not response.cache_control.private:
             response.headers['Cache-Control'] = 'no-store, no-cache, must-revalidate, post-check=0, pre-check=0, max-age=0'
             response.headers['Pragma'] = 'no-cache'
             response.headers['Expires'] = '-1'
@@ -65,11 +66,13 @@ def create_app(config_name='default'):
     from app.blueprints.aprendiz import aprendiz_bp
     from app.blueprints.docente import docente_bp
     from app.blueprints.admin import admin_bp
+    from app.blueprints.trabajos import trabajos_bp
 
     app.register_blueprint(public_bp)
     app.register_blueprint(aprendiz_bp)
     app.register_blueprint(docente_bp)
     app.register_blueprint(admin_bp)
+    app.register_blueprint(trabajos_bp)
 
     # Context processors para templates
     @app.context_processor
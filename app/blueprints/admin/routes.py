@@ -1,16 +1,23 @@
-from flask import render_template, redirect, url_for, flash, request, send_file, jsonify
+from flask import render_template, redirect, url_for, flash, request, send_file, jsonify, current_app, Response, stream_with_context
 from flask_login import login_required, current_user
 from app.models import db, Usuario, Aprendiz, Colegio, Grupo, Programa, Matricula, Documento, Novedad, MensajeContacto, DocumentoSIMAT
 from app.services.auth_service import AuthService
 from app.services.documento_service import DocumentoService
+from app.services.estadisticas_service import EstadisticasService
+from app.services.manifiesto_service import ManifiestoService
 from app.services.matricula_service import MatriculaService
+from app.services.paquete_service import PaqueteService
 from app.services.reporte_service import ReporteService
 from app.services.sofia_service import SofiaService
+from app.services.trabajo_service import TrabajoService
 from app.utils.decorators import admin_required
 from app.utils.crypto import CryptoService
+from app.utils.paginacion import paginar_desde_request, orden_recientes
+from app.utils.helpers import respuesta_trabajo_encolado, resolver_ruta_documento, etag_documento, enviar_archivo_privado
+from app.utils.zip_stream import generar_zip_stream
+from sqlalchemy.orm import selectinload, with_expression
 from . import admin_bp
 import os
-import shutil
 from datetime import datetime
 
 @admin_bp.route('/dashboard')
@@ -18,27 +25,8 @@ from datetime import datetime
 @admin_required
 def dashboard():
     """Dashboard del administrador"""
-    # Estadísticas generales
-    stats = {
-        'total_usuarios': Usuario.query.count(),
-        'total_aprendices': Aprendiz.query.count(),
-        'total_colegios': Colegio.query.filter_by(activo=True).count(),
-        'total_programas': Programa.query.filter_by(activo=True).count(),
-        'matriculas_pendientes': Matricula.query.filter(
-            Matricula.estado.in_(['ENVIADO', 'PENDIENTE'])
-        ).count(),
-        'simat_pendientes': DocumentoSIMAT.query.filter_by(estado='PENDIENTE').count(),
-        'programas': []
-    }
-
-    # Distribución por programas
-    programas = Programa.query.filter_by(activo=True).all()
-    for programa in programas:
-        aprendices_count = Aprendiz.query.filter_by(programa_id=programa.id).count()
-        stats['programas'].append({
-            'nombre': programa.nombre,
-            'aprendices_count': aprendices_count
-        })
+    # Estadísticas generales y distribución por programas (consultas agregadas)
+    stats = EstadisticasService.get_estadisticas_admin()
 
     # Matrículas recientes (últimas 10)
     matriculas_recientes = Matricula.query.order_by(
@@ -66,14 +54,25 @@ def usuarios():
     rol_filtro = request.args.get('rol', 'todos')
 
     query = Usuario.query
+    filtros = []
 
     if rol_filtro != 'todos':
-        query = query.filter_by(rol=rol_filtro)
+        filtros.append(Usuario.rol == rol_filtro)
+        query = query.filter(*filtros)
 
-    usuarios = query.order_by(Usuario.created_at.desc()).all()
+    pagina = paginar_desde_request(query, orden_recientes(Usuario))
+
+    # Conteos por rol del listado completo (una sola consulta)
+    stats = EstadisticasService.get_conteos(Usuario, {
+        'aprendices': Usuario.rol == 'APRENDIZ',
+        'docentes': Usuario.rol == 'DOCENTE',
+        'administradores': Usuario.rol == 'ADMINISTRADOR'
+    }, *filtros)
 
     return render_template('admin/usuarios/list.html',
-                         usuarios=usuarios,
+                         usuarios=pagina,
+                         pagina=pagina,
+                         stats=stats,
                          rol_filtro=rol_filtro)
 
 @admin_bp.route('/usuarios/crear', methods=['GET', 'POST'])
@@ -410,9 +409,51 @@ def eliminar_programa(programa_id):
 @admin_required
 def grupos():
     """Listado de grupos"""
-    grupos = Grupo.query.order_by(Grupo.colegio_id, Grupo.nombre).all()
+    nombre_filtro = request.args.get('nombre', '').strip()
+    colegio_filtro = request.args.get('colegio', type=int)
+    jornada_filtro = request.args.get('jornada', '')
+    estado_filtro = request.args.get('estado', '')
+
+    # Cantidad de aprendices por grupo como subconsulta, sin cargar las filas de Aprendiz
+    total_aprendices = db.select(db.func.count(Aprendiz.id)).where(
+        Aprendiz.grupo_id == Grupo.id
+    ).scalar_subquery()
+
+    query = Grupo.query.options(
+        selectinload(Grupo.colegio),
+        selectinload(Grupo.programa),
+        with_expression(Grupo.total_aprendices, total_aprendices)
+    )
+
+    if nombre_filtro:
+        query = query.filter(Grupo.nombre.ilike(f'%{nombre_filtro}%'))
+
+    if colegio_filtro:
+        query = query.filter(Grupo.colegio_id == colegio_filtro)
+
+    if jornada_filtro:
+        query = query.filter(Grupo.jornada == jornada_filtro)
+
+    if estado_filtro in ('true', 'false'):
+        query = query.filter(Grupo.activo == (estado_filtro == 'true'))
+
+    pagina = paginar_desde_request(query, [
+        (Grupo.colegio_id, 'asc'), (Grupo.nombre, 'asc'), (Grupo.id, 'asc')
+    ])
     colegios = Colegio.query.filter_by(activo=True).all()
-    return render_template('admin/grupos/list.html', grupos=grupos, colegios=colegios)
+
+    stats = EstadisticasService.get_conteos(Grupo, {'activos': Grupo.activo == True})
+    stats['total_aprendices'] = Aprendiz.query.filter(Aprendiz.grupo_id.isnot(None)).count()
+
+    return render_template('admin/grupos/list.html',
+                         grupos=pagina,
+                         pagina=pagina,
+                         stats=stats,
+                         colegios=colegios,
+                         nombre_filtro=nombre_filtro,
+                         colegio_filtro=colegio_filtro,
+                         jornada_filtro=jornada_filtro,
+                         estado_filtro=estado_filtro)
 
 @admin_bp.route('/grupos/crear', methods=['GET', 'POST'])
 @login_required
@@ -508,40 +549,67 @@ def eliminar_grupo(grupo_id):
 @admin_required
 def matriculas():
     """Listado de matrículas"""
-    estado_filtro = request.args.get('estado', 'todos')
-    colegio_filtro = request.args.get('colegio', 'todos')
-
-    query = Matricula.query.join(Aprendiz)
+    estado_filtro = request.args.get('estado') or 'todos'
+    colegio_filtro = request.args.get('colegio', type=int)
+    nombre_filtro = request.args.get('nombre', '').strip()
+    programa_filtro = request.args.get('programa', type=int)
+    grupo_filtro = request.args.get('grupo', type=int)
+
+    query = Matricula.query.join(Aprendiz).join(Usuario, Aprendiz.usuario_id == Usuario.id).options(
+        selectinload(Matricula.aprendiz).selectinload(Aprendiz.usuario),
+        selectinload(Matricula.aprendiz).selectinload(Aprendiz.colegio),
+        selectinload(Matricula.aprendiz).selectinload(Aprendiz.grupo),
+        selectinload(Matricula.aprendiz).selectinload(Aprendiz.programa),
+        selectinload(Matricula.documentos)
+    )
 
     if estado_filtro != 'todos':
         query = query.filter(Matricula.estado == estado_filtro)
 
-    if colegio_filtro != 'todos':
-        query = query.filter(Aprendiz.colegio_id == int(colegio_filtro))
+    if colegio_filtro:
+        query = query.filter(Aprendiz.colegio_id == colegio_filtro)
+
+    if nombre_filtro:
+        query = query.filter(
+            db.or_(
+                Usuario.nombres.ilike(f'%{nombre_filtro}%'),
+                Usuario.apellidos.ilike(f'%{nombre_filtro}%'),
+                Usuario.documento.ilike(f'%{nombre_filtro}%')
+            )
+        )
+
+    if programa_filtro:
+        query = query.filter(Aprendiz.programa_id == programa_filtro)
 
-    matriculas = query.order_by(Matricula.created_at.desc()).all()
+    if grupo_filtro:
+        query = query.filter(Aprendiz.grupo_id == grupo_filtro)
+
+    pagina = paginar_desde_request(query, orden_recientes(Matricula))
     colegios = Colegio.query.filter_by(activo=True).all()
     programas = Programa.query.filter_by(activo=True).all()
     grupos = Grupo.query.filter_by(activo=True).order_by(Grupo.nombre).all()
 
-    # Calcular estadísticas
-    stats = {
-        'total': Matricula.query.count(),
-        'borradores': Matricula.query.filter_by(estado='BORRADOR').count(),
-        'enviadas': Matricula.query.filter_by(estado='ENVIADO').count(),
-        'pendientes': Matricula.query.filter_by(estado='PENDIENTE').count(),
-        'completas': Matricula.query.filter_by(estado='COMPLETO').count(),
-        'prematriculas': Matricula.query.filter_by(estado='PREMATRICULA').count()
-    }
+    # Calcular estadísticas (una sola consulta)
+    stats = EstadisticasService.get_conteos(Matricula, {
+        'borradores': Matricula.estado == 'BORRADOR',
+        'enviadas': Matricula.estado == 'ENVIADO',
+        'pendientes': Matricula.estado == 'PENDIENTE',
+        'completas': Matricula.estado == 'COMPLETO',
+        'prematriculas': Matricula.estado == 'PREMATRICULA'
+    })
 
     return render_template('admin/matriculas/list.html',
-                         matriculas=matriculas,
+                         matriculas=pagina,
+                         pagina=pagina,
                          colegios=colegios,
                          programas=programas,
                          grupos=grupos,
                          stats=stats,
                          estado_filtro=estado_filtro,
-                         colegio_filtro=colegio_filtro)
+                         colegio_filtro=colegio_filtro,
+                         nombre_filtro=nombre_filtro,
+                         programa_filtro=programa_filtro,
+                         grupo_filtro=grupo_filtro)
 
 @admin_bp.route('/matriculas/<int:matricula_id>')
 @login_required
@@ -618,56 +686,47 @@ def generar_reporte_excel():
                 filtro_tipo = 'programa'
                 filtro_id = int(request.form.get('programa_id'))
 
-            # Generar formato SOFIA
-            success, message, file_path = SofiaService.generar_formato_sofia(
+            # Generar formato SOFIA en segundo plano
+            trabajo = TrabajoService.encolar(
+                'sofia', current_user.id,
                 filtro_tipo=filtro_tipo,
                 filtro_id=filtro_id,
                 docente_colegio_id=None  # Admin no tiene restricciones
             )
-
-            if success:
-                return send_file(
-                    file_path,
-                    mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-                    as_attachment=True,
-                    download_name=os.path.basename(file_path)
-                )
-            else:
-                flash(message, 'danger')
-                return redirect(url_for('admin.reportes'))
+            return respuesta_trabajo_encolado(trabajo)
 
         except Exception as e:
             flash(f'Error al generar formato SOFIA: {str(e)}', 'danger')
             return redirect(url_for('admin.reportes'))
 
     # Para otros tipos de reportes, usar el servicio de reportes normal
-    filtros = {}
-
-    if request.form.get('colegio_id'):
-        filtros['colegio_id'] = int(request.form.get('colegio_id'))
-
-    if request.form.get('programa_id'):
-        filtros['programa_id'] = int(request.form.get('programa_id'))
-
-    if request.form.get('grupo_id'):
-        filtros['grupo_id'] = int(request.form.get('grupo_id'))
-
-    query = Matricula.query.join(Aprendiz)
-
-    if 'colegio_id' in filtros:
-        query = query.filter(Aprendiz.colegio_id == filtros['colegio_id'])
+    filtros = {
+        'colegio_id': request.form.get('colegio_id') or None,
+        'programa_id': request.form.get('programa_id') or None,
+        'grupo_id': request.form.get('grupo_id') or None
+    }
 
-    if 'programa_id' in filtros:
-        query = query.filter(Aprendiz.programa_id == filtros['programa_id'])
+    formato = request.values.get('formato', 'xlsx').lower()
 
-    if 'grupo_id' in filtros:
-        query = query.filter(Aprendiz.grupo_id == filtros['grupo_id'])
+    try:
+        # Reportes grandes: generar en segundo plano y descargar después
+        if request.form.get('segundo_plano'):
+            trabajo = TrabajoService.encolar(
+                'reporte_matriculas', current_user.id,
+                filtros=filtros, formato=formato, nombre='reporte_completo'
+            )
+            return respuesta_trabajo_encolado(trabajo)
 
-    matriculas = query.all()
+        query = ReporteService.consulta_matriculas(**filtros)
+        contenido, mimetype, extension = ReporteService.exportar_matriculas(query, formato)
+        if not isinstance(contenido, bytes):
+            contenido = stream_with_context(contenido)
 
-    try:
-        excel_path = ReporteService.generar_excel_matriculas(matriculas)
-        return send_file(excel_path, as_attachment=True, download_name='reporte_completo.xlsx')
+        return Response(
+            contenido,
+            mimetype=mimetype,
+            headers={'Content-Disposition': f'attachment; filename=reporte_completo.{extension}'}
+        )
 
     except Exception as e:
         flash(f'Error al generar reporte: {str(e)}', 'danger')
@@ -677,42 +736,17 @@ def generar_reporte_excel():
 @login_required
 @admin_required
 def descargar_documentos_grupo(grupo_id):
-    """Descargar todos los documentos de un grupo"""
+    """Descargar todos los documentos de un grupo (ZIP en streaming, una carpeta por aprendiz)"""
     grupo = Grupo.query.get_or_404(grupo_id)
 
     try:
-        # Crear carpeta temporal
-        temp_folder = f'reports/documentos_{grupo.nombre}_{datetime.now().strftime("%Y%m%d_%H%M%S")}'
-        os.makedirs(temp_folder, exist_ok=True)
-
-        # Obtener todas las matrículas del grupo
-        matriculas = Matricula.query.join(Aprendiz).filter(Aprendiz.grupo_id == grupo_id).all()
+        # Con el tipo como prefijo dos archivos cargados con el mismo nombre no chocan en el ZIP
+        archivos = ManifiestoService.archivos_zip(ManifiestoService.documentos_grupos(grupo_id=grupo_id))
 
-        for matricula in matriculas:
-            aprendiz = matricula.aprendiz
-            usuario = aprendiz.usuario
-
-            # Crear carpeta por aprendiz
-            aprendiz_folder = os.path.join(
-                temp_folder,
-                f"{usuario.documento}_{usuario.nombres}_{usuario.apellidos}"
-            )
-            os.makedirs(aprendiz_folder, exist_ok=True)
-
-            # Copiar documentos
-            for doc in matricula.documentos:
-                if not doc.reemplazado_por and os.path.exists(doc.ruta_archivo):
-                    dest_path = os.path.join(aprendiz_folder, doc.nombre_archivo)
-                    shutil.copy2(doc.ruta_archivo, dest_path)
-
-        # Crear archivo ZIP
-        shutil.make_archive(temp_folder, 'zip', temp_folder)
-
-        # Enviar archivo
-        return send_file(
-            f'{temp_folder}.zip',
-            as_attachment=True,
-            download_name=f'documentos_{grupo.nombre}.zip'
+        return Response(
+            stream_with_context(generar_zip_stream(archivos)),
+            mimetype='application/zip',
+            headers={'Content-Disposition': f'attachment; filename="documentos_{grupo.nombre}.zip"'}
         )
 
     except Exception as e:
@@ -727,8 +761,40 @@ def descargar_documentos_grupo(grupo_id):
 @admin_required
 def novedades():
     """Listado de novedades"""
-    novedades = Novedad.query.order_by(Novedad.fecha_publicacion.desc()).all()
-    return render_template('admin/novedades/list.html', novedades=novedades)
+    buscar_filtro = request.args.get('buscar', '').strip()
+    destacado_filtro = request.args.get('destacado', '')
+    estado_filtro = request.args.get('estado', '')
+
+    query = Novedad.query
+    if buscar_filtro:
+        query = query.filter(
+            db.or_(
+                Novedad.titulo.ilike(f'%{buscar_filtro}%'),
+                Novedad.contenido.ilike(f'%{buscar_filtro}%')
+            )
+        )
+
+    if destacado_filtro in ('true', 'false'):
+        query = query.filter(Novedad.destacado == (destacado_filtro == 'true'))
+
+    if estado_filtro in ('true', 'false'):
+        query = query.filter(Novedad.activo == (estado_filtro == 'true'))
+
+    pagina = paginar_desde_request(query, [
+        (Novedad.fecha_publicacion, 'desc'), (Novedad.id, 'desc')
+    ])
+    stats = EstadisticasService.get_conteos(Novedad, {
+        'activas': Novedad.activo == True,
+        'inactivas': Novedad.activo == False
+    })
+
+    return render_template('admin/novedades/list.html',
+                         novedades=pagina,
+                         pagina=pagina,
+                         stats=stats,
+                         buscar_filtro=buscar_filtro,
+                         destacado_filtro=destacado_filtro,
+                         estado_filtro=estado_filtro)
 
 @admin_bp.route('/novedades/crear', methods=['GET', 'POST'])
 @login_required
@@ -839,8 +905,17 @@ def toggle_novedad_activo(novedad_id):
 @admin_required
 def mensajes():
     """Ver mensajes de contacto"""
-    mensajes = MensajeContacto.query.order_by(MensajeContacto.created_at.desc()).all()
-    return render_template('admin/mensajes.html', mensajes=mensajes)
+    pagina = paginar_desde_request(MensajeContacto.query, orden_recientes(MensajeContacto))
+    stats = EstadisticasService.get_conteos(MensajeContacto, {
+        'no_leidos': MensajeContacto.leido == False,
+        'leidos': MensajeContacto.leido == True,
+        'respondidos': MensajeContacto.respondido == True
+    })
+
+    return render_template('admin/mensajes.html',
+                         mensajes=pagina,
+                         pagina=pagina,
+                         stats=stats)
 
 @admin_bp.route('/mensajes/marcar-leido/<int:mensaje_id>', methods=['POST'])
 @login_required
@@ -922,11 +997,8 @@ def ver_documento(documento_id):
     """Ver un documento específico en el navegador"""
     documento = Documento.query.get_or_404(documento_id)
 
-    # Convertir ruta relativa a absoluta si es necesario
-    file_path = documento.ruta_archivo
-    if not os.path.isabs(file_path):
-        base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-        file_path = os.path.join(base_dir, file_path)
+    # Rutas relativas (almacén de documentos) a absolutas
+    file_path = resolver_ruta_documento(documento.ruta_archivo)
 
     if not os.path.exists(file_path):
         flash(f'Archivo no encontrado: {os.path.basename(file_path)}', 'danger')
@@ -942,7 +1014,7 @@ def ver_documento(documento_id):
     }
     mimetype = mimetype_map.get(extension, 'application/pdf')
 
-    return send_file(file_path, mimetype=mimetype)
+    return enviar_archivo_privado(file_path, etag=etag_documento(documento), mimetype=mimetype)
 
 @admin_bp.route('/descargar-documento/<int:documento_id>')
 @login_required
@@ -951,17 +1023,19 @@ def descargar_documento(documento_id):
     """Descargar un documento específico"""
     documento = Documento.query.get_or_404(documento_id)
 
-    # Convertir ruta relativa a absoluta si es necesario
-    file_path = documento.ruta_archivo
-    if not os.path.isabs(file_path):
-        base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-        file_path = os.path.join(base_dir, file_path)
+    # Rutas relativas (almacén de documentos) a absolutas
+    file_path = resolver_ruta_documento(documento.ruta_archivo)
 
     if not os.path.exists(file_path):
         flash(f'Archivo no encontrado: {os.path.basename(file_path)}', 'danger')
         return redirect(url_for('admin.matriculas'))
 
-    return send_file(file_path, as_attachment=True, download_name=documento.nombre_archivo)
+    return enviar_archivo_privado(
+        file_path,
+        etag=etag_documento(documento),
+        as_attachment=True,
+        download_name=documento.nombre_archivo
+    )
 
 @admin_bp.route('/documentos/<int:documento_id>/aprobar', methods=['POST'])
 @login_required
@@ -1132,8 +1206,11 @@ def descargar_documentos_aprendiz(aprendiz_id):
         return redirect(url_for('admin.ver_matricula', matricula_id=matricula.id))
 
     try:
-        # Generar PDF unificado con todos los formatos
-        pdf_path = generar_pdf_unificado_aprendiz(aprendiz, documentos)
+        # PDF unificado (se reutiliza si los documentos no cambiaron)
+        pdf_path, _ = PaqueteService.obtener_o_generar(
+            PaqueteService.clave_aprendiz(aprendiz, documentos),
+            lambda: generar_pdf_unificado_aprendiz(aprendiz, documentos)
+        )
 
         return send_file(
             pdf_path,
@@ -1179,62 +1256,26 @@ def programas_por_colegio(colegio_id):
 @login_required
 @admin_required
 def descargar_documentos_grupo_matriculas(grupo_id):
-    """Descargar todos los documentos de un grupo en ZIP desde matrículas"""
-    import zipfile
-    from io import BytesIO
-    from datetime import datetime
-
+    """Descargar todos los documentos de un grupo en ZIP desde matrículas (enviado en streaming)"""
     grupo = Grupo.query.get_or_404(grupo_id)
-    aprendices = Aprendiz.query.filter_by(grupo_id=grupo_id).all()
 
-    if not aprendices:
+    if not Aprendiz.query.filter_by(grupo_id=grupo_id).first():
         flash('No hay aprendices en este grupo', 'warning')
         return redirect(url_for('admin.matriculas'))
 
     try:
-        memory_file = BytesIO()
-
-        with zipfile.ZipFile(memory_file, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            documentos_agregados = 0
-
-            for aprendiz in aprendices:
-                matricula = Matricula.query.filter_by(aprendiz_id=aprendiz.id).first()
-                if not matricula:
-                    continue
-
-                documentos = Documento.query.filter_by(matricula_id=matricula.id).filter(
-                    Documento.reemplazado_por == None
-                ).all()
-
-                if documentos:
-                    carpeta_aprendiz = f"{aprendiz.usuario.nombres}_{aprendiz.usuario.apellidos}_{aprendiz.usuario.documento}"
+        archivos = ManifiestoService.archivos_zip(ManifiestoService.documentos_grupos(grupo_id=grupo_id))
 
-                    for documento in documentos:
-                        file_path = documento.ruta_archivo
-
-                        if not os.path.isabs(file_path):
-                            base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-                            file_path = os.path.join(base_dir, file_path)
-
-                        if os.path.exists(file_path):
-                            tipo_doc = documento.tipo_documento.replace('_', ' ').title()
-                            nombre_en_zip = f"{carpeta_aprendiz}/{tipo_doc}_{documento.nombre_archivo}"
-                            zipf.write(file_path, nombre_en_zip)
-                            documentos_agregados += 1
-
-            if documentos_agregados == 0:
-                flash('No se encontraron documentos para descargar', 'warning')
-                return redirect(url_for('admin.matriculas'))
-
-        memory_file.seek(0)
+        if not archivos:
+            flash('No se encontraron documentos para descargar', 'warning')
+            return redirect(url_for('admin.matriculas'))
 
         nombre_zip = f"Documentos_Grupo_{grupo.nombre}_{datetime.now().strftime('%Y%m%d')}.zip"
 
-        return send_file(
-            memory_file,
+        return Response(
+            stream_with_context(generar_zip_stream(archivos)),
             mimetype='application/zip',
-            as_attachment=True,
-            download_name=nombre_zip
+            headers={'Content-Disposition': f'attachment; filename="{nombre_zip}"'}
         )
 
     except Exception as e:
@@ -1246,73 +1287,17 @@ def descargar_documentos_grupo_matriculas(grupo_id):
 @login_required
 @admin_required
 def descargar_todos_grupos():
-    """Descargar todos los documentos de TODOS los grupos en un solo ZIP"""
-    import zipfile
-    from io import BytesIO
-    from datetime import datetime
-
-    grupos = Grupo.query.filter_by(activo=True).all()
-
-    if not grupos:
+    """Descargar todos los documentos de TODOS los grupos en un solo ZIP (se genera en segundo plano)"""
+    if not Grupo.query.filter_by(activo=True).first():
         flash('No hay grupos activos en el sistema', 'warning')
         return redirect(url_for('admin.matriculas'))
 
     try:
-        memory_file = BytesIO()
-
-        with zipfile.ZipFile(memory_file, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            documentos_agregados = 0
-
-            for grupo in grupos:
-                aprendices = Aprendiz.query.filter_by(grupo_id=grupo.id).all()
-
-                if not aprendices:
-                    continue
-
-                for aprendiz in aprendices:
-                    matricula = Matricula.query.filter_by(aprendiz_id=aprendiz.id).first()
-                    if not matricula:
-                        continue
-
-                    documentos = Documento.query.filter_by(matricula_id=matricula.id).filter(
-                        Documento.reemplazado_por == None
-                    ).all()
-
-                    if documentos:
-                        # Estructura: Grupo_X/Aprendiz_Nombre/documentos
-                        carpeta_grupo = f"Grupo_{grupo.nombre}"
-                        carpeta_aprendiz = f"{aprendiz.usuario.nombres}_{aprendiz.usuario.apellidos}_{aprendiz.usuario.documento}"
-
-                        for documento in documentos:
-                            file_path = documento.ruta_archivo
-
-                            if not os.path.isabs(file_path):
-                                base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-                                file_path = os.path.join(base_dir, file_path)
-
-                            if os.path.exists(file_path):
-                                tipo_doc = documento.tipo_documento.replace('_', ' ').title()
-                                nombre_en_zip = f"{carpeta_grupo}/{carpeta_aprendiz}/{tipo_doc}_{documento.nombre_archivo}"
-                                zipf.write(file_path, nombre_en_zip)
-                                documentos_agregados += 1
-
-            if documentos_agregados == 0:
-                flash('No se encontraron documentos para descargar en ningún grupo', 'warning')
-                return redirect(url_for('admin.matriculas'))
-
-        memory_file.seek(0)
-
-        nombre_zip = f"Documentos_Todos_Grupos_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip"
-
-        return send_file(
-            memory_file,
-            mimetype='application/zip',
-            as_attachment=True,
-            download_name=nombre_zip
-        )
+        trabajo = TrabajoService.encolar('zip_todos_grupos', current_user.id)
+        return respuesta_trabajo_encolado(trabajo)
 
     except Exception as e:
-        current_app.logger.error(f"Error al crear ZIP de todos los grupos: {e}")
+        current_app.logger.error(f"Error al encolar ZIP de todos los grupos: {e}")
         flash(f'Error al crear archivo ZIP: {str(e)}', 'danger')
         return redirect(url_for('admin.matriculas'))
 
@@ -1415,24 +1400,14 @@ def generar_sofia():
             flash('ID de filtro inválido', 'danger')
             return redirect(url_for('admin.generar_sofia'))
 
-    # Generar formato
-    success, message, file_path = SofiaService.generar_formato_sofia(
+    # Generar formato en segundo plano
+    trabajo = TrabajoService.encolar(
+        'sofia', current_user.id,
         filtro_tipo=filtro_tipo,
         filtro_id=filtro_id,
         docente_colegio_id=None  # Admin no tiene restricciones
     )
-
-    if success:
-        # Descargar archivo
-        return send_file(
-            file_path,
-            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-            as_attachment=True,
-            download_name=os.path.basename(file_path)
-        )
-    else:
-        flash(message, 'danger')
-        return redirect(url_for('admin.generar_sofia'))
+    return respuesta_trabajo_encolado(trabajo)
 
 
 # ============================================
@@ -1448,7 +1423,12 @@ def simat():
     estado_filtro = request.args.get('estado', 'TODOS')
     colegio_filtro = request.args.get('colegio_id')
 
-    query = DocumentoSIMAT.query
+    query = DocumentoSIMAT.query.options(
+        selectinload(DocumentoSIMAT.colegio),
+        selectinload(DocumentoSIMAT.grupo),
+        selectinload(DocumentoSIMAT.usuario_subio),
+        selectinload(DocumentoSIMAT.usuario_reviso)
+    )
 
     if estado_filtro != 'TODOS':
         query = query.filter_by(estado=estado_filtro)
@@ -1456,21 +1436,21 @@ def simat():
     if colegio_filtro:
         query = query.filter_by(colegio_id=int(colegio_filtro))
 
-    documentos = query.order_by(DocumentoSIMAT.created_at.desc()).all()
+    pagina = paginar_desde_request(query, orden_recientes(DocumentoSIMAT))
 
     # Obtener colegios para el filtro
     colegios = Colegio.query.filter_by(activo=True).order_by(Colegio.nombre).all()
 
-    # Estadísticas
-    stats = {
-        'total': DocumentoSIMAT.query.count(),
-        'pendientes': DocumentoSIMAT.query.filter_by(estado='PENDIENTE').count(),
-        'aprobados': DocumentoSIMAT.query.filter_by(estado='APROBADO').count(),
-        'rechazados': DocumentoSIMAT.query.filter_by(estado='RECHAZADO').count()
-    }
+    # Estadísticas (una sola consulta)
+    stats = EstadisticasService.get_conteos(DocumentoSIMAT, {
+        'pendientes': DocumentoSIMAT.estado == 'PENDIENTE',
+        'aprobados': DocumentoSIMAT.estado == 'APROBADO',
+        'rechazados': DocumentoSIMAT.estado == 'RECHAZADO'
+    })
 
     return render_template('admin/simat.html',
-                         documentos=documentos,
+                         documentos=pagina,
+                         pagina=pagina,
                          colegios=colegios,
                          stats=stats,
                          estado_filtro=estado_filtro,
@@ -1550,7 +1530,7 @@ def ver_simat_admin(simat_id):
 
     # Solo PDFs se pueden visualizar en navegador, otros formatos se descargan
     if ext == 'pdf':
-        return send_file(
+        return enviar_archivo_privado(
             documento.ruta_archivo,
             mimetype='application/pdf',
             as_attachment=False
@@ -1571,7 +1551,7 @@ def descargar_simat_admin(simat_id):
         flash('El archivo no existe', 'danger')
         return redirect(url_for('admin.simat'))
 
-    return send_file(
+    return enviar_archivo_privado(
         documento.ruta_archivo,
         as_attachment=True,
         download_name=documento.nombre_archivo_original
@@ -3,9 +3,11 @@ from flask_login import login_required, current_user
 from app.models import db, Aprendiz, Colegio, Grupo, Programa
 from app.services.matricula_service import MatriculaService
 from app.services.documento_service import DocumentoService
+from app.services.paquete_service import PaqueteService
 from app.services.reporte_service import ReporteService
 from app.utils.decorators import aprendiz_required
 from app.utils.validators import Validators
+from app.utils.helpers import resolver_ruta_documento, etag_documento, enviar_archivo_privado
 from werkzeug.utils import secure_filename
 from . import aprendiz_bp
 import os
@@ -350,11 +352,17 @@ def descargar_documento(documento_id):
         flash('No tiene permisos para descargar este documento', 'danger')
         return redirect(url_for('aprendiz.dashboard'))
 
-    if not os.path.exists(documento.ruta_archivo):
+    file_path = resolver_ruta_documento(documento.ruta_archivo)
+    if not os.path.exists(file_path):
         flash('Archivo no encontrado', 'danger')
         return redirect(url_for('aprendiz.documentos'))
 
-    return send_file(documento.ruta_archivo, as_attachment=True, download_name=documento.nombre_archivo)
+    return enviar_archivo_privado(
+        file_path,
+        etag=etag_documento(documento),
+        as_attachment=True,
+        download_name=documento.nombre_archivo
+    )
 
 @aprendiz_bp.route('/ver-documento/<int:documento_id>')
 @login_required
@@ -370,11 +378,8 @@ def ver_documento(documento_id):
         flash('No tiene permisos para ver este documento', 'danger')
         return redirect(url_for('aprendiz.dashboard'))
 
-    # Convertir ruta relativa a absoluta si es necesario
-    file_path = documento.ruta_archivo
-    if not os.path.isabs(file_path):
-        base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-        file_path = os.path.join(base_dir, file_path)
+    # Rutas relativas (almacén de documentos) a absolutas
+    file_path = resolver_ruta_documento(documento.ruta_archivo)
 
     if not os.path.exists(file_path):
         flash(f'Archivo no encontrado: {os.path.basename(file_path)}', 'danger')
@@ -391,7 +396,7 @@ def ver_documento(documento_id):
     mimetype = mimetype_map.get(extension, 'application/pdf')
 
     # Enviar archivo para visualizar en navegador (no descargar)
-    return send_file(file_path, mimetype=mimetype)
+    return enviar_archivo_privado(file_path, etag=etag_documento(documento), mimetype=mimetype)
 
 @aprendiz_bp.route('/descargar-documentos-pdf')
 @login_required
@@ -409,8 +414,11 @@ def descargar_documentos_pdf():
         return redirect(url_for('aprendiz.documentos'))
 
     try:
-        # Generar PDF unificado
-        pdf_path = generar_pdf_unificado_aprendiz(aprendiz, documentos)
+        # PDF unificado (se reutiliza si los documentos no cambiaron)
+        pdf_path, _ = PaqueteService.obtener_o_generar(
+            PaqueteService.clave_aprendiz(aprendiz, documentos),
+            lambda: generar_pdf_unificado_aprendiz(aprendiz, documentos)
+        )
 
         return send_file(
             pdf_path,
@@ -430,18 +438,19 @@ def descargar_documentos_pdf():
 @aprendiz_required
 def descargar_formato_tratamiento_datos():
     """Descargar formato de tratamiento de datos auto-generado con los datos del aprendiz"""
-    from app.services.formato_service import generar_formato_tratamiento_datos
+    from app.services.formato_service import generar_formato_tratamiento_datos, convert_docx_to_pdf, MIMETYPES_FORMATO
 
     try:
         aprendiz = current_user.aprendiz
 
-        # Generar el formato (los datos del acudiente están en el modelo Aprendiz)
-        file_path = generar_formato_tratamiento_datos(aprendiz)
+        # Generar el formato (los datos del acudiente están en el modelo Aprendiz) y
+        # convertirlo a PDF si hay conversor disponible (si no, se envía el DOCX)
+        file_path = convert_docx_to_pdf(generar_formato_tratamiento_datos(aprendiz))
 
         # Enviar el archivo
         return send_file(
             file_path,
-            mimetype='application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+            mimetype=MIMETYPES_FORMATO[os.path.splitext(file_path)[1].lower()],
             as_attachment=True,
             download_name=os.path.basename(file_path)
         )
@@ -457,18 +466,19 @@ def descargar_formato_tratamiento_datos():
 @aprendiz_required
 def descargar_formato_compromiso_aprendiz():
     """Descargar formato de compromiso del aprendiz auto-generado con los datos del aprendiz"""
-    from app.services.formato_service import generar_formato_compromiso_aprendiz
+    from app.services.formato_service import generar_formato_compromiso_aprendiz, convert_docx_to_pdf, MIMETYPES_FORMATO
 
     try:
         aprendiz = current_user.aprendiz
 
-        # Generar el formato (los datos del acudiente están en el modelo Aprendiz)
-        file_path = generar_formato_compromiso_aprendiz(aprendiz)
+        # Generar el formato (los datos del acudiente están en el modelo Aprendiz) y
+        # convertirlo a PDF si hay conversor disponible (si no, se envía el DOCX)
+        file_path = convert_docx_to_pdf(generar_formato_compromiso_aprendiz(aprendiz))
 
         # Enviar el archivo
         return send_file(
             file_path,
-            mimetype='application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+            mimetype=MIMETYPES_FORMATO[os.path.splitext(file_path)[1].lower()],
             as_attachment=True,
             download_name=os.path.basename(file_path)
         )
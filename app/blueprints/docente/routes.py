@@ -1,16 +1,26 @@
-from flask import render_template, redirect, url_for, flash, request, send_file, jsonify, current_app
+from flask import render_template, redirect, url_for, flash, request, send_file, jsonify, current_app, Response, stream_with_context, abort
 from flask_login import login_required, current_user
 from app.models import db, Matricula, Aprendiz, Colegio, Grupo, Programa, Documento, Usuario, DocumentoSIMAT
 from app.services.matricula_service import MatriculaService
+from app.services.paquete_service import PaqueteService
 from app.services.documento_service import DocumentoService
+from app.services.estadisticas_service import EstadisticasService
+from app.services.importacion_service import ImportacionService, COLUMNAS_REQUERIDAS
+from app.services.manifiesto_service import ManifiestoService
 from app.services.reporte_service import ReporteService
 from app.services.sofia_service import SofiaService
+from app.services.trabajo_service import TrabajoService
+from app.services.vista_previa_service import VistaPreviaService
 from app.utils.decorators import docente_required
 from app.utils.crypto import CryptoService
+from app.utils.paginacion import paginar_desde_request, orden_recientes
+from app.utils.helpers import respuesta_trabajo_encolado, resolver_ruta_documento, etag_documento, enviar_archivo_privado
 from . import docente_bp
 from datetime import datetime
 from werkzeug.utils import secure_filename
+from sqlalchemy.orm import selectinload
 import os
+import re
 
 @docente_bp.route('/dashboard')
 @login_required
@@ -31,18 +41,8 @@ def dashboard():
     matriculas_recientes = []
 
     if colegio:
-        # Obtener todas las matrículas del colegio
-        matriculas = Matricula.query.join(Aprendiz).filter(
-            Aprendiz.colegio_id == colegio.id
-        ).all()
-
-        stats['total_matriculas'] = len(matriculas)
-        stats['matriculas_pendientes'] = len([m for m in matriculas if m.estado in ['ENVIADO', 'PENDIENTE']])
-        stats['matriculas_validadas'] = len([m for m in matriculas if m.estado in ['COMPLETO', 'PREMATRICULA']])
-
-        # Contar documentos pendientes
-        for matricula in matriculas:
-            stats['documentos_pendientes'] += len([d for d in matricula.documentos if d.estado == 'PENDIENTE'])
+        # Estadísticas calculadas en SQL (número constante de consultas)
+        stats = EstadisticasService.get_estadisticas_docente(colegio.id)
 
         # Matrículas recientes (últimas 5)
         matriculas_recientes = Matricula.query.join(Aprendiz).filter(
@@ -260,14 +260,17 @@ def reportes():
     programas = Programa.query.filter_by(activo=True).all()
 
     # Obtener estadísticas de matrículas
-    matriculas = Matricula.query.join(Aprendiz).filter(Aprendiz.colegio_id == colegio.id).all() if colegio else []
+    stats = {'total': 0, 'pendientes': 0, 'completas': 0, 'prematriculas': 0}
 
-    stats = {
-        'total': len(matriculas),
-        'pendientes': len([m for m in matriculas if m.estado in ['ENVIADO', 'PENDIENTE']]),
-        'completas': len([m for m in matriculas if m.estado == 'COMPLETO']),
-        'prematriculas': len([m for m in matriculas if m.estado == 'PREMATRICULA'])
-    }
+    if colegio:
+        datos = EstadisticasService.get_estadisticas_colegio(colegio.id)
+        por_estado = datos['matriculas_por_estado']
+        stats = {
+            'total': datos['total_matriculas'],
+            'pendientes': por_estado['ENVIADO'] + por_estado['PENDIENTE'],
+            'completas': por_estado['COMPLETO'],
+            'prematriculas': por_estado['PREMATRICULA']
+        }
 
     return render_template('docente/reportes.html',
                          colegio=colegio,
@@ -328,7 +331,12 @@ def generar_reporte_pdf():
         query = query.filter(Matricula.created_at <= fecha_hasta_dt)
         filtros['Fecha Hasta'] = fecha_hasta
 
-    matriculas = query.all()
+    # El listado del PDF recorre aprendiz, usuario, programa y grupo de cada matrícula
+    matriculas = query.options(
+        db.joinedload(Matricula.aprendiz).joinedload(Aprendiz.usuario),
+        db.joinedload(Matricula.aprendiz).joinedload(Aprendiz.grupo),
+        db.joinedload(Matricula.aprendiz).joinedload(Aprendiz.programa)
+    ).all()
 
     # Determinar título según tipo de reporte
     titulos = {
@@ -358,7 +366,6 @@ def generar_reporte_pdf():
 @docente_required
 def generar_reporte_excel():
     """Generar reporte en Excel"""
-    from flask import send_file
     from app.services.reporte_service import ReporteService
     from datetime import datetime
 
@@ -384,62 +391,52 @@ def generar_reporte_excel():
                 tipo_filtro = 'colegio'
                 id_filtro = colegio.id
 
-            # Generar formato SOFIA
-            success, message, file_path = SofiaService.generar_formato_sofia(
+            # Generar formato SOFIA en segundo plano
+            trabajo = TrabajoService.encolar(
+                'sofia', current_user.id,
                 filtro_tipo=tipo_filtro,
                 filtro_id=id_filtro,
                 docente_colegio_id=colegio.id
             )
-
-            if success:
-                return send_file(
-                    file_path,
-                    mimetype='application/vnd.ms-excel',
-                    as_attachment=True,
-                    download_name=os.path.basename(file_path)
-                )
-            else:
-                flash(message, 'danger')
-                return redirect(url_for('docente.reportes'))
+            return respuesta_trabajo_encolado(trabajo)
 
         except Exception as e:
             flash(f'Error al generar formato SOFIA: {str(e)}', 'danger')
             return redirect(url_for('docente.reportes'))
 
     # Para otros tipos de reportes, usar el servicio de reportes normal
-    # Obtener filtros
-    programa_id = request.form.get('programa_id')
-    grupo_id = request.form.get('grupo_id')
-    estado = request.form.get('estado')
-    fecha_desde = request.form.get('fecha_desde')
-    fecha_hasta = request.form.get('fecha_hasta')
-
-    # Query base: todas las matrículas del colegio
-    query = Matricula.query.join(Aprendiz).filter(Aprendiz.colegio_id == colegio.id)
-
-    # Aplicar filtros
-    if programa_id:
-        query = query.filter(Aprendiz.programa_id == int(programa_id))
-
-    if grupo_id:
-        query = query.filter(Aprendiz.grupo_id == int(grupo_id))
-
-    if estado:
-        query = query.filter(Matricula.estado == estado)
-
-    if fecha_desde:
-        fecha_desde_dt = datetime.strptime(fecha_desde, '%Y-%m-%d')
-        query = query.filter(Matricula.created_at >= fecha_desde_dt)
-
-    if fecha_hasta:
-        fecha_hasta_dt = datetime.strptime(fecha_hasta, '%Y-%m-%d')
-        query = query.filter(Matricula.created_at <= fecha_hasta_dt)
+    # Filtros sobre las matrículas del colegio
+    filtros = {
+        'colegio_id': colegio.id,
+        'programa_id': request.form.get('programa_id') or None,
+        'grupo_id': request.form.get('grupo_id') or None,
+        'estado': request.form.get('estado') or None,
+        'fecha_desde': request.form.get('fecha_desde') or None,
+        'fecha_hasta': request.form.get('fecha_hasta') or None
+    }
 
-    matriculas = query.all()
+    formato = request.values.get('formato', 'xlsx').lower()
 
     try:
-        excel_path = ReporteService.generar_excel_matriculas(matriculas)
-        return send_file(excel_path, as_attachment=True, download_name=f'reporte_matriculas_{datetime.now().strftime("%Y%m%d_%H%M%S")}.xlsx')
+        # Reportes grandes: generar en segundo plano y descargar después
+        if request.form.get('segundo_plano'):
+            trabajo = TrabajoService.encolar(
+                'reporte_matriculas', current_user.id,
+                filtros=filtros, formato=formato, nombre='reporte_matriculas'
+            )
+            return respuesta_trabajo_encolado(trabajo)
+
+        query = ReporteService.consulta_matriculas(**filtros)
+        contenido, mimetype, extension = ReporteService.exportar_matriculas(query, formato)
+        if not isinstance(contenido, bytes):
+            contenido = stream_with_context(contenido)
+
+        nombre_archivo = f'reporte_matriculas_{datetime.now().strftime("%Y%m%d_%H%M%S")}.{extension}'
+        return Response(
+            contenido,
+            mimetype=mimetype,
+            headers={'Content-Disposition': f'attachment; filename={nombre_archivo}'}
+        )
 
     except Exception as e:
         flash(f'Error al generar reporte Excel: {str(e)}', 'danger')
@@ -449,27 +446,15 @@ def generar_reporte_excel():
 # CRUD DE APRENDICES
 # ============================================
 
-@docente_bp.route('/aprendices')
-@login_required
-@docente_required
-def aprendices():
-    """Lista de aprendices del colegio"""
-    colegio = Colegio.query.filter_by(docente_enlace_id=current_user.id).first()
-
-    if not colegio:
-        flash('No tiene un colegio asignado', 'warning')
-        return redirect(url_for('docente.dashboard'))
-
-    # Filtros
-    nombre_filtro = request.args.get('nombre', '')
-    programa_filtro = request.args.get('programa', '')
-    grupo_filtro = request.args.get('grupo', '')
-    estado_filtro = request.args.get('estado', '')
-
-    # Query base
-    query = Aprendiz.query.join(Usuario).filter(Aprendiz.colegio_id == colegio.id)
+def _query_aprendices_colegio(colegio_id, nombre_filtro='', programa_filtro='', grupo_filtro='', estado_filtro=''):
+    """Consulta de aprendices del colegio con los filtros del listado y sus relaciones precargadas"""
+    query = Aprendiz.query.join(Usuario).filter(Aprendiz.colegio_id == colegio_id).options(
+        selectinload(Aprendiz.usuario),
+        selectinload(Aprendiz.grupo),
+        selectinload(Aprendiz.programa),
+        selectinload(Aprendiz.matriculas)
+    )
 
-    # Aplicar filtros
     if nombre_filtro:
         query = query.filter(
             db.or_(
@@ -480,38 +465,83 @@ def aprendices():
         )
 
     if programa_filtro:
-        query = query.join(Matricula).filter(Matricula.programa_id == programa_filtro)
+        query = query.filter(Aprendiz.programa_id == programa_filtro)
 
     if grupo_filtro:
         query = query.filter(Aprendiz.grupo_id == grupo_filtro)
 
     if estado_filtro:
-        query = query.join(Matricula).filter(Matricula.estado == estado_filtro)
+        query = query.filter(Aprendiz.matriculas.any(Matricula.estado == estado_filtro))
 
-    aprendices = query.all()
+    return query
+
+def _filtros_aprendices():
+    """Lee del request los filtros del listado de aprendices"""
+    return {
+        'nombre_filtro': request.args.get('nombre', ''),
+        'programa_filtro': request.args.get('programa', ''),
+        'grupo_filtro': request.args.get('grupo', ''),
+        'estado_filtro': request.args.get('estado', '')
+    }
+
+@docente_bp.route('/aprendices')
+@login_required
+@docente_required
+def aprendices():
+    """Lista de aprendices del colegio"""
+    colegio = Colegio.query.filter_by(docente_enlace_id=current_user.id).first()
+
+    if not colegio:
+        flash('No tiene un colegio asignado', 'warning')
+        return redirect(url_for('docente.dashboard'))
+
+    filtros = _filtros_aprendices()
+    query = _query_aprendices_colegio(colegio.id, **filtros)
+    pagina = paginar_desde_request(query, orden_recientes(Aprendiz))
 
     # Datos para filtros
     programas = Programa.query.filter_by(activo=True).all()
     grupos = Grupo.query.filter_by(colegio_id=colegio.id, activo=True).all()
 
-    # Estadísticas
-    stats = {
-        'total': Aprendiz.query.filter_by(colegio_id=colegio.id).count(),
-        'con_matricula': Aprendiz.query.join(Matricula).filter(Aprendiz.colegio_id == colegio.id).count(),
-        'sin_matricula': Aprendiz.query.filter_by(colegio_id=colegio.id).filter(~Aprendiz.matriculas.any()).count(),
-        'activos': Aprendiz.query.join(Usuario).filter(Aprendiz.colegio_id == colegio.id, Usuario.activo == True).count()
-    }
+    # Estadísticas (una sola consulta)
+    stats = EstadisticasService.get_estadisticas_aprendices(colegio.id)
 
     return render_template('docente/aprendices/list.html',
-                         aprendices=aprendices,
+                         aprendices=pagina,
+                         pagina=pagina,
                          colegio=colegio,
                          programas=programas,
                          grupos=grupos,
                          stats=stats,
-                         nombre_filtro=nombre_filtro,
-                         programa_filtro=programa_filtro,
-                         grupo_filtro=grupo_filtro,
-                         estado_filtro=estado_filtro)
+                         **filtros)
+
+@docente_bp.route('/aprendices/mas')
+@login_required
+@docente_required
+def aprendices_mas():
+    """Siguiente página del listado de aprendices (AJAX, botón "Cargar más")"""
+    colegio = Colegio.query.filter_by(docente_enlace_id=current_user.id).first()
+
+    if not colegio:
+        return jsonify({'success': False, 'message': 'No tiene un colegio asignado'}), 403
+
+    query = _query_aprendices_colegio(colegio.id, **_filtros_aprendices())
+    pagina = paginar_desde_request(query, orden_recientes(Aprendiz))
+
+    return jsonify({
+        'success': True,
+        'html': render_template('docente/aprendices/_filas.html', aprendices=pagina),
+        'aprendices': [{
+            'id': aprendiz.id,
+            'documento': aprendiz.usuario.documento,
+            'nombre_completo': aprendiz.usuario.nombre_completo,
+            'programa': aprendiz.programa.nombre if aprendiz.programa else None,
+            'grupo': aprendiz.grupo.nombre if aprendiz.grupo else None,
+            'estado': aprendiz.matriculas[0].estado if aprendiz.matriculas else None
+        } for aprendiz in pagina],
+        'siguiente': pagina.cursor_siguiente,
+        'tiene_siguiente': pagina.tiene_siguiente
+    })
 
 @docente_bp.route('/aprendices/<int:aprendiz_id>')
 @login_required
@@ -605,54 +635,18 @@ def cargar_excel_aprendices():
 
         try:
             import pandas as pd
-            from app.services.auth_service import AuthService
 
             # Leer Excel
-            df = pd.read_excel(archivo)
+            df = pd.read_excel(archivo, dtype=str)
 
             # Validar columnas requeridas
-            columnas_requeridas = ['documento', 'tipo_documento', 'nombres', 'apellidos', 'email', 'telefono']
-            if not all(col in df.columns for col in columnas_requeridas):
-                flash(f'El archivo debe contener las columnas: {", ".join(columnas_requeridas)}', 'danger')
+            if not all(col in df.columns for col in COLUMNAS_REQUERIDAS):
+                flash(f'El archivo debe contener las columnas: {", ".join(COLUMNAS_REQUERIDAS)}', 'danger')
                 return redirect(url_for('docente.cargar_excel_aprendices'))
 
-            # Procesar cada fila
-            exitosos = 0
-            errores = []
-
-            for index, row in df.iterrows():
-                try:
-                    # Crear usuario aprendiz
-                    # Contraseña por defecto: documento
-                    password = str(row['documento'])
-
-                    success, message, usuario = AuthService.create_user(
-                        documento=str(row['documento']),
-                        tipo_documento=row['tipo_documento'],
-                        nombres=row['nombres'],
-                        apellidos=row['apellidos'],
-                        email=row['email'],
-                        telefono=str(row['telefono']) if pd.notna(row['telefono']) else '',
-                        password=password,
-                        rol='APRENDIZ'
-                    )
-
-                    if success:
-                        # Vincular aprendiz al colegio
-                        aprendiz = Aprendiz.query.filter_by(usuario_id=usuario.id).first()
-                        if aprendiz:
-                            aprendiz.colegio_id = colegio.id
-                            aprendiz.ciudad = row.get('ciudad', '')
-                            aprendiz.departamento = row.get('departamento', '')
-
-                            db.session.commit()
-                            exitosos += 1
-                    else:
-                        errores.append(f'Fila {index + 2}: {message}')
-
-                except Exception as e:
-                    errores.append(f'Fila {index + 2}: {str(e)}')
-                    continue
+            resultado = ImportacionService.importar_aprendices(df, colegio.id)
+            exitosos = resultado['exitosos']
+            errores = resultado['errores']
 
             # Mostrar resultados
             if exitosos > 0:
@@ -661,19 +655,52 @@ def cargar_excel_aprendices():
             if errores:
                 flash(f'Errores encontrados: {len(errores)}', 'warning')
                 for error in errores[:5]:  # Mostrar solo los primeros 5 errores
-                    flash(error, 'danger')
+                    flash(f"Fila {error['fila']}: {error['mensaje']}", 'danger')
+
+                # Reporte completo descargable desde la página de carga
+                token = ImportacionService.guardar_reporte_errores(errores, current_user.id)
+                return redirect(url_for('docente.cargar_excel_aprendices', reporte=token))
 
             return redirect(url_for('docente.aprendices'))
 
         except Exception as e:
+            db.session.rollback()
             flash(f'Error al procesar el archivo: {str(e)}', 'danger')
             return redirect(url_for('docente.cargar_excel_aprendices'))
 
     # GET - Mostrar formulario de carga
     grupos = Grupo.query.filter_by(colegio_id=colegio.id, activo=True).all()
+
+    # Reporte de errores de la última importación, si existe
+    reporte = request.args.get('reporte', '')
+    if not re.fullmatch(r'[0-9a-f]{32}', reporte) or \
+            not os.path.exists(ImportacionService.ruta_reporte_errores(reporte, current_user.id)):
+        reporte = None
+
     return render_template('docente/aprendices/cargar_excel.html',
                          colegio=colegio,
-                         grupos=grupos)
+                         grupos=grupos,
+                         reporte=reporte)
+
+@docente_bp.route('/aprendices/cargar-excel/errores/<reporte>')
+@login_required
+@docente_required
+def descargar_errores_importacion(reporte):
+    """Descarga el reporte de errores de una carga masiva"""
+    if not re.fullmatch(r'[0-9a-f]{32}', reporte):
+        abort(404)
+
+    file_path = ImportacionService.ruta_reporte_errores(reporte, current_user.id)
+    if not os.path.exists(file_path):
+        flash('El reporte de errores ya no está disponible', 'warning')
+        return redirect(url_for('docente.cargar_excel_aprendices'))
+
+    return send_file(
+        file_path,
+        mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+        as_attachment=True,
+        download_name='errores_importacion.xlsx'
+    )
 
 # ============================================
 # VISUALIZACIÓN Y APROBACIÓN DE DOCUMENTOS
@@ -692,12 +719,8 @@ def ver_documento(documento_id):
         flash('No tiene permisos para ver este documento', 'danger')
         return redirect(url_for('docente.dashboard'))
 
-    # Convertir ruta relativa a absoluta si es necesario
-    file_path = documento.ruta_archivo
-    if not os.path.isabs(file_path):
-        # Es una ruta relativa, convertirla a absoluta
-        base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-        file_path = os.path.join(base_dir, file_path)
+    # Rutas relativas (almacén de documentos) a absolutas
+    file_path = resolver_ruta_documento(documento.ruta_archivo)
 
     if not os.path.exists(file_path):
         flash(f'Archivo no encontrado: {os.path.basename(file_path)}', 'danger')
@@ -713,7 +736,28 @@ def ver_documento(documento_id):
     }
     mimetype = mimetype_map.get(extension, 'application/pdf')
 
-    return send_file(file_path, mimetype=mimetype)
+    return enviar_archivo_privado(file_path, etag=etag_documento(documento), mimetype=mimetype)
+
+@docente_bp.route('/vista-previa-documento/<int:documento_id>')
+@login_required
+@docente_required
+def vista_previa_documento(documento_id):
+    """Miniatura de un documento (imagen o primera página del PDF)"""
+    colegio = Colegio.query.filter_by(docente_enlace_id=current_user.id).first()
+    if not colegio:
+        abort(403)
+
+    documento = Documento.query.get_or_404(documento_id)
+
+    # Verificar que el documento pertenece a un aprendiz del colegio
+    if documento.matricula.aprendiz.colegio_id != colegio.id:
+        abort(403)
+
+    ruta, mimetype = VistaPreviaService.obtener(documento)
+    if not ruta:
+        abort(404)
+
+    return enviar_archivo_privado(ruta, etag=etag_documento(documento, prefijo='vista-'), mimetype=mimetype)
 
 @docente_bp.route('/aprobar-documento/<int:documento_id>', methods=['POST'])
 @login_required
@@ -853,9 +897,7 @@ def aprobar_todos_documentos(matricula_id):
 @login_required
 @docente_required
 def descargar_documentos_grupo(grupo_id):
-    """Descargar todos los documentos de un grupo en PDF unificado"""
-    from app.services.formato_service import generar_pdf_unificado_grupo
-
+    """Descargar todos los documentos de un grupo en PDF unificado (se genera en segundo plano)"""
     colegio = Colegio.query.filter_by(docente_enlace_id=current_user.id).first()
     if not colegio:
         flash('No tiene un colegio asignado', 'danger')
@@ -863,29 +905,66 @@ def descargar_documentos_grupo(grupo_id):
 
     grupo = Grupo.query.get_or_404(grupo_id)
 
-    # Obtener todos los aprendices del grupo que pertenecen al colegio del docente
-    aprendices = Aprendiz.query.filter_by(grupo_id=grupo_id, colegio_id=colegio.id).all()
-
-    if not aprendices:
+    # Verificar que el grupo tenga aprendices del colegio del docente
+    if not Aprendiz.query.filter_by(grupo_id=grupo_id, colegio_id=colegio.id).first():
         flash('No hay aprendices en este grupo', 'warning')
         return redirect(url_for('docente.matriculas'))
 
     try:
-        # Generar PDF unificado
-        pdf_path = generar_pdf_unificado_grupo(grupo, aprendices)
+        # Si los documentos del grupo no cambiaron desde la última vez, el PDF ya está en caché
+        entradas = ManifiestoService.documentos_grupos(grupo_id=grupo.id, colegio_id=colegio.id)
+        pdf_path = PaqueteService.obtener(PaqueteService.clave_grupo(grupo.id, colegio.id, entradas)) if entradas else None
+        if pdf_path:
+            return send_file(
+                pdf_path,
+                mimetype='application/pdf',
+                as_attachment=True,
+                download_name=os.path.basename(pdf_path)
+            )
 
-        return send_file(
-            pdf_path,
-            mimetype='application/pdf',
-            as_attachment=True,
-            download_name=os.path.basename(pdf_path)
-        )
+        # Generar PDF unificado en segundo plano
+        trabajo = TrabajoService.encolar('pdf_grupo', current_user.id, grupo_id=grupo.id, colegio_id=colegio.id)
+        return respuesta_trabajo_encolado(trabajo)
 
     except Exception as e:
-        current_app.logger.error(f"Error al crear PDF unificado del grupo: {e}")
+        current_app.logger.error(f"Error al encolar PDF unificado del grupo: {e}")
         flash(f'Error al crear PDF unificado: {str(e)}', 'danger')
         return redirect(url_for('docente.matriculas'))
 
+@docente_bp.route('/descargar-formatos-grupo/<int:grupo_id>')
+@login_required
+@docente_required
+def descargar_formatos_grupo(grupo_id):
+    """Generar en un ZIP los formatos de todos los aprendices de un grupo (en segundo plano)"""
+    from app.services.formato_service import FORMATOS
+
+    colegio = Colegio.query.filter_by(docente_enlace_id=current_user.id).first()
+    if not colegio:
+        flash('No tiene un colegio asignado', 'danger')
+        return redirect(url_for('docente.dashboard'))
+
+    grupo = Grupo.query.get_or_404(grupo_id)
+
+    # Tipo de formato: uno de FORMATOS o 'todos'
+    tipo = request.args.get('tipo', 'todos')
+    if tipo != 'todos' and tipo not in FORMATOS:
+        flash('Tipo de formato inválido', 'danger')
+        return redirect(url_for('docente.matriculas', grupo=grupo_id))
+    tipos = list(FORMATOS) if tipo == 'todos' else [tipo]
+
+    # Verificar que el grupo tenga aprendices del colegio del docente
+    if not Aprendiz.query.filter_by(grupo_id=grupo_id, colegio_id=colegio.id).first():
+        flash('No hay aprendices en este grupo', 'warning')
+        return redirect(url_for('docente.matriculas'))
+
+    trabajo = TrabajoService.encolar(
+        'formatos_grupo', current_user.id,
+        grupo_id=grupo.id,
+        colegio_id=colegio.id,
+        tipos=tipos
+    )
+    return respuesta_trabajo_encolado(trabajo)
+
 @docente_bp.route('/descargar-documentos-aprendiz/<int:aprendiz_id>')
 @login_required
 @docente_required
@@ -915,8 +994,11 @@ def descargar_documentos_aprendiz(aprendiz_id):
         return redirect(url_for('docente.ver_matricula', matricula_id=matricula.id))
 
     try:
-        # Generar PDF unificado
-        pdf_path = generar_pdf_unificado_aprendiz(aprendiz, documentos)
+        # PDF unificado (se reutiliza si los documentos no cambiaron)
+        pdf_path, _ = PaqueteService.obtener_o_generar(
+            PaqueteService.clave_aprendiz(aprendiz, documentos),
+            lambda: generar_pdf_unificado_aprendiz(aprendiz, documentos)
+        )
 
         return send_file(
             pdf_path,
@@ -964,24 +1046,14 @@ def generar_sofia():
             flash('ID de filtro inválido', 'danger')
             return redirect(url_for('docente.generar_sofia'))
 
-    # Generar formato (con restricción de colegio)
-    success, message, file_path = SofiaService.generar_formato_sofia(
+    # Generar formato en segundo plano (con restricción de colegio)
+    trabajo = TrabajoService.encolar(
+        'sofia', current_user.id,
         filtro_tipo=filtro_tipo,
         filtro_id=filtro_id if filtro_tipo != 'colegio' else colegio.id,  # Forzar su colegio
         docente_colegio_id=colegio.id
     )
-
-    if success:
-        # Descargar archivo
-        return send_file(
-            file_path,
-            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-            as_attachment=True,
-            download_name=os.path.basename(file_path)
-        )
-    else:
-        flash(message, 'danger')
-        return redirect(url_for('docente.generar_sofia'))
+    return respuesta_trabajo_encolado(trabajo)
 
 
 # ============================================
@@ -1106,7 +1178,7 @@ def descargar_simat(simat_id):
         flash('El archivo no existe', 'danger')
         return redirect(url_for('docente.simat'))
 
-    return send_file(
+    return enviar_archivo_privado(
         documento.ruta_archivo,
         as_attachment=True,
         download_name=documento.nombre_archivo_original
@@ -0,0 +1,5 @@
+from flask import Blueprint
+
+trabajos_bp = Blueprint('trabajos', __name__, url_prefix='/trabajos')
+
+from . import routes
@@ -0,0 +1,62 @@
+from flask import render_template, send_file, jsonify, url_for, flash, redirect, abort
+from flask_login import login_required, current_user
+from app.services.trabajo_service import TrabajoService
+from app.utils.decorators import role_required
+from . import trabajos_bp
+import os
+
+def _trabajo_del_usuario(trabajo_id):
+    """Trabajo del usuario actual o 404 (no se revela si existe para otro usuario)"""
+    trabajo = TrabajoService.obtener(trabajo_id, current_user.id)
+    if not trabajo:
+        abort(404)
+    return trabajo
+
+@trabajos_bp.route('/')
+@login_required
+@role_required('ADMINISTRADOR', 'DOCENTE')
+def lista():
+    """Trabajos recientes del usuario"""
+    trabajos = TrabajoService.listar(current_user.id)
+    return render_template('trabajos/lista.html', trabajos=trabajos)
+
+@trabajos_bp.route('/<trabajo_id>')
+@login_required
+@role_required('ADMINISTRADOR', 'DOCENTE')
+def ver(trabajo_id):
+    """Página de seguimiento de un trabajo (consulta el estado periódicamente)"""
+    trabajo = _trabajo_del_usuario(trabajo_id)
+    return render_template('trabajos/ver.html', trabajo=trabajo)
+
+@trabajos_bp.route('/<trabajo_id>/estado')
+@login_required
+@role_required('ADMINISTRADOR', 'DOCENTE')
+def estado(trabajo_id):
+    """Estado y progreso del trabajo en JSON"""
+    trabajo = _trabajo_del_usuario(trabajo_id)
+
+    datos = trabajo.to_dict()
+    datos['url_descarga'] = url_for('trabajos.descargar', trabajo_id=trabajo.id) if trabajo.estado == 'COMPLETADO' else None
+    return jsonify(datos)
+
+@trabajos_bp.route('/<trabajo_id>/descargar')
+@login_required
+@role_required('ADMINISTRADOR', 'DOCENTE')
+def descargar(trabajo_id):
+    """Descargar el archivo generado por el trabajo"""
+    trabajo = _trabajo_del_usuario(trabajo_id)
+
+    if trabajo.estado != 'COMPLETADO':
+        flash('El archivo todavía no está listo', 'warning')
+        return redirect(url_for('trabajos.ver', trabajo_id=trabajo.id))
+
+    if not trabajo.ruta_resultado or not os.path.exists(trabajo.ruta_resultado):
+        flash('El archivo ya no está disponible. Vuelva a generarlo.', 'danger')
+        return redirect(url_for('trabajos.lista'))
+
+    return send_file(
+        trabajo.ruta_resultado,
+        mimetype=trabajo.mimetype,
+        as_attachment=True,
+        download_name=trabajo.nombre_descarga
+    )
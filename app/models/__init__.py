@@ -13,3 +13,4 @@ from .documento_simat import DocumentoSIMAT
 from .novedad import Novedad
 from .mensaje_contacto import MensajeContacto
 from .auditoria import Auditoria
+from .trabajo import Trabajo
@@ -24,6 +24,9 @@ class Documento(db.Model):
     ruta_archivo = db.Column(db.String(500), nullable=False)
     tamaño_bytes = db.Column(db.Integer)
     extension = db.Column(db.String(10))
+    sha256 = db.Column(db.String(64), index=True)
+    mime_type = db.Column(db.String(100))
+    ruta_original = db.Column(db.String(500), index=True)
     validado = db.Column(db.Boolean, default=None, index=True)
     validado_por = db.Column(db.Integer, db.ForeignKey('usuarios.id', ondelete='SET NULL'))
     fecha_validacion = db.Column(db.DateTime)
@@ -1,5 +1,6 @@
 from . import db
 from datetime import datetime
+from sqlalchemy.orm import query_expression
 
 class Grupo(db.Model):
     __tablename__ = 'grupos'
@@ -19,6 +20,9 @@ class Grupo(db.Model):
     programa = db.relationship('Programa', back_populates='grupos')
     aprendices = db.relationship('Aprendiz', back_populates='grupo')
 
+    # Cantidad de aprendices, solo en las consultas que la cargan con with_expression
+    total_aprendices = query_expression()
+
     __table_args__ = (
         db.UniqueConstraint('nombre', 'colegio_id', 'año_lectivo', name='unique_grupo'),
     )
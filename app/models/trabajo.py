@@ -0,0 +1,61 @@
+from . import db
+from datetime import datetime
+
+class Trabajo(db.Model):
+    """
+    Registro de trabajos en segundo plano (generación de ZIP, PDF, SOFIA y reportes)
+    El archivo resultante queda en disco y se descarga cuando el trabajo termina
+    """
+    __tablename__ = 'trabajos'
+
+    ESTADOS_ACTIVOS = ('PENDIENTE', 'EN_PROCESO')
+
+    id = db.Column(db.String(32), primary_key=True)
+    tipo = db.Column(db.String(50), nullable=False, index=True)
+    estado = db.Column(
+        db.Enum('PENDIENTE', 'EN_PROCESO', 'COMPLETADO', 'ERROR'),
+        nullable=False,
+        default='PENDIENTE',
+        index=True
+    )
+    progreso = db.Column(db.Integer, nullable=False, default=0)
+    mensaje = db.Column(db.String(255))
+    parametros = db.Column(db.JSON)
+
+    # Usuario que solicitó el trabajo (solo él puede consultarlo y descargarlo)
+    usuario_id = db.Column(db.Integer, db.ForeignKey('usuarios.id', ondelete='SET NULL'), index=True)
+
+    # Resultado
+    ruta_resultado = db.Column(db.String(500))
+    nombre_descarga = db.Column(db.String(255))
+    mimetype = db.Column(db.String(100))
+    error = db.Column(db.Text)
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    iniciado_at = db.Column(db.DateTime)
+    finalizado_at = db.Column(db.DateTime)
+    # Última señal de vida del ejecutor (inicio, avance o latido periódico)
+    actualizado_at = db.Column(db.DateTime)
+
+    # Relaciones
+    usuario = db.relationship('Usuario')
+
+    @property
+    def activo(self):
+        return self.estado in self.ESTADOS_ACTIVOS
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'tipo': self.tipo,
+            'estado': self.estado,
+            'progreso': self.progreso,
+            'mensaje': self.mensaje,
+            'error': self.error,
+            'nombre_descarga': self.nombre_descarga,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'finalizado_at': self.finalizado_at.isoformat() if self.finalizado_at else None
+        }
+
+    def __repr__(self):
+        return f'<Trabajo {self.tipo} {self.id} - {self.estado}>'
@@ -1,13 +1,32 @@
 """Servicios de la aplicación"""
 
+from .almacen_service import AlmacenService
 from .auth_service import AuthService
 from .documento_service import DocumentoService
+from .estadisticas_service import EstadisticasService
+from .importacion_service import ImportacionService
+from .manifiesto_service import ManifiestoService
 from .matricula_service import MatriculaService
+from .optimizacion_service import OptimizacionService
+from .paquete_service import PaqueteService
 from .reporte_service import ReporteService
+from .trabajo_service import TrabajoService
+from .vista_previa_service import VistaPreviaService
+
+# Registra las tareas de segundo plano en TrabajoService
+from . import tareas
 
 __all__ = [
+    'AlmacenService',
     'AuthService',
     'DocumentoService',
+    'EstadisticasService',
+    'ImportacionService',
+    'ManifiestoService',
     'MatriculaService',
-    'ReporteService'
+    'OptimizacionService',
+    'PaqueteService',
+    'ReporteService',
+    'TrabajoService',
+    'VistaPreviaService'
 ]
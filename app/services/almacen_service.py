@@ -0,0 +1,166 @@
+from app.models import db, Documento
+from app.utils.helpers import resolver_ruta_documento
+from app.utils.ingesta import ingerir_archivo, EXTENSION_POR_MIME
+from flask import current_app
+import os
+import uuid
+
+class AlmacenService:
+    """
+    Almacén de documentos direccionado por contenido
+
+    Cada contenido se guarda una sola vez en
+    ALMACEN_FOLDER/<2 primeros caracteres del hash>/<2 siguientes>/<sha256>.<ext>
+    (dos niveles de carpetas para que ninguna acumule demasiados archivos).
+    Documento.ruta_archivo guarda esa ruta relativa a BASE_DIR, de modo que se
+    resuelve con resolver_ruta_documento sin depender de nombres de aprendiz,
+    grupo o programa, y el mismo certificado cargado por muchos aprendices
+    ocupa el disco una sola vez.
+
+    Las referencias de un archivo son los Documentos que lo apuntan, como archivo
+    actual (consulta por el índice de sha256) u original conservado al
+    optimizarlo: el archivo se elimina cuando se borra el último.
+
+    Una carga y un borrado del mismo contenido pueden cruzarse, así que:
+    - guardar publica el contenido pero conserva la copia recibida, y quien
+      guarda llama a confirmar después de su commit (si el archivo se eliminó
+      entretanto, la copia lo repone);
+    - los archivos se eliminan después del commit que quitó su última
+      referencia (eliminar_si_huerfano), apartándolos primero para volver a
+      consultar sin que una carga concurrente los encuentre.
+    """
+
+    @staticmethod
+    def _carpeta():
+        return current_app.config['ALMACEN_FOLDER']
+
+    @staticmethod
+    def carpeta_temporal():
+        """Carpeta de recepción, dentro del almacén para poder mover los archivos sin copiarlos"""
+        carpeta = os.path.join(AlmacenService._carpeta(), '.recepcion')
+        os.makedirs(carpeta, exist_ok=True)
+        return carpeta
+
+    @staticmethod
+    def ruta_relativa(sha256, extension):
+        """Valor de Documento.ruta_archivo para un contenido (separador '/')"""
+        base = os.path.relpath(AlmacenService._carpeta(), current_app.config['BASE_DIR']).replace(os.sep, '/')
+        return f'{base}/{sha256[:2]}/{sha256[2:4]}/{sha256}.{extension}'
+
+    @staticmethod
+    def es_del_almacen(ruta_archivo):
+        """Indica si una ruta de documento ya apunta al almacén"""
+        base = os.path.relpath(AlmacenService._carpeta(), current_app.config['BASE_DIR']).replace(os.sep, '/')
+        return ruta_archivo.replace(os.sep, '/').startswith(f'{base}/')
+
+    @staticmethod
+    def _destino(archivo):
+        ruta_archivo = AlmacenService.ruta_relativa(archivo.sha256, EXTENSION_POR_MIME[archivo.mime_type])
+        return ruta_archivo, resolver_ruta_documento(ruta_archivo)
+
+    @staticmethod
+    def guardar(archivo):
+        """
+        Publica un ArchivoIngerido en el almacén (si el contenido no estaba)
+        La copia recibida se conserva hasta confirmar() o descartar()
+
+        Returns: (ruta_archivo, nuevo)
+        """
+        ruta_archivo, destino = AlmacenService._destino(archivo)
+
+        if os.path.exists(destino):
+            return ruta_archivo, False
+
+        archivo.enlazar(destino)
+        return ruta_archivo, True
+
+    @staticmethod
+    def confirmar(archivo):
+        """
+        Llamar después del commit del Documento que usa un archivo guardado:
+        descarta la copia recibida, o la deja como archivo del almacén si un
+        borrado concurrente lo eliminó entretanto
+        """
+        _, destino = AlmacenService._destino(archivo)
+        if os.path.exists(destino):
+            archivo.descartar()
+        elif os.path.exists(archivo.ruta_temporal):
+            archivo.mover(destino)
+
+    @staticmethod
+    def recibir(file):
+        """
+        Recibe un archivo cargado (FileStorage) y lo guarda en el almacén
+        Después del commit del Documento llamar a confirmar(archivo); si falla, a archivo.descartar()
+
+        Returns:
+            (ruta_archivo, ArchivoIngerido) o (None, None) si no hay archivo
+
+        Raises:
+            ErrorIngesta: Si el contenido no es un PDF, JPG o PNG acorde a su extensión
+        """
+        if not file:
+            return None, None
+
+        extension = file.filename.rsplit('.', 1)[1] if '.' in file.filename else ''
+        archivo = ingerir_archivo(file.stream, AlmacenService.carpeta_temporal(), extension)
+
+        ruta_archivo, nuevo = AlmacenService.guardar(archivo)
+        if not nuevo:
+            current_app.logger.info(f"Contenido repetido: se reutiliza {ruta_archivo}")
+        return ruta_archivo, archivo
+
+    @staticmethod
+    def referencias(ruta_archivo):
+        """Número de Documentos que usan un archivo (como archivo actual u original)"""
+        actuales = Documento.query.filter(Documento.ruta_archivo == ruta_archivo)
+        originales = Documento.query.filter(Documento.ruta_original == ruta_archivo)
+
+        # En el almacén el nombre del archivo es el hash: se consulta por su índice
+        if AlmacenService.es_del_almacen(ruta_archivo):
+            sha256 = os.path.splitext(os.path.basename(ruta_archivo))[0]
+            actuales = actuales.filter(Documento.sha256 == sha256)
+
+        return actuales.count() + originales.count()
+
+    @staticmethod
+    def eliminar_si_huerfano(ruta_archivo):
+        """
+        Elimina un archivo si ningún Documento lo usa
+        Llamar después del commit que quitó su última referencia
+
+        Returns: True si se eliminó el archivo
+        """
+        if not ruta_archivo or AlmacenService.referencias(ruta_archivo):
+            return False
+
+        ruta = resolver_ruta_documento(ruta_archivo)
+        apartado = f'{ruta}.{uuid.uuid4().hex}.eliminar'
+        try:
+            os.rename(ruta, apartado)
+        except FileNotFoundError:
+            return False
+
+        # Una carga que reutilizó el contenido pudo confirmarse entre la consulta y
+        # el renombre: se consulta de nuevo (en otra transacción) y, si ya lo usa,
+        # se repone. Las cargas posteriores al renombre no lo encuentran y reponen
+        # su propia copia al confirmar
+        db.session.commit()
+        if AlmacenService.referencias(ruta_archivo):
+            os.replace(apartado, ruta)
+            return False
+
+        os.remove(apartado)
+        return True
+
+    @staticmethod
+    def liberar(*rutas_archivo):
+        """
+        Elimina los archivos que ya ningún Documento usa, después del commit que
+        borró o cambió sus documentos (un error aquí no revierte ese commit)
+        """
+        for ruta_archivo in rutas_archivo:
+            try:
+                AlmacenService.eliminar_si_huerfano(ruta_archivo)
+            except OSError as e:
+                current_app.logger.warning(f"No se pudo eliminar el archivo {ruta_archivo}: {e}")
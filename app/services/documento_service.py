@@ -1,7 +1,10 @@
 from app.models import db, Documento
-from app.utils.helpers import save_uploaded_file
+from app.services.almacen_service import AlmacenService
+from app.services.optimizacion_service import OptimizacionService
+from app.services.vista_previa_service import VistaPreviaService
+from app.utils.imagen_pdf import eliminar_de_cache
+from app.utils.ingesta import ErrorIngesta
 from flask import current_app
-import os
 
 class DocumentoService:
     """Servicio para manejo de documentos"""
@@ -12,11 +15,10 @@ class DocumentoService:
         Carga un documento
         Returns: (success, message, documento)
         """
+        archivo = None
         try:
-            aprendiz = matricula.aprendiz
-
-            # Guardar el archivo
-            file_path = save_uploaded_file(file, aprendiz, tipo_documento)
+            # Guardar el archivo (una sola vez por contenido)
+            file_path, archivo = AlmacenService.recibir(file)
             if not file_path:
                 return False, 'Error al guardar el archivo', None
 
@@ -33,8 +35,10 @@ class DocumentoService:
                     tipo_documento=tipo_documento,
                     nombre_archivo=file.filename,
                     ruta_archivo=file_path,
-                    tamaño_bytes=os.path.getsize(file_path),
-                    extension=file.filename.rsplit('.', 1)[1].lower() if '.' in file.filename else ''
+                    tamaño_bytes=archivo.tamano,
+                    extension=file.filename.rsplit('.', 1)[1].lower() if '.' in file.filename else '',
+                    sha256=archivo.sha256,
+                    mime_type=archivo.mime_type
                 )
                 db.session.add(nuevo_doc)
                 db.session.flush()
@@ -48,32 +52,41 @@ class DocumentoService:
                     tipo_documento=tipo_documento,
                     nombre_archivo=file.filename,
                     ruta_archivo=file_path,
-                    tamaño_bytes=os.path.getsize(file_path),
-                    extension=file.filename.rsplit('.', 1)[1].lower() if '.' in file.filename else ''
+                    tamaño_bytes=archivo.tamano,
+                    extension=file.filename.rsplit('.', 1)[1].lower() if '.' in file.filename else '',
+                    sha256=archivo.sha256,
+                    mime_type=archivo.mime_type
                 )
                 db.session.add(documento)
 
             db.session.commit()
+            AlmacenService.confirmar(archivo)
+            OptimizacionService.programar(documento.id)
             return True, 'Documento cargado exitosamente', documento
 
+        except ErrorIngesta as e:
+            return False, str(e), None
+
         except Exception as e:
             db.session.rollback()
+            if archivo:
+                archivo.descartar()
             current_app.logger.error(f"Error al cargar documento: {e}")
             return False, f'Error al cargar documento: {str(e)}', None
 
     @staticmethod
     def replace_documento(documento_id, file, user_id):
         """Reemplaza un documento existente (usado por docentes)"""
+        archivo = None
         try:
             doc_original = Documento.query.get(documento_id)
             if not doc_original:
                 return False, 'Documento no encontrado', None
 
-            aprendiz = doc_original.matricula.aprendiz
             tipo_documento = doc_original.tipo_documento
 
-            # Guardar el nuevo archivo
-            file_path = save_uploaded_file(file, aprendiz, tipo_documento)
+            # Guardar el nuevo archivo (una sola vez por contenido)
+            file_path, archivo = AlmacenService.recibir(file)
             if not file_path:
                 return False, 'Error al guardar el archivo', None
 
@@ -83,8 +96,10 @@ class DocumentoService:
                 tipo_documento=tipo_documento,
                 nombre_archivo=file.filename,
                 ruta_archivo=file_path,
-                tamaño_bytes=os.path.getsize(file_path),
+                tamaño_bytes=archivo.tamano,
                 extension=file.filename.rsplit('.', 1)[1].lower() if '.' in file.filename else '',
+                sha256=archivo.sha256,
+                mime_type=archivo.mime_type,
                 # Al crear un reemplazo debe quedar como pendiente de revisión
                 validado=None
             )
@@ -95,10 +110,17 @@ class DocumentoService:
             doc_original.reemplazado_por = nuevo_doc.id
 
             db.session.commit()
+            AlmacenService.confirmar(archivo)
+            OptimizacionService.programar(nuevo_doc.id)
             return True, 'Documento reemplazado exitosamente', nuevo_doc
 
+        except ErrorIngesta as e:
+            return False, str(e), None
+
         except Exception as e:
             db.session.rollback()
+            if archivo:
+                archivo.descartar()
             current_app.logger.error(f"Error al reemplazar documento: {e}")
             return False, f'Error al reemplazar documento: {str(e)}', None
 
@@ -131,12 +153,14 @@ class DocumentoService:
             if not documento:
                 return False, 'Documento no encontrado'
 
-            # Eliminar archivo físico
-            if os.path.exists(documento.ruta_archivo):
-                os.remove(documento.ruta_archivo)
-
+            rutas = (documento.ruta_archivo, documento.ruta_original)
             db.session.delete(documento)
             db.session.commit()
+
+            # Eliminar archivo físico (si ningún otro documento con el mismo contenido lo usa)
+            AlmacenService.liberar(*rutas)
+            eliminar_de_cache(current_app.config['IMAGENES_PDF_CACHE'], documento_id)
+            VistaPreviaService.eliminar(documento_id)
             return True, 'Documento eliminado exitosamente'
 
         except Exception as e:
@@ -0,0 +1,172 @@
+from app.models import db, Usuario, Aprendiz, Colegio, Programa, Matricula, Documento, DocumentoSIMAT
+from sqlalchemy import func, case
+
+ESTADOS_MATRICULA = ['BORRADOR', 'ENVIADO', 'PENDIENTE', 'COMPLETO', 'PREMATRICULA', 'MATRICULADO', 'RECHAZADO']
+
+class EstadisticasService:
+    """Servicio para el cálculo agregado de estadísticas de los dashboards"""
+
+    @staticmethod
+    def _conteo(modelo, *condiciones):
+        """Subconsulta escalar COUNT(*) sobre el modelo con las condiciones indicadas"""
+        query = db.session.query(func.count()).select_from(modelo)
+        if condiciones:
+            query = query.filter(*condiciones)
+        return query.scalar_subquery()
+
+    @staticmethod
+    def _conteo_por_estado(columna_estado, estados):
+        """Columnas SUM(CASE ...) con el conteo de cada estado, etiquetadas en minúscula"""
+        return [
+            func.coalesce(func.sum(case((columna_estado == estado, 1), else_=0)), 0).label(estado.lower())
+            for estado in estados
+        ]
+
+    @staticmethod
+    def get_conteos(modelo, condiciones=None, *filtros):
+        """
+        Cuenta los registros de un listado y sus subconjuntos en una sola consulta
+
+        Args:
+            modelo: Modelo sobre el que se cuenta
+            condiciones: dict {etiqueta: condición} con los subconjuntos a contar
+            *filtros: Filtros aplicados a todo el listado
+
+        Returns: dict con 'total' y una entrada por cada etiqueta de condiciones
+        """
+        condiciones = condiciones or {}
+        query = db.session.query(
+            func.count().label('total'),
+            *[
+                func.coalesce(func.sum(case((condicion, 1), else_=0)), 0).label(etiqueta)
+                for etiqueta, condicion in condiciones.items()
+            ]
+        ).select_from(modelo)
+        if filtros:
+            query = query.filter(*filtros)
+
+        fila = query.one()
+        return {etiqueta: int(valor or 0) for etiqueta, valor in fila._mapping.items()}
+
+    @staticmethod
+    def get_estadisticas_admin():
+        """
+        Calcula las estadísticas del dashboard del administrador
+        Usa dos consultas: una con todos los totales y otra con la distribución por programa
+        Returns: dict con los contadores y la lista de programas
+        """
+        _conteo = EstadisticasService._conteo
+
+        # Consulta 1: totales generales + matrículas agrupadas por estado en una sola fila
+        totales = db.session.query(
+            _conteo(Usuario).label('total_usuarios'),
+            _conteo(Aprendiz).label('total_aprendices'),
+            _conteo(Colegio, Colegio.activo == True).label('total_colegios'),
+            _conteo(Programa, Programa.activo == True).label('total_programas'),
+            _conteo(DocumentoSIMAT, DocumentoSIMAT.estado == 'PENDIENTE').label('simat_pendientes'),
+            func.count().label('total_matriculas'),
+            *EstadisticasService._conteo_por_estado(Matricula.estado, ESTADOS_MATRICULA)
+        ).select_from(Matricula).one()
+
+        matriculas_por_estado = {estado: int(getattr(totales, estado.lower())) for estado in ESTADOS_MATRICULA}
+
+        # Consulta 2: distribución de aprendices por programa activo
+        # (se agrupa primero aprendices por programa_id y luego se une con programas)
+        por_programa = db.session.query(
+            Aprendiz.programa_id.label('programa_id'),
+            func.count().label('aprendices_count')
+        ).group_by(Aprendiz.programa_id).subquery()
+
+        distribucion = db.session.query(
+            Programa.nombre,
+            func.coalesce(por_programa.c.aprendices_count, 0)
+        ).outerjoin(
+            por_programa, por_programa.c.programa_id == Programa.id
+        ).filter(
+            Programa.activo == True
+        ).order_by(Programa.id).all()
+
+        return {
+            'total_usuarios': totales.total_usuarios,
+            'total_aprendices': totales.total_aprendices,
+            'total_colegios': totales.total_colegios,
+            'total_programas': totales.total_programas,
+            'total_matriculas': totales.total_matriculas,
+            'matriculas_por_estado': matriculas_por_estado,
+            'matriculas_pendientes': matriculas_por_estado['ENVIADO'] + matriculas_por_estado['PENDIENTE'],
+            'simat_pendientes': totales.simat_pendientes,
+            'programas': [
+                {'nombre': nombre, 'aprendices_count': aprendices_count}
+                for nombre, aprendices_count in distribucion
+            ]
+        }
+
+    @staticmethod
+    def get_estadisticas_colegio(colegio_id):
+        """
+        Calcula las estadísticas de matrículas y documentos de un colegio
+        Una sola consulta (GROUP BY implícito por estado) sin importar el tamaño del colegio
+        Returns: dict con total, conteo por estado y documentos pendientes de revisión
+        """
+        documentos_pendientes = db.session.query(func.count(Documento.id)).join(
+            Matricula, Documento.matricula_id == Matricula.id
+        ).join(
+            Aprendiz, Matricula.aprendiz_id == Aprendiz.id
+        ).filter(
+            Aprendiz.colegio_id == colegio_id,
+            Documento.validado.is_(None),
+            Documento.reemplazado_por.is_(None)
+        ).scalar_subquery()
+
+        fila = db.session.query(
+            func.count(Matricula.id).label('total_matriculas'),
+            documentos_pendientes.label('documentos_pendientes'),
+            *EstadisticasService._conteo_por_estado(Matricula.estado, ESTADOS_MATRICULA)
+        ).select_from(Matricula).join(
+            Aprendiz, Matricula.aprendiz_id == Aprendiz.id
+        ).filter(Aprendiz.colegio_id == colegio_id).one()
+
+        return {
+            'total_matriculas': fila.total_matriculas,
+            'matriculas_por_estado': {estado: int(getattr(fila, estado.lower())) for estado in ESTADOS_MATRICULA},
+            'documentos_pendientes': fila.documentos_pendientes
+        }
+
+    @staticmethod
+    def get_estadisticas_aprendices(colegio_id):
+        """
+        Conteos del listado de aprendices de un colegio en una sola consulta
+        Returns: dict con total, con_matricula, sin_matricula y activos
+        """
+        tiene_matricula = Aprendiz.matriculas.any()
+
+        fila = db.session.query(
+            func.count(Aprendiz.id).label('total'),
+            func.coalesce(func.sum(case((tiene_matricula, 1), else_=0)), 0).label('con_matricula'),
+            func.coalesce(func.sum(case((Usuario.activo == True, 1), else_=0)), 0).label('activos')
+        ).select_from(Aprendiz).join(
+            Usuario, Aprendiz.usuario_id == Usuario.id
+        ).filter(Aprendiz.colegio_id == colegio_id).one()
+
+        return {
+            'total': fila.total,
+            'con_matricula': int(fila.con_matricula),
+            'sin_matricula': fila.total - int(fila.con_matricula),
+            'activos': int(fila.activos)
+        }
+
+    @staticmethod
+    def get_estadisticas_docente(colegio_id):
+        """
+        Estadísticas del dashboard del docente enlace
+        Returns: dict con la misma estructura que espera docente/dashboard.html
+        """
+        datos = EstadisticasService.get_estadisticas_colegio(colegio_id)
+        por_estado = datos['matriculas_por_estado']
+
+        return {
+            'total_matriculas': datos['total_matriculas'],
+            'matriculas_pendientes': por_estado['ENVIADO'] + por_estado['PENDIENTE'],
+            'matriculas_validadas': por_estado['COMPLETO'] + por_estado['PREMATRICULA'],
+            'documentos_pendientes': datos['documentos_pendientes']
+        }
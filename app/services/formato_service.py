@@ -2,14 +2,18 @@
 Servicio para generación de formatos con datos del aprendiz y acudiente
 """
 import os
+import re
+import shutil
 import tempfile
+import zipfile
 from datetime import datetime
-from docx import Document
-from docx.shared import Pt, RGBColor
-from docx.enum.text import WD_PARAGRAPH_ALIGNMENT
 from PyPDF2 import PdfMerger
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import letter
+from flask import current_app
+from app.utils.pdf_unificado import unificar_pdfs
+from app.utils.imagen_pdf import es_imagen, convertir_imagenes
+from app.utils.plantilla_docx import obtener_plantilla
+from app.utils.conversion_pdf import obtener_convertidor
+from app.utils.helpers import resolver_ruta_documento
 from reportlab.lib.styles import getSampleStyleSheet
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, PageBreak
 from reportlab.lib.units import inch
@@ -17,9 +21,22 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+# Extensión de un formato generado -> tipo MIME (PDF si se pudo convertir, si no DOCX)
+MIMETYPES_FORMATO = {
+    '.pdf': 'application/pdf',
+    '.docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+}
+
+# Aprendices cuyos formatos se convierten juntos (en paralelo) al generar los de un grupo
+APRENDICES_POR_LOTE = 20
+
 def convert_docx_to_pdf(docx_path):
     """
-    Convierte un archivo DOCX a PDF usando docx2pdf
+    Convierte un archivo DOCX a PDF
+
+    Usa LibreOffice headless (pool de workers precalentados) si está instalado;
+    si no, docx2pdf (requiere Microsoft Word). Si ninguno está disponible o la
+    conversión falla, retorna el DOCX sin convertir.
 
     Args:
         docx_path: Ruta del archivo DOCX
@@ -28,13 +45,17 @@ def convert_docx_to_pdf(docx_path):
         str: Ruta del archivo PDF generado
     """
     try:
-        from docx2pdf import convert
+        convertidor = obtener_convertidor(current_app.config)
+        if convertidor:
+            pdf_path = convertidor.convertir(docx_path)
+        else:
+            from docx2pdf import convert
 
-        # Generar nombre del PDF (mismo nombre pero con extensión .pdf)
-        pdf_path = docx_path.replace('.docx', '.pdf')
+            # Generar nombre del PDF (mismo nombre pero con extensión .pdf)
+            pdf_path = docx_path.replace('.docx', '.pdf')
 
-        # Convertir
-        convert(docx_path, pdf_path)
+            # Convertir
+            convert(docx_path, pdf_path)
 
         # Eliminar el archivo DOCX original
         if os.path.exists(docx_path):
@@ -43,7 +64,7 @@ def convert_docx_to_pdf(docx_path):
         return pdf_path
 
     except ImportError:
-        logger.warning("docx2pdf no está instalado, retornando DOCX sin convertir")
+        logger.warning("Ni LibreOffice ni docx2pdf están instalados, retornando DOCX sin convertir")
         return docx_path
     except Exception as e:
         logger.error(f"Error al convertir DOCX a PDF: {str(e)}, retornando DOCX")
@@ -67,25 +88,43 @@ def remove_all_highlights(doc):
                     for run in paragraph.runs:
                         run.font.highlight_color = None
 
-def replace_text_in_paragraph(paragraph, replacements):
+class Reemplazos:
     """
-    Reemplaza texto en un párrafo de forma optimizada
-    Procesa todos los reemplazos en una sola pasada
+    Diccionario de reemplazos compilado en una sola expresión regular
+
+    Las claves se prueban de la más larga a la más corta, así que en cada
+    posición gana la coincidencia más larga ('Numero de Ficha' antes que
+    'Ficha') y el resultado no depende del orden del diccionario. El texto ya
+    reemplazado no se vuelve a examinar.
     """
-    full_text = paragraph.text
 
-    # Verificar si hay algo que reemplazar
-    needs_replacement = any(key in full_text for key in replacements.keys())
+    def __init__(self, replacements):
+        # Una clave vacía coincidiría en cada posición: se ignora
+        self.valores = {key: str(value) for key, value in replacements.items() if key}
+        claves = sorted(self.valores, key=len, reverse=True)
+        self.patron = re.compile('|'.join(re.escape(key) for key in claves)) if claves else None
+
+    def aplicar(self, texto):
+        """Retorna (texto reemplazado, número de reemplazos)"""
+        if self.patron is None:
+            return texto, 0
+        return self.patron.subn(lambda coincidencia: self.valores[coincidencia.group(0)], texto)
+
+def replace_text_in_paragraph(paragraph, replacements):
+    """
+    Reemplaza texto en un párrafo en una sola pasada
 
-    if not needs_replacement:
-        return
+    Args:
+        paragraph: Párrafo de python-docx
+        replacements: Reemplazos compilados (o un dict, que se compila en cada llamada)
+    """
+    if not isinstance(replacements, Reemplazos):
+        replacements = Reemplazos(replacements)
 
-    # Hacer todos los reemplazos en el texto completo
-    for key, value in replacements.items():
-        full_text = full_text.replace(key, str(value))
+    full_text, total = replacements.aplicar(paragraph.text)
 
     # Si el texto cambió, actualizar el párrafo
-    if full_text != paragraph.text:
+    if total and full_text != paragraph.text:
         runs = paragraph.runs
         if runs:
             # Limpiar todos los runs excepto el primero
@@ -94,6 +133,181 @@ def replace_text_in_paragraph(paragraph, replacements):
             # Poner todo el texto en el primer run
             runs[0].text = full_text
 
+def _ruta_formato(nombre_archivo):
+    base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    return os.path.join(base_dir, 'formatos', nombre_archivo)
+
+
+def _ruta_salida_temp(output_filename):
+    # Obtener la ruta base del proyecto (ir dos niveles arriba desde este archivo)
+    base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    temp_dir = os.path.join(base_dir, 'temp')
+
+    if not os.path.exists(temp_dir):
+        os.makedirs(temp_dir)
+
+    return os.path.join(temp_dir, output_filename)
+
+
+def _marca_casilla(marcada):
+    return 'X' if marcada else ' '
+
+
+def _preparar_tratamiento_datos(doc, campo):
+    """
+    Compila la plantilla de Tratamiento de Datos: reemplaza los campos
+    resaltados por marcadores, marca las casillas CC/CE y elimina los resaltados
+    """
+    nombre_aprendiz = campo('nombre_aprendiz')
+    documento_aprendiz = campo('documento_aprendiz')
+    tipo_documento_aprendiz = campo('tipo_documento_aprendiz')
+    nombre_acudiente = campo('nombre_acudiente')
+    documento_acudiente = campo('documento_acudiente')
+    tipo_documento_acudiente = campo('tipo_documento_acudiente')
+    lugar_expedicion = campo('lugar_expedicion')
+    direccion_acudiente = campo('direccion_acudiente')
+    telefono_acudiente = campo('telefono_acudiente')
+    email_acudiente = campo('email_acudiente')
+    numero_grupo = campo('numero_grupo')
+    programa_nombre = campo('programa_nombre')
+    fecha_actual = campo('fecha_actual')
+
+    # Campos específicos del formato Tratamiento de Datos
+    # Basados en los campos resaltados identificados
+    replacements = Reemplazos({
+        'Nombre Acudiente': nombre_acudiente,
+        'Numero Documento': documento_acudiente.strip(),  # Eliminar espacios adicionales
+        'Ciudad Documento': lugar_expedicion,
+        'Nombre del aprendiz': nombre_aprendiz,
+        'nombre del aprendiz': nombre_aprendiz,
+        'Tipo de documento del aprendiz': tipo_documento_aprendiz,
+        'número de documento del aprendiz': documento_aprendiz.strip(),
+        'n°mero de documento del aprendiz': documento_aprendiz.strip(),
+        'Numero Documento Aprendiz': documento_aprendiz.strip(),
+        'Tipo Documento aprendiz, numero documento aprendiz': f'{tipo_documento_aprendiz} {documento_aprendiz.strip()}',
+        'Tipo Documento acudiente, numero documento acuediente': f'{tipo_documento_acudiente} {documento_acudiente.strip()}',
+        'Tipo Documento acudiente, numero documento acudiente': f'{tipo_documento_acudiente} {documento_acudiente.strip()}',
+        'Fecha': fecha_actual,
+        'Número Grupo': numero_grupo,
+        'N°mero Grupo': numero_grupo,
+        'Numero Grupo': numero_grupo,
+        'numero grupo': numero_grupo,
+        'numero de grupo': numero_grupo,
+        'número de grupo': numero_grupo,
+        'n°mero de grupo': numero_grupo,
+        'Número de Grupo': numero_grupo,
+        'N°mero de Grupo': numero_grupo,
+        'Numero de Grupo': numero_grupo,
+        'numero de ficha': numero_grupo,
+        'número de ficha': numero_grupo,
+        'Numero de Ficha': numero_grupo,
+        'Número de Ficha': numero_grupo,
+        'N°mero de Ficha': numero_grupo,
+        'ficha': numero_grupo,
+        'Ficha': numero_grupo,
+        'correo acudiente': email_acudiente,
+        'Correo acudiente': email_acudiente,
+        'correo del acudiente': email_acudiente,
+        'Correo del acudiente': email_acudiente,
+        'dirección acudiente': direccion_acudiente,
+        'direcci°n acudiente': direccion_acudiente,
+        'Dirección acudiente': direccion_acudiente,
+        'Direcci°n acudiente': direccion_acudiente,
+        'dirección del acudiente': direccion_acudiente,
+        'Dirección del acudiente': direccion_acudiente,
+        'direcci°n del acudiente': direccion_acudiente,
+        'Direcci°n del acudiente': direccion_acudiente,
+        'Direccion acudiente': direccion_acudiente,
+        'direccion acudiente': direccion_acudiente,
+        'Direccion del acudiente': direccion_acudiente,
+        'direccion del acudiente': direccion_acudiente,
+        'Dirección de contacto: dirección acudiente': f'Dirección de contacto: {direccion_acudiente}',
+        'Dirección de contacto: direcci°n acudiente': f'Dirección de contacto: {direccion_acudiente}',
+        'Direcci°n de contacto: direcci°n acudiente': f'Dirección de contacto: {direccion_acudiente}',
+        'Direcci�n de contacto: direcci�n acudiente': f'Dirección de contacto: {direccion_acudiente}',
+        'Dirección de contacto: dirección acudiente': f'Dirección de contacto: {direccion_acudiente}',
+        'direcci�n acudiente': direccion_acudiente,
+        'Direcci�n acudiente': direccion_acudiente,
+        'Teléfono acudiente': telefono_acudiente,
+        'Telefono acudiente': telefono_acudiente,
+        'teléfono acudiente': telefono_acudiente,
+        'telefono acudiente': telefono_acudiente,
+        'Teléfono del acudiente': telefono_acudiente,
+        'Telefono del acudiente': telefono_acudiente,
+        'teléfono del acudiente': telefono_acudiente,
+        'telefono del acudiente': telefono_acudiente,
+        'ANÁLISIS Y DESARROLLO DE SOFTWARE ': programa_nombre,
+        'AN…LISIS Y DESARROLLO DE SOFTWARE ': programa_nombre,
+        'ANALISIS Y DESARROLLO DE SOFTWARE': programa_nombre,
+        'Análisis y Desarrollo de Software': programa_nombre,
+    })
+
+    # Procesar documento en UNA SOLA PASADA (optimizado)
+    checkbox_procesado = False
+
+    # Procesar párrafos (checkboxes primero, luego reemplazos + highlights en una pasada)
+    for paragraph in doc.paragraphs:
+        # 1. Casillas Ciudadanía / Extranjería PRIMERO (antes de modificar runs con reemplazos)
+        if not checkbox_procesado:
+            text = paragraph.text
+            if 'Ciudadan' in text and 'Extranjer' in text:
+                x_runs = [i for i, run in enumerate(paragraph.runs) if run.text.strip().lower() == 'x']
+
+                if len(x_runs) == 2:
+                    cc_run_idx, ce_run_idx = x_runs[0], x_runs[1]
+                    paragraph.runs[cc_run_idx].text = campo('casilla_cc')
+                    paragraph.runs[ce_run_idx].text = campo('casilla_ce')
+                    checkbox_procesado = True
+
+        # 2. Reemplazar texto (después de checkboxes)
+        replace_text_in_paragraph(paragraph, replacements)
+
+        # 3. Eliminar highlights
+        for run in paragraph.runs:
+            run.font.highlight_color = None
+
+    # Procesar tablas (reemplazos + highlights en una pasada)
+    for table in doc.tables:
+        for row in table.rows:
+            for cell in row.cells:
+                for paragraph in cell.paragraphs:
+                    replace_text_in_paragraph(paragraph, replacements)
+                    # Eliminar highlights
+                    for run in paragraph.runs:
+                        run.font.highlight_color = None
+
+
+def _valores_tratamiento_datos(aprendiz):
+    """Valores de los campos de la plantilla de Tratamiento de Datos"""
+    # Datos del aprendiz (convertir None a string vacío)
+    nombre_aprendiz = str(aprendiz.usuario.nombre_completo or "") if aprendiz and aprendiz.usuario else ""
+    documento_aprendiz = str(aprendiz.usuario.documento or "") if aprendiz and aprendiz.usuario else ""
+    tipo_documento_aprendiz = str(aprendiz.usuario.tipo_documento or "") if aprendiz and aprendiz.usuario else ""
+
+    # Datos del acudiente (están en el modelo Aprendiz - convertir None a string vacío)
+    tipo_documento_acudiente = str(aprendiz.acudiente_tipo_doc or "") if aprendiz else ""
+
+    return {
+        'nombre_aprendiz': nombre_aprendiz,
+        'documento_aprendiz': documento_aprendiz.strip(),  # Eliminar espacios adicionales
+        'tipo_documento_aprendiz': tipo_documento_aprendiz,
+        'nombre_acudiente': str(aprendiz.acudiente_nombre_completo or "") if aprendiz else "",
+        'documento_acudiente': (str(aprendiz.acudiente_documento or "") if aprendiz else "").strip(),
+        'tipo_documento_acudiente': tipo_documento_acudiente,
+        'lugar_expedicion': str(aprendiz.acudiente_lugar_expedicion or "") if aprendiz else "",
+        'direccion_acudiente': str(aprendiz.acudiente_direccion or "") if aprendiz else "",
+        'telefono_acudiente': str(aprendiz.acudiente_telefono or "") if aprendiz else "",
+        'email_acudiente': str(aprendiz.acudiente_email or "") if aprendiz else "",
+        # Datos académicos
+        'numero_grupo': str(aprendiz.grupo.nombre or "") if aprendiz and aprendiz.grupo else "",
+        'programa_nombre': str(aprendiz.programa.nombre or "ANÁLISIS Y DESARROLLO DE SOFTWARE") if aprendiz and aprendiz.programa else "ANÁLISIS Y DESARROLLO DE SOFTWARE",
+        'fecha_actual': datetime.now().strftime('%d/%m/%Y'),
+        # Casillas Ciudadanía (CC) / Extranjería (CE, PPT, PEP)
+        'casilla_cc': _marca_casilla(tipo_documento_acudiente == 'CC'),
+        'casilla_ce': _marca_casilla(tipo_documento_acudiente in ['CE', 'PPT', 'PEP']),
+    }
+
+
 def generar_formato_tratamiento_datos(aprendiz):
     """
     Genera el formato de Tratamiento de Datos con los campos resaltados autocompletados
@@ -105,164 +319,175 @@ def generar_formato_tratamiento_datos(aprendiz):
         str: Ruta del archivo generado
     """
     try:
-        # Cargar la plantilla base
-        template_path = os.path.join('formatos', 'Tratamiento de Datos.docx')
-        doc = Document(template_path)
+        # Plantilla compilada una vez por proceso
+        plantilla = obtener_plantilla(_ruta_formato('Tratamiento de Datos.docx'), _preparar_tratamiento_datos)
+        valores = _valores_tratamiento_datos(aprendiz)
+
+        logger.info(f"Generando formato de tratamiento de datos para {valores['nombre_aprendiz']}")
 
-        # Datos del aprendiz (convertir None a string vacío)
-        nombre_aprendiz = str(aprendiz.usuario.nombre_completo or "") if aprendiz and aprendiz.usuario else ""
         documento_aprendiz = str(aprendiz.usuario.documento or "") if aprendiz and aprendiz.usuario else ""
-        tipo_documento_aprendiz = str(aprendiz.usuario.tipo_documento or "") if aprendiz and aprendiz.usuario else ""
+        output_filename = f"Tratamiento_Datos_{documento_aprendiz}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.docx"
 
-        # Datos del acudiente (están en el modelo Aprendiz - convertir None a string vacío)
-        nombre_acudiente = str(aprendiz.acudiente_nombre_completo or "") if aprendiz else ""
-        documento_acudiente = str(aprendiz.acudiente_documento or "") if aprendiz else ""
-        tipo_documento_acudiente = str(aprendiz.acudiente_tipo_doc or "") if aprendiz else ""
-        lugar_expedicion = str(aprendiz.acudiente_lugar_expedicion or "") if aprendiz else ""
-        direccion_acudiente = str(aprendiz.acudiente_direccion or "") if aprendiz else ""
-        telefono_acudiente = str(aprendiz.acudiente_telefono or "") if aprendiz else ""
-        email_acudiente = str(aprendiz.acudiente_email or "") if aprendiz else ""
+        # Retornar el archivo DOCX (más rápido que convertir a PDF)
+        return plantilla.guardar(valores, _ruta_salida_temp(output_filename))
 
-        # Datos académicos
-        numero_grupo = str(aprendiz.grupo.nombre or "") if aprendiz and aprendiz.grupo else ""
-        programa_nombre = str(aprendiz.programa.nombre or "ANÁLISIS Y DESARROLLO DE SOFTWARE") if aprendiz and aprendiz.programa else "ANÁLISIS Y DESARROLLO DE SOFTWARE"
+    except Exception as e:
+        raise Exception(f"Error al generar formato de tratamiento de datos: {str(e)}")
 
-        # Fecha actual
-        fecha_actual = datetime.now().strftime('%d/%m/%Y')
-
-        # Campos específicos del formato Tratamiento de Datos
-        # Basados en los campos resaltados identificados
-        replacements = {
-            'Nombre Acudiente': nombre_acudiente,
-            'Numero Documento': documento_acudiente.strip(),  # Eliminar espacios adicionales
-            'Ciudad Documento': lugar_expedicion,
-            'Nombre del aprendiz': nombre_aprendiz,
-            'nombre del aprendiz': nombre_aprendiz,
-            'Tipo de documento del aprendiz': tipo_documento_aprendiz,
-            'número de documento del aprendiz': documento_aprendiz.strip(),
-            'n°mero de documento del aprendiz': documento_aprendiz.strip(),
-            'Numero Documento Aprendiz': documento_aprendiz.strip(),
-            'Tipo Documento aprendiz, numero documento aprendiz': f'{tipo_documento_aprendiz} {documento_aprendiz.strip()}',
-            'Tipo Documento acudiente, numero documento acuediente': f'{tipo_documento_acudiente} {documento_acudiente.strip()}',
-            'Tipo Documento acudiente, numero documento acudiente': f'{tipo_documento_acudiente} {documento_acudiente.strip()}',
-            'Fecha': fecha_actual,
-            'Número Grupo': numero_grupo,
-            'N°mero Grupo': numero_grupo,
-            'Numero Grupo': numero_grupo,
-            'numero grupo': numero_grupo,
-            'numero de grupo': numero_grupo,
-            'número de grupo': numero_grupo,
-            'n°mero de grupo': numero_grupo,
-            'Número de Grupo': numero_grupo,
-            'N°mero de Grupo': numero_grupo,
-            'Numero de Grupo': numero_grupo,
-            'numero de ficha': numero_grupo,
-            'número de ficha': numero_grupo,
-            'Numero de Ficha': numero_grupo,
-            'Número de Ficha': numero_grupo,
-            'N°mero de Ficha': numero_grupo,
-            'ficha': numero_grupo,
-            'Ficha': numero_grupo,
-            'correo acudiente': email_acudiente,
-            'Correo acudiente': email_acudiente,
-            'correo del acudiente': email_acudiente,
-            'Correo del acudiente': email_acudiente,
-            'dirección acudiente': direccion_acudiente,
-            'direcci°n acudiente': direccion_acudiente,
-            'Dirección acudiente': direccion_acudiente,
-            'Direcci°n acudiente': direccion_acudiente,
-            'dirección del acudiente': direccion_acudiente,
-            'Dirección del acudiente': direccion_acudiente,
-            'direcci°n del acudiente': direccion_acudiente,
-            'Direcci°n del acudiente': direccion_acudiente,
-            'Direccion acudiente': direccion_acudiente,
-            'direccion acudiente': direccion_acudiente,
-            'Direccion del acudiente': direccion_acudiente,
-            'direccion del acudiente': direccion_acudiente,
-            'Dirección de contacto: dirección acudiente': f'Dirección de contacto: {direccion_acudiente}',
-            'Dirección de contacto: direcci°n acudiente': f'Dirección de contacto: {direccion_acudiente}',
-            'Direcci°n de contacto: direcci°n acudiente': f'Dirección de contacto: {direccion_acudiente}',
-            'Direcci�n de contacto: direcci�n acudiente': f'Dirección de contacto: {direccion_acudiente}',
-            'Dirección de contacto: dirección acudiente': f'Dirección de contacto: {direccion_acudiente}',
-            'direcci�n acudiente': direccion_acudiente,
-            'Direcci�n acudiente': direccion_acudiente,
-            'Teléfono acudiente': telefono_acudiente,
-            'Telefono acudiente': telefono_acudiente,
-            'teléfono acudiente': telefono_acudiente,
-            'telefono acudiente': telefono_acudiente,
-            'Teléfono del acudiente': telefono_acudiente,
-            'Telefono del acudiente': telefono_acudiente,
-            'teléfono del acudiente': telefono_acudiente,
-            'telefono del acudiente': telefono_acudiente,
-            'ANÁLISIS Y DESARROLLO DE SOFTWARE ': programa_nombre,
-            'AN…LISIS Y DESARROLLO DE SOFTWARE ': programa_nombre,
-            'ANALISIS Y DESARROLLO DE SOFTWARE': programa_nombre,
-            'Análisis y Desarrollo de Software': programa_nombre,
-        }
-
-        logger.info(f"Generando formato de tratamiento de datos para {nombre_aprendiz}")
-
-        # Procesar documento en UNA SOLA PASADA (optimizado)
-        checkbox_procesado = False
-
-        # Procesar párrafos (checkboxes primero, luego reemplazos + highlights en una pasada)
-        for paragraph in doc.paragraphs:
-            # 1. Marcar checkboxes PRIMERO (antes de modificar runs con reemplazos)
-            if not checkbox_procesado:
-                text = paragraph.text
-                if 'Ciudadan' in text and 'Extranjer' in text:
-                    x_runs = [i for i, run in enumerate(paragraph.runs) if run.text.strip().lower() == 'x']
-
-                    if len(x_runs) == 2:
-                        cc_run_idx, ce_run_idx = x_runs[0], x_runs[1]
-
-                        if tipo_documento_acudiente == 'CC':
-                            paragraph.runs[cc_run_idx].text = 'X'
-                            paragraph.runs[ce_run_idx].text = ' '
-                        elif tipo_documento_acudiente in ['CE', 'PPT', 'PEP']:
-                            paragraph.runs[cc_run_idx].text = ' '
-                            paragraph.runs[ce_run_idx].text = 'X'
-                        else:
-                            paragraph.runs[cc_run_idx].text = ' '
-                            paragraph.runs[ce_run_idx].text = ' '
-
-                        checkbox_procesado = True
-
-            # 2. Reemplazar texto (después de checkboxes)
-            replace_text_in_paragraph(paragraph, replacements)
-
-            # 3. Eliminar highlights
-            for run in paragraph.runs:
-                run.font.highlight_color = None
-
-        # Procesar tablas (reemplazos + highlights en una pasada)
-        for table in doc.tables:
-            for row in table.rows:
-                for cell in row.cells:
-                    for paragraph in cell.paragraphs:
-                        replace_text_in_paragraph(paragraph, replacements)
-                        # Eliminar highlights
-                        for run in paragraph.runs:
-                            run.font.highlight_color = None
-
-        # Guardar el documento generado
-        # Obtener la ruta base del proyecto (ir dos niveles arriba desde este archivo)
-        base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-        temp_dir = os.path.join(base_dir, 'temp')
 
-        if not os.path.exists(temp_dir):
-            os.makedirs(temp_dir)
+# Casillas de tipo de documento del aprendiz en el formato de Compromiso
+CASILLAS_TIPO_DOCUMENTO = ['TI', 'CC', 'PPT', 'CE', 'PEP']
 
-        output_filename = f"Tratamiento_Datos_{documento_aprendiz}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.docx"
-        output_path = os.path.join(temp_dir, output_filename)
 
-        doc.save(output_path)
+def _preparar_compromiso_aprendiz(doc, campo):
+    """
+    Compila la plantilla de Compromiso del Aprendiz: reemplaza los campos
+    resaltados por marcadores, marca las casillas de tipo de documento y
+    elimina los resaltados
+    """
+    nombre_aprendiz = campo('nombre_aprendiz')
+    documento_aprendiz = campo('documento_aprendiz')
+    programa_nombre = campo('programa_nombre')
+    grupo_nombre = campo('grupo_nombre')
+    documento_acudiente = campo('documento_acudiente')
+    tipo_documento_acudiente = campo('tipo_documento_acudiente')
+    dia = campo('dia')
+    mes = campo('mes')
+    ano = campo('ano')
+
+    # Campos específicos del formato Compromiso del Aprendiz
+    # Basados en los campos resaltados identificados
+    replacements = Reemplazos({
+        'Nombre aprendiz': nombre_aprendiz,
+        'Nombre\n aprendiz': nombre_aprendiz,
+        ' Nombre aprendiz': nombre_aprendiz,
+        'nombre aprendiz': nombre_aprendiz,
+        'nombre del aprendiz': nombre_aprendiz,
+        'Nombre del aprendiz': nombre_aprendiz,
+        'Número Documento Aprendiz': documento_aprendiz,
+        'N°mero Documento Aprendiz': documento_aprendiz,
+        'Numero Documento aprendiz': documento_aprendiz,
+        'número documento aprendiz': documento_aprendiz,
+        'numero documento aprendiz': documento_aprendiz,
+        # Programa - múltiples variaciones
+        # El template tiene "Matriculado en el programa de formación: nombre del programa o tecnica"
+        # Solo necesitamos reemplazar "nombre del programa o tecnica" por el nombre real
+        'nombre del programa o tecnica': programa_nombre,
+        'Nombre del programa o tecnica': programa_nombre,
+        'nombre del programa o técnica': programa_nombre,
+        'Nombre del programa o técnica': programa_nombre,
+        'NOMBRE DEL PROGRAMA O TECNICA': programa_nombre,
+        'NOMBRE DEL PROGRAMA O TÉCNICA': programa_nombre,
+        'nombre del programa': programa_nombre,
+        'Nombre del programa': programa_nombre,
+        'NOMBRE DEL PROGRAMA': programa_nombre,
+        'nombre programa': programa_nombre,
+        'Nombre programa': programa_nombre,
+        'NOMBRE PROGRAMA': programa_nombre,
+        # Número de ficha/grupo - múltiples variaciones
+        # Nota: "Ficha de Caracterización No." se mantiene como está en la plantilla
+        'Numero de Grupo': grupo_nombre,
+        'N°mero de Grupo': grupo_nombre,
+        'Número de Grupo': grupo_nombre,
+        'numero de grupo': grupo_nombre,
+        'número de grupo': grupo_nombre,
+        'Numero Grupo': grupo_nombre,
+        'Número Grupo': grupo_nombre,
+        'N°mero Grupo': grupo_nombre,
+        'numero grupo': grupo_nombre,
+        'número grupo': grupo_nombre,
+        'ficha de caracterización': grupo_nombre,
+        'Ficha de caracterización': grupo_nombre,
+        'ficha de caracterizacion': grupo_nombre,
+        'Ficha de caracterizacion': grupo_nombre,
+        'numero de ficha': grupo_nombre,
+        'número de ficha': grupo_nombre,
+        'Numero de ficha': grupo_nombre,
+        'Número de ficha': grupo_nombre,
+        'N°mero de ficha': grupo_nombre,
+        'numero ficha': grupo_nombre,
+        'número ficha': grupo_nombre,
+        'Numero ficha': grupo_nombre,
+        'Número ficha': grupo_nombre,
+        # Nota: NO reemplazar "ficha" o "Ficha" genéricamente porque afecta "Ficha de Caracterización No."
+        # Datos del acudiente
+        'Tipo documento acudiente, numero documento acudiente': f'{tipo_documento_acudiente} {documento_acudiente}',
+        # Fechas
+        'dia de hoy': dia,
+        'dia': dia,
+        'día': dia,
+        'Dia': dia,
+        'Día': dia,
+        'mes actual': mes,
+        'Mes actual': mes,
+        'mes': mes,
+        'Mes': mes,
+        'año actual completo': ano,
+        'a°o actual completo': ano,
+        'año actual': ano,
+        'a°o actual': ano,
+        'año': ano,
+        'a°o': ano,
+        'Año': ano,
+        'A°o': ano,
+    })
+
+    # Procesar documento en UNA SOLA PASADA (optimizado)
+    # Procesar párrafos (reemplazos + highlights)
+    for paragraph in doc.paragraphs:
+        replace_text_in_paragraph(paragraph, replacements)
+        # Eliminar highlights
+        for run in paragraph.runs:
+            run.font.highlight_color = None
+
+    # Procesar tablas (reemplazos + checkboxes + highlights en una pasada)
+    for table in doc.tables:
+        for row in table.rows:
+            for cell in row.cells:
+                for paragraph in cell.paragraphs:
+                    # 1. Reemplazar texto
+                    replace_text_in_paragraph(paragraph, replacements)
 
-        # Retornar el archivo DOCX (más rápido que convertir a PDF)
-        return output_path
+                    # 2. Marcar checkboxes
+                    for run in paragraph.runs:
+                        text = run.text.strip()
+                        # Procesar tipos de documento
+                        if text in CASILLAS_TIPO_DOCUMENTO:
+                            run.text = campo(f'casilla_{text}')
 
-    except Exception as e:
-        raise Exception(f"Error al generar formato de tratamiento de datos: {str(e)}")
+                        # 3. Eliminar highlights
+                        run.font.highlight_color = None
+
+
+def _valores_compromiso_aprendiz(aprendiz):
+    """Valores de los campos de la plantilla de Compromiso del Aprendiz"""
+    tipo_documento_aprendiz = str(aprendiz.usuario.tipo_documento or "") if aprendiz and aprendiz.usuario else ""
+    fecha_actual = datetime.now()
+
+    valores = {
+        # Datos del aprendiz (convertir None a string vacío)
+        'nombre_aprendiz': str(aprendiz.usuario.nombre_completo or "") if aprendiz and aprendiz.usuario else "",
+        'documento_aprendiz': str(aprendiz.usuario.documento or "") if aprendiz and aprendiz.usuario else "",
+        # Datos del programa y del grupo
+        'programa_nombre': str(aprendiz.programa.nombre or "ANÁLISIS Y DESARROLLO DE SOFTWARE") if aprendiz and aprendiz.programa else "ANÁLISIS Y DESARROLLO DE SOFTWARE",
+        'grupo_nombre': str(aprendiz.grupo.nombre or "") if aprendiz and aprendiz.grupo else "",
+        # Datos del acudiente (están en el modelo Aprendiz)
+        'documento_acudiente': str(aprendiz.acudiente_documento or "") if aprendiz else "",
+        'tipo_documento_acudiente': str(aprendiz.acudiente_tipo_doc or "") if aprendiz else "",
+        # Fecha actual
+        'dia': fecha_actual.strftime('%d'),
+        'mes': fecha_actual.strftime('%m'),
+        'ano': fecha_actual.strftime('%Y'),
+    }
+
+    # La casilla PPT también agrupa CE y PEP
+    for tipo in CASILLAS_TIPO_DOCUMENTO:
+        valores[f'casilla_{tipo}'] = _marca_casilla(
+            tipo == tipo_documento_aprendiz or
+            (tipo == 'PPT' and tipo_documento_aprendiz in ['PPT', 'CE', 'PEP'])
+        )
+
+    return valores
 
 
 def generar_formato_compromiso_aprendiz(aprendiz):
@@ -276,158 +501,137 @@ def generar_formato_compromiso_aprendiz(aprendiz):
         str: Ruta del archivo generado
     """
     try:
-        # Cargar la plantilla base
-        template_path = os.path.join('formatos', 'Compromiso del Aprendiz.docx')
-        doc = Document(template_path)
+        # Plantilla compilada una vez por proceso
+        plantilla = obtener_plantilla(_ruta_formato('Compromiso del Aprendiz.docx'), _preparar_compromiso_aprendiz)
+        valores = _valores_compromiso_aprendiz(aprendiz)
 
-        # Datos del aprendiz (convertir None a string vacío)
-        nombre_aprendiz = str(aprendiz.usuario.nombre_completo or "") if aprendiz and aprendiz.usuario else ""
-        documento_aprendiz = str(aprendiz.usuario.documento or "") if aprendiz and aprendiz.usuario else ""
-        tipo_documento_aprendiz = str(aprendiz.usuario.tipo_documento or "") if aprendiz and aprendiz.usuario else ""
+        logger.info(f"Generando formato de compromiso del aprendiz para {valores['nombre_aprendiz']}")
 
-        # Datos del programa (convertir None a string vacío)
-        programa_nombre = str(aprendiz.programa.nombre or "ANÁLISIS Y DESARROLLO DE SOFTWARE") if aprendiz and aprendiz.programa else "ANÁLISIS Y DESARROLLO DE SOFTWARE"
+        output_filename = f"Compromiso_Aprendiz_{valores['documento_aprendiz']}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.docx"
 
-        # Datos del grupo (convertir None a string vacío)
-        grupo_nombre = str(aprendiz.grupo.nombre or "") if aprendiz and aprendiz.grupo else ""
+        # Retornar el archivo DOCX (más rápido que convertir a PDF)
+        return plantilla.guardar(valores, _ruta_salida_temp(output_filename))
 
-        # Datos del acudiente (están en el modelo Aprendiz - convertir None a string vacío)
-        documento_acudiente = str(aprendiz.acudiente_documento or "") if aprendiz else ""
-        tipo_documento_acudiente = str(aprendiz.acudiente_tipo_doc or "") if aprendiz else ""
+    except Exception as e:
+        raise Exception(f"Error al generar formato de compromiso del aprendiz: {str(e)}")
 
-        # Fecha actual
-        fecha_actual = datetime.now()
-        dia = fecha_actual.strftime('%d')
-        mes = fecha_actual.strftime('%m')
-        ano = fecha_actual.strftime('%Y')
-
-        # Campos específicos del formato Compromiso del Aprendiz
-        # Basados en los campos resaltados identificados
-        replacements = {
-            'Nombre aprendiz': nombre_aprendiz,
-            'Nombre\n aprendiz': nombre_aprendiz,
-            ' Nombre aprendiz': nombre_aprendiz,
-            'nombre aprendiz': nombre_aprendiz,
-            'nombre del aprendiz': nombre_aprendiz,
-            'Nombre del aprendiz': nombre_aprendiz,
-            'Número Documento Aprendiz': documento_aprendiz,
-            'N°mero Documento Aprendiz': documento_aprendiz,
-            'Numero Documento aprendiz': documento_aprendiz,
-            'número documento aprendiz': documento_aprendiz,
-            'numero documento aprendiz': documento_aprendiz,
-            # Programa - múltiples variaciones
-            # El template tiene "Matriculado en el programa de formación: nombre del programa o tecnica"
-            # Solo necesitamos reemplazar "nombre del programa o tecnica" por el nombre real
-            'nombre del programa o tecnica': programa_nombre,
-            'Nombre del programa o tecnica': programa_nombre,
-            'nombre del programa o técnica': programa_nombre,
-            'Nombre del programa o técnica': programa_nombre,
-            'NOMBRE DEL PROGRAMA O TECNICA': programa_nombre,
-            'NOMBRE DEL PROGRAMA O TÉCNICA': programa_nombre,
-            'nombre del programa': programa_nombre,
-            'Nombre del programa': programa_nombre,
-            'NOMBRE DEL PROGRAMA': programa_nombre,
-            'nombre programa': programa_nombre,
-            'Nombre programa': programa_nombre,
-            'NOMBRE PROGRAMA': programa_nombre,
-            # Número de ficha/grupo - múltiples variaciones
-            # Nota: "Ficha de Caracterización No." se mantiene como está en la plantilla
-            'Numero de Grupo': grupo_nombre,
-            'N°mero de Grupo': grupo_nombre,
-            'Número de Grupo': grupo_nombre,
-            'numero de grupo': grupo_nombre,
-            'número de grupo': grupo_nombre,
-            'Numero Grupo': grupo_nombre,
-            'Número Grupo': grupo_nombre,
-            'N°mero Grupo': grupo_nombre,
-            'numero grupo': grupo_nombre,
-            'número grupo': grupo_nombre,
-            'ficha de caracterización': grupo_nombre,
-            'Ficha de caracterización': grupo_nombre,
-            'ficha de caracterizacion': grupo_nombre,
-            'Ficha de caracterizacion': grupo_nombre,
-            'numero de ficha': grupo_nombre,
-            'número de ficha': grupo_nombre,
-            'Numero de ficha': grupo_nombre,
-            'Número de ficha': grupo_nombre,
-            'N°mero de ficha': grupo_nombre,
-            'numero ficha': grupo_nombre,
-            'número ficha': grupo_nombre,
-            'Numero ficha': grupo_nombre,
-            'Número ficha': grupo_nombre,
-            # Nota: NO reemplazar "ficha" o "Ficha" genéricamente porque afecta "Ficha de Caracterización No."
-            # Datos del acudiente
-            'Tipo documento acudiente, numero documento acudiente': f'{tipo_documento_acudiente} {documento_acudiente}',
-            # Fechas
-            'dia de hoy': dia,
-            'dia': dia,
-            'día': dia,
-            'Dia': dia,
-            'Día': dia,
-            'mes actual': mes,
-            'Mes actual': mes,
-            'mes': mes,
-            'Mes': mes,
-            'año actual completo': ano,
-            'a°o actual completo': ano,
-            'año actual': ano,
-            'a°o actual': ano,
-            'año': ano,
-            'a°o': ano,
-            'Año': ano,
-            'A°o': ano,
-        }
-
-        logger.info(f"Generando formato de compromiso del aprendiz para {nombre_aprendiz}")
-        # Procesar documento en UNA SOLA PASADA (optimizado)
-        # Procesar párrafos (reemplazos + highlights)
-        for paragraph in doc.paragraphs:
-            replace_text_in_paragraph(paragraph, replacements)
-            # Eliminar highlights
-            for run in paragraph.runs:
-                run.font.highlight_color = None
-
-        # Procesar tablas (reemplazos + checkboxes + highlights en una pasada)
-        for table in doc.tables:
-            for row in table.rows:
-                for cell in row.cells:
-                    for paragraph in cell.paragraphs:
-                        # 1. Reemplazar texto
-                        replace_text_in_paragraph(paragraph, replacements)
-
-                        # 2. Marcar checkboxes
-                        for run in paragraph.runs:
-                            text = run.text.strip()
-                            # Procesar tipos de documento
-                            if text in ['TI', 'CC', 'PPT', 'CE', 'PEP']:
-                                if text == tipo_documento_aprendiz:
-                                    run.text = 'X'
-                                elif text == 'PPT' and tipo_documento_aprendiz in ['PPT', 'CE', 'PEP']:
-                                    run.text = 'X'
-                                else:
-                                    run.text = ' '
-
-                            # 3. Eliminar highlights
-                            run.font.highlight_color = None
-
-        # Guardar el documento generado
-        # Obtener la ruta base del proyecto (ir dos niveles arriba desde este archivo)
-        base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-        temp_dir = os.path.join(base_dir, 'temp')
 
-        if not os.path.exists(temp_dir):
-            os.makedirs(temp_dir)
+# tipo -> (plantilla, preparar, valores, prefijo del archivo generado)
+FORMATOS = {
+    'tratamiento_datos': (
+        'Tratamiento de Datos.docx', _preparar_tratamiento_datos, _valores_tratamiento_datos, 'Tratamiento_Datos'
+    ),
+    'compromiso_aprendiz': (
+        'Compromiso del Aprendiz.docx', _preparar_compromiso_aprendiz, _valores_compromiso_aprendiz, 'Compromiso_Aprendiz'
+    ),
+}
 
-        output_filename = f"Compromiso_Aprendiz_{documento_aprendiz}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.docx"
-        output_path = os.path.join(temp_dir, output_filename)
 
-        doc.save(output_path)
+def _renderizar_formatos(aprendices, plantillas):
+    """Pares (nombre en el ZIP sin extensión, contenido DOCX) de los formatos de unos aprendices"""
+    for aprendiz in aprendices:
+        usuario = aprendiz.usuario
+        carpeta = f"{usuario.nombres}_{usuario.apellidos}_{usuario.documento}"
+        for plantilla, valores, prefijo in plantillas:
+            yield f"{carpeta}/{prefijo}_{usuario.documento}", plantilla.renderizar(valores(aprendiz))
 
-        # Retornar el archivo DOCX (más rápido que convertir a PDF)
-        return output_path
 
-    except Exception as e:
-        raise Exception(f"Error al generar formato de compromiso del aprendiz: {str(e)}")
+def _escribir_convertidos(zf, formatos, convertidor, carpeta):
+    """
+    Convierte un lote de formatos a PDF con LibreOffice (en paralelo) y los agrega
+    al ZIP; los que fallan o superan el tiempo máximo se agregan como DOCX
+    """
+    rutas = []
+    for indice, (_, contenido) in enumerate(formatos):
+        ruta_docx = os.path.join(carpeta, f'formato_{indice}.docx')
+        with open(ruta_docx, 'wb') as archivo:
+            archivo.write(contenido)
+        rutas.append(ruta_docx)
+
+    resultados = convertidor.convertir_varios(rutas, carpeta)
+
+    for (nombre, contenido), ruta_docx in zip(formatos, rutas):
+        resultado = resultados[ruta_docx]
+        if isinstance(resultado, Exception):
+            zf.writestr(f"{nombre}.docx", contenido)
+        else:
+            zf.write(resultado, f"{nombre}.pdf")
+            os.remove(resultado)
+        os.remove(ruta_docx)
+
+
+def generar_formatos_grupo(aprendices, tipos, ruta_zip, progreso=None):
+    """
+    Genera los formatos de varios aprendices en un solo ZIP
+
+    Cada plantilla se compila una vez y se reutiliza para todos los aprendices.
+    Con LibreOffice instalado los formatos se convierten a PDF por lotes en el
+    pool de conversión; si no, o si un documento falla, van como DOCX. Los
+    archivos ya vienen comprimidos, así que se guardan en el ZIP sin recomprimir.
+
+    Args:
+        aprendices: Lista de objetos Aprendiz (con usuario, grupo y programa cargados)
+        tipos: Claves de FORMATOS a generar para cada aprendiz
+        ruta_zip: Ruta del ZIP a escribir
+        progreso: Callback opcional progreso(porcentaje, mensaje)
+
+    Returns:
+        int: Número de documentos generados
+    """
+    plantillas = [
+        (obtener_plantilla(_ruta_formato(archivo), preparar), valores, prefijo)
+        for archivo, preparar, valores, prefijo in (FORMATOS[tipo] for tipo in tipos)
+    ]
+
+    convertidor = obtener_convertidor(current_app.config)
+    carpeta_conversion = None
+    if convertidor:
+        carpeta_conversion = tempfile.mkdtemp(prefix='conversion_', dir=os.path.dirname(os.path.abspath(ruta_zip)))
+
+    generados = 0
+    try:
+        with zipfile.ZipFile(ruta_zip, 'w', zipfile.ZIP_STORED) as zf:
+            for inicio in range(0, len(aprendices), APRENDICES_POR_LOTE):
+                lote = aprendices[inicio:inicio + APRENDICES_POR_LOTE]
+                formatos = list(_renderizar_formatos(lote, plantillas))
+
+                if convertidor:
+                    _escribir_convertidos(zf, formatos, convertidor, carpeta_conversion)
+                else:
+                    for nombre, contenido in formatos:
+                        zf.writestr(f"{nombre}.docx", contenido)
+                generados += len(formatos)
+
+                if progreso:
+                    procesados = inicio + len(lote)
+                    progreso(100 * procesados / len(aprendices), f'Generando formatos {procesados} de {len(aprendices)}')
+    finally:
+        if carpeta_conversion:
+            shutil.rmtree(carpeta_conversion, ignore_errors=True)
+
+    logger.info(f"Formatos generados para {len(aprendices)} aprendices: {generados} documentos")
+    return generados
+
+
+def _imagenes_como_pdf(documentos):
+    """
+    Páginas PDF de los documentos que son imágenes
+
+    Args:
+        documentos: Lista de tuplas (documento_id, ruta absoluta)
+
+    Returns:
+        dict: documento_id -> ruta del PDF de una página en la caché
+    """
+    imagenes = [(documento_id, ruta) for documento_id, ruta in documentos if es_imagen(ruta)]
+    if not imagenes:
+        return {}
+
+    return convertir_imagenes(
+        imagenes,
+        current_app.config['IMAGENES_PDF_CACHE'],
+        workers=current_app.config.get('PDF_WORKERS')
+    )
 
 
 def generar_pdf_unificado_aprendiz(aprendiz, documentos):
@@ -459,31 +663,38 @@ def generar_pdf_unificado_aprendiz(aprendiz, documentos):
         output_filename = f"Documentos_{nombre_aprendiz}_{documento_aprendiz}_{timestamp}.pdf"
         output_path = os.path.join(temp_dir, output_filename)
 
-        # Crear el merger de PDFs
-        merger = PdfMerger()
-
-        # Procesar cada documento
+        # Rutas absolutas de los documentos existentes
+        archivos = []
         for documento in documentos:
-            file_path = documento.ruta_archivo
-
-            # Convertir ruta relativa a absoluta si es necesario
-            if not os.path.isabs(file_path):
-                base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-                file_path = os.path.join(base_dir, file_path)
+            file_path = resolver_ruta_documento(documento.ruta_archivo)
 
             if os.path.exists(file_path):
-                # Solo agregar archivos PDF
-                if file_path.lower().endswith('.pdf'):
-                    try:
-                        merger.append(file_path)
-                        logger.info(f"Agregado: {documento.tipo_documento} - {documento.nombre_archivo}")
-                    except Exception as e:
-                        logger.warning(f"No se pudo agregar {documento.nombre_archivo}: {str(e)}")
-                else:
-                    logger.warning(f"Archivo no es PDF, se omitió: {documento.nombre_archivo}")
+                archivos.append((documento, file_path))
             else:
                 logger.warning(f"Archivo no encontrado: {file_path}")
 
+        # Las imágenes se agregan como una página PDF (convertida o tomada de la caché)
+        imagenes_pdf = _imagenes_como_pdf([(documento.id, file_path) for documento, file_path in archivos])
+
+        # Crear el merger de PDFs
+        merger = PdfMerger()
+
+        # Procesar cada documento
+        for documento, file_path in archivos:
+            if es_imagen(file_path):
+                if documento.id not in imagenes_pdf:
+                    continue
+                file_path = imagenes_pdf[documento.id]
+            elif not file_path.lower().endswith('.pdf'):
+                logger.warning(f"Archivo no es PDF ni imagen, se omitió: {documento.nombre_archivo}")
+                continue
+
+            try:
+                merger.append(file_path)
+                logger.info(f"Agregado: {documento.tipo_documento} - {documento.nombre_archivo}")
+            except Exception as e:
+                logger.warning(f"No se pudo agregar {documento.nombre_archivo}: {str(e)}")
+
         # Guardar el PDF unificado
         merger.write(output_path)
         merger.close()
@@ -496,23 +707,22 @@ def generar_pdf_unificado_aprendiz(aprendiz, documentos):
         raise Exception(f"Error al generar PDF unificado: {str(e)}")
 
 
-def generar_pdf_unificado_grupo(grupo, aprendices_lista):
+def generar_pdf_unificado_grupo(grupo, entradas):
     """
     Genera un PDF unificado con todos los documentos de un grupo
 
     Args:
         grupo: Objeto Grupo con los datos del grupo
-        aprendices_lista: Lista de objetos Aprendiz del grupo
+        entradas: Manifiesto de documentos del grupo (ManifiestoService.documentos_grupos)
 
     Returns:
         str: Ruta del archivo PDF generado
     """
-    from app.models.matricula import Matricula
     from app.models.documento import Documento
 
     try:
-        if not aprendices_lista:
-            raise Exception("No hay aprendices en el grupo")
+        if not entradas:
+            raise Exception("No hay documentos de aprendices en el grupo")
 
         # Crear carpeta temp si no existe
         base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -526,55 +736,44 @@ def generar_pdf_unificado_grupo(grupo, aprendices_lista):
         output_filename = f"Documentos_Grupo_{grupo.nombre}_{timestamp}.pdf"
         output_path = os.path.join(temp_dir, output_filename)
 
-        # Crear el merger de PDFs
-        merger = PdfMerger()
-        documentos_agregados = 0
-
-        # Procesar cada aprendiz
-        for aprendiz in aprendices_lista:
-            # Obtener la matrícula del aprendiz
-            matricula = Matricula.query.filter_by(aprendiz_id=aprendiz.id).first()
-            if not matricula:
+        existentes = []
+        for entrada in entradas:
+            if os.path.exists(entrada.ruta):
+                existentes.append(entrada)
+            else:
+                logger.warning(f"Archivo no encontrado: {entrada.ruta}")
+
+        # Las imágenes se agregan como una página PDF (convertida o tomada de la caché)
+        imagenes_pdf = _imagenes_como_pdf([(entrada.documento_id, entrada.ruta) for entrada in existentes])
+
+        # PDFs a unir, con un marcador por aprendiz y uno por documento
+        archivos = []
+        for entrada in existentes:
+            file_path = entrada.ruta
+
+            if es_imagen(file_path):
+                if entrada.documento_id not in imagenes_pdf:
+                    continue
+                file_path = imagenes_pdf[entrada.documento_id]
+            elif not file_path.lower().endswith('.pdf'):
+                logger.warning(f"Archivo no es PDF ni imagen, se omitió: {entrada.nombre_archivo}")
                 continue
 
-            # Obtener documentos activos
-            documentos = Documento.query.filter_by(matricula_id=matricula.id).filter(
-                Documento.reemplazado_por == None
-            ).all()
+            archivos.append((
+                file_path,
+                f"{entrada.nombre_completo} - {entrada.documento_aprendiz}",
+                Documento.TIPOS_LABELS.get(entrada.tipo_documento, entrada.tipo_documento)
+            ))
 
-            if not documentos:
-                continue
+        if not archivos:
+            raise Exception("No se encontraron documentos PDF para unificar")
 
-            # Procesar cada documento del aprendiz
-            for documento in documentos:
-                file_path = documento.ruta_archivo
-
-                # Convertir ruta relativa a absoluta si es necesario
-                if not os.path.isabs(file_path):
-                    base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-                    file_path = os.path.join(base_dir, file_path)
-
-                if os.path.exists(file_path):
-                    # Solo agregar archivos PDF
-                    if file_path.lower().endswith('.pdf'):
-                        try:
-                            merger.append(file_path)
-                            documentos_agregados += 1
-                            logger.info(f"Agregado: {aprendiz.usuario.nombre_completo} - {documento.tipo_documento}")
-                        except Exception as e:
-                            logger.warning(f"No se pudo agregar {documento.nombre_archivo}: {str(e)}")
-                    else:
-                        logger.warning(f"Archivo no es PDF, se omitió: {documento.nombre_archivo}")
-                else:
-                    logger.warning(f"Archivo no encontrado: {file_path}")
+        # Análisis en paralelo y escritura incremental a disco
+        documentos_agregados, _ = unificar_pdfs(archivos, output_path, workers=current_app.config.get('PDF_WORKERS'))
 
         if documentos_agregados == 0:
             raise Exception("No se encontraron documentos PDF para unificar")
 
-        # Guardar el PDF unificado
-        merger.write(output_path)
-        merger.close()
-
         logger.info(f"PDF unificado del grupo generado exitosamente: {output_path} ({documentos_agregados} documentos)")
         return output_path
 
@@ -0,0 +1,218 @@
+from app.models import db, Usuario, Aprendiz
+from app.utils.crypto import CryptoService
+from flask import current_app
+from sqlalchemy import insert, or_
+from werkzeug.security import generate_password_hash
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+import os
+import uuid
+
+COLUMNAS_REQUERIDAS = ['documento', 'tipo_documento', 'nombres', 'apellidos', 'email', 'telefono']
+TIPOS_DOCUMENTO = ['CC', 'TI', 'CE', 'PEP', 'PPT']
+PATRON_EMAIL = r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}'
+
+# Filas por INSERT masivo
+TAMANO_LOTE = 500
+
+# Por debajo de este número de contraseñas no compensa levantar procesos
+MINIMO_HASH_PARALELO = 64
+
+def _hash_password(password):
+    """Hash de contraseña (función de módulo para poder enviarla al pool de procesos)"""
+    return generate_password_hash(password)
+
+class ImportacionService:
+    """Servicio para la carga masiva de aprendices desde Excel"""
+
+    @staticmethod
+    def _texto(serie):
+        """Normaliza una columna a texto: sin NaN, sin espacios y sin el '.0' de los números leídos como float"""
+        return serie.fillna('').astype(str).str.strip().str.replace(r'\.0$', '', regex=True)
+
+    @staticmethod
+    def validar_dataframe(df):
+        """
+        Normaliza y valida el DataFrame completo con operaciones vectorizadas
+        Returns: (df_normalizado, errores) donde errores es {indice: [mensajes]}
+        """
+        df = df.copy()
+        for columna in ['documento', 'tipo_documento', 'nombres', 'apellidos', 'email', 'telefono', 'ciudad', 'departamento']:
+            if columna in df.columns:
+                df[columna] = ImportacionService._texto(df[columna])
+            else:
+                df[columna] = ''
+
+        df['tipo_documento'] = df['tipo_documento'].str.upper()
+        df['email'] = df['email'].str.lower()
+
+        reglas = [
+            (~df['documento'].str.fullmatch(r'\d+'), 'El documento debe contener solo números'),
+            (df['documento'].str.len() > 20, 'El documento supera 20 caracteres'),
+            (~df['tipo_documento'].isin(TIPOS_DOCUMENTO), f'Tipo de documento inválido (use {", ".join(TIPOS_DOCUMENTO)})'),
+            (df['nombres'] == '', 'Los nombres son obligatorios'),
+            (df['apellidos'] == '', 'Los apellidos son obligatorios'),
+            (df['nombres'].str.len() > 100, 'Los nombres superan 100 caracteres'),
+            (df['apellidos'].str.len() > 100, 'Los apellidos superan 100 caracteres'),
+            (~df['email'].str.fullmatch(PATRON_EMAIL), 'El email no es válido'),
+            (df['email'].str.len() > 150, 'El email supera 150 caracteres'),
+            (df['telefono'].str.len() > 20, 'El teléfono supera 20 caracteres'),
+            ((df['documento'] != '') & df['documento'].duplicated(keep='first'), 'Documento repetido en el archivo'),
+            ((df['email'] != '') & df['email'].duplicated(keep='first'), 'Email repetido en el archivo'),
+        ]
+
+        errores = {}
+        for mascara, mensaje in reglas:
+            for indice in df.index[mascara]:
+                errores.setdefault(indice, []).append(mensaje)
+
+        return df, errores
+
+    @staticmethod
+    def buscar_existentes(documentos, emails):
+        """
+        Consulta en una sola sentencia qué documentos y emails ya están registrados
+        Returns: (set de documentos, set de emails)
+        """
+        if not documentos and not emails:
+            return set(), set()
+
+        filas = db.session.query(Usuario.documento, Usuario.email).filter(
+            or_(Usuario.documento.in_(documentos), Usuario.email.in_(emails))
+        ).all()
+
+        return {documento for documento, _ in filas}, {email.lower() for _, email in filas if email}
+
+    @staticmethod
+    def hash_passwords(passwords):
+        """Calcula los hashes de contraseña repartiendo el trabajo en un pool de procesos"""
+        if len(passwords) < MINIMO_HASH_PARALELO:
+            return [_hash_password(password) for password in passwords]
+
+        workers = current_app.config.get('IMPORTACION_WORKERS') or os.cpu_count() or 1
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(_hash_password, passwords, chunksize=max(1, len(passwords) // (workers * 4))))
+
+    @staticmethod
+    def _insertar_lote(filas, colegio_id):
+        """
+        Inserta un lote de usuarios y sus perfiles de aprendiz con dos INSERT masivos
+        Los ids de los usuarios se recuperan con una consulta por documento
+        (MySQL no soporta RETURNING en inserciones múltiples)
+        """
+        ahora = datetime.utcnow()
+
+        db.session.execute(insert(Usuario), [{
+            'documento': fila['documento'],
+            'tipo_documento': fila['tipo_documento'],
+            'nombres': fila['nombres'],
+            'apellidos': fila['apellidos'],
+            'email': fila['email'],
+            'telefono': fila['telefono'],
+            'password_hash': fila['password_hash'],
+            'password_cipher': fila['password_cipher'],
+            'rol': 'APRENDIZ',
+            'activo': True,
+            'created_at': ahora,
+            'updated_at': ahora
+        } for fila in filas])
+
+        ids = dict(db.session.query(Usuario.documento, Usuario.id).filter(
+            Usuario.documento.in_([fila['documento'] for fila in filas])
+        ).all())
+
+        db.session.execute(insert(Aprendiz), [{
+            'usuario_id': ids[fila['documento']],
+            'colegio_id': colegio_id,
+            'ciudad': fila['ciudad'] or None,
+            'departamento': fila['departamento'] or None,
+            'created_at': ahora,
+            'updated_at': ahora
+        } for fila in filas])
+
+    @staticmethod
+    def importar_aprendices(df, colegio_id):
+        """
+        Importa aprendices desde un DataFrame vinculándolos al colegio
+        La contraseña inicial de cada aprendiz es su número de documento
+
+        Returns: dict con 'exitosos' (int) y 'errores' (lista de dicts fila/documento/mensaje)
+        """
+        df, errores = ImportacionService.validar_dataframe(df)
+
+        # Registros ya existentes en la base de datos (una sola consulta)
+        documentos_existentes, emails_existentes = ImportacionService.buscar_existentes(
+            df['documento'][df['documento'] != ''].tolist(),
+            df['email'][df['email'] != ''].tolist()
+        )
+        for indice in df.index[df['documento'].isin(documentos_existentes)]:
+            errores.setdefault(indice, []).append('El documento ya está registrado')
+        for indice in df.index[df['email'].isin(emails_existentes)]:
+            errores.setdefault(indice, []).append('El email ya está registrado')
+
+        validas = df[~df.index.isin(list(errores.keys()))]
+        filas = validas.to_dict('records')
+        indices = list(validas.index)
+
+        # Contraseñas: hash en paralelo y cifrado reversible con un solo objeto Fernet
+        passwords = [fila['documento'] for fila in filas]
+        hashes = ImportacionService.hash_passwords(passwords)
+        cifrados = CryptoService.encrypt_passwords(passwords)
+        for fila, password_hash, password_cipher in zip(filas, hashes, cifrados):
+            fila['password_hash'] = password_hash
+            fila['password_cipher'] = password_cipher
+
+        exitosos = 0
+        for inicio in range(0, len(filas), TAMANO_LOTE):
+            lote = filas[inicio:inicio + TAMANO_LOTE]
+            try:
+                ImportacionService._insertar_lote(lote, colegio_id)
+                db.session.commit()
+                exitosos += len(lote)
+            except Exception as e:
+                db.session.rollback()
+                current_app.logger.error(f"Error al importar lote de aprendices: {e}")
+                for indice in indices[inicio:inicio + TAMANO_LOTE]:
+                    errores.setdefault(indice, []).append(f'Error al guardar el lote: {str(e)[:200]}')
+
+        return {
+            'exitosos': exitosos,
+            'errores': [{
+                'fila': indice + 2,
+                'documento': df.at[indice, 'documento'],
+                'mensaje': '; '.join(mensajes)
+            } for indice, mensajes in sorted(errores.items())]
+        }
+
+    @staticmethod
+    def guardar_reporte_errores(errores, usuario_id):
+        """
+        Guarda el reporte de errores de una importación como Excel en REPORTS_FOLDER
+        Returns: token para descargarlo con ruta_reporte_errores
+        """
+        from openpyxl import Workbook
+        from openpyxl.styles import Font, PatternFill
+
+        token = uuid.uuid4().hex
+        wb = Workbook()
+        ws = wb.active
+        ws.title = "Errores"
+        ws.append(['Fila', 'Documento', 'Error'])
+        for cell in ws[1]:
+            cell.fill = PatternFill(start_color="C62828", end_color="C62828", fill_type="solid")
+            cell.font = Font(color="FFFFFF", bold=True)
+
+        for error in errores:
+            ws.append([error['fila'], error['documento'], error['mensaje']])
+
+        ws.column_dimensions['A'].width = 8
+        ws.column_dimensions['B'].width = 18
+        ws.column_dimensions['C'].width = 80
+
+        wb.save(ImportacionService.ruta_reporte_errores(token, usuario_id))
+        return token
+
+    @staticmethod
+    def ruta_reporte_errores(token, usuario_id):
+        """Ruta del reporte de errores; el id del usuario en el nombre evita que otro docente lo descargue"""
+        return os.path.join(current_app.config['REPORTS_FOLDER'], f'importacion_{usuario_id}_{token}.xlsx')
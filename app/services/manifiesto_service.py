@@ -0,0 +1,111 @@
+from app.models import db, Aprendiz, Documento, Grupo, Matricula, Usuario
+from app.utils.helpers import resolver_ruta_documento
+from sqlalchemy import func
+from collections import namedtuple
+import os
+
+_CAMPOS_ENTRADA = [
+    'grupo_id', 'grupo_nombre', 'aprendiz_id', 'documento_aprendiz', 'nombres', 'apellidos',
+    'matricula_id', 'documento_id', 'tipo_documento', 'nombre_archivo', 'ruta'
+]
+
+class EntradaManifiesto(namedtuple('EntradaManifiesto', _CAMPOS_ENTRADA)):
+    """Un documento activo con los datos de su grupo, aprendiz y matrícula (ruta ya resuelta)"""
+    __slots__ = ()
+
+    @property
+    def nombre_completo(self):
+        return f"{self.nombres} {self.apellidos}"
+
+    @property
+    def carpeta_aprendiz(self):
+        return f"{self.nombres}_{self.apellidos}_{self.documento_aprendiz}"
+
+    @property
+    def nombre_en_zip(self):
+        """Carpeta_Aprendiz/Tipo Documento_archivo.ext"""
+        tipo_doc = self.tipo_documento.replace('_', ' ').title()
+        return f"{self.carpeta_aprendiz}/{tipo_doc}_{self.nombre_archivo}"
+
+class ManifiestoService:
+    """
+    Manifiesto de documentos para las descargas agrupadas (ZIP y PDF unificado)
+
+    Resuelve grupo -> aprendiz -> usuario -> matrícula -> documentos activos en
+    una sola consulta y retorna una lista plana ordenada por grupo, aprendiz y
+    documento.
+    """
+
+    @staticmethod
+    def documentos_grupos(grupo_id=None, colegio_id=None, solo_grupos_activos=False):
+        """
+        Args:
+            grupo_id: Limitar a un grupo
+            colegio_id: Limitar a los aprendices de un colegio
+            solo_grupos_activos: Excluir los grupos inactivos
+
+        Returns:
+            list[EntradaManifiesto]: documentos activos (no reemplazados) de la
+            primera matrícula de cada aprendiz
+        """
+        # Primera matrícula de cada aprendiz (equivalente a filter_by(aprendiz_id=...).first())
+        primera_matricula = db.session.query(
+            Matricula.aprendiz_id,
+            func.min(Matricula.id).label('matricula_id')
+        ).group_by(Matricula.aprendiz_id).subquery()
+
+        query = db.session.query(
+            Grupo.id,
+            Grupo.nombre,
+            Aprendiz.id,
+            Usuario.documento,
+            Usuario.nombres,
+            Usuario.apellidos,
+            Documento.matricula_id,
+            Documento.id,
+            Documento.tipo_documento,
+            Documento.nombre_archivo,
+            Documento.ruta_archivo
+        ).select_from(Aprendiz).join(
+            Grupo, Aprendiz.grupo_id == Grupo.id
+        ).join(
+            Usuario, Aprendiz.usuario_id == Usuario.id
+        ).join(
+            primera_matricula, primera_matricula.c.aprendiz_id == Aprendiz.id
+        ).join(
+            Documento, Documento.matricula_id == primera_matricula.c.matricula_id
+        ).filter(
+            Documento.reemplazado_por.is_(None)
+        )
+
+        if grupo_id is not None:
+            query = query.filter(Aprendiz.grupo_id == grupo_id)
+
+        if colegio_id is not None:
+            query = query.filter(Aprendiz.colegio_id == colegio_id)
+
+        if solo_grupos_activos:
+            query = query.filter(Grupo.activo == True)
+
+        query = query.order_by(Grupo.id, Aprendiz.id, Documento.id)
+
+        return [
+            EntradaManifiesto(*fila[:-1], resolver_ruta_documento(fila[-1]))
+            for fila in query.all()
+        ]
+
+    @staticmethod
+    def archivos_zip(entradas, carpeta_grupo=False):
+        """
+        Pares (ruta en disco, nombre dentro del ZIP) de las entradas cuyo archivo existe
+        Con carpeta_grupo=True los aprendices quedan dentro de Grupo_<nombre>/
+        """
+        archivos = []
+        for entrada in entradas:
+            if not os.path.exists(entrada.ruta):
+                continue
+            nombre = entrada.nombre_en_zip
+            if carpeta_grupo:
+                nombre = f"Grupo_{entrada.grupo_nombre}/{nombre}"
+            archivos.append((entrada.ruta, nombre))
+        return archivos
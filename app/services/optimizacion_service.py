@@ -0,0 +1,121 @@
+from app.models import db, Documento
+from app.services.almacen_service import AlmacenService
+from app.utils.helpers import resolver_ruta_documento
+from app.utils.ingesta import ArchivoIngerido, hash_archivo, EXTENSION_POR_MIME, MIME_POR_EXTENSION
+from app.utils.optimizacion import optimizar_imagen, comprimir_pdf
+from flask import current_app
+from concurrent.futures import ThreadPoolExecutor
+import os
+import threading
+import uuid
+
+# El resultado se conserva solo si ahorra al menos esta fracción del tamaño
+AHORRO_MINIMO = 0.1
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def _obtener_pool(app):
+    """Pool de hilos compartido por el proceso (se crea con la primera optimización)"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(
+                max_workers=app.config.get('OPTIMIZACION_WORKERS', 1),
+                thread_name_prefix='optimizacion'
+            )
+        return _pool
+
+class OptimizacionService:
+    """
+    Optimización de documentos después de cargarlos
+
+    Con OPTIMIZAR_DOCUMENTOS activo, cada documento cargado se optimiza en un
+    pool de hilos (la carga responde sin esperar): las imágenes se reducen a
+    OPTIMIZACION_DPI y se recomprimen como JPEG, y los PDFs se recomprimen (ver
+    app.utils.optimizacion). El resultado entra al almacén como un contenido
+    nuevo y reemplaza el archivo en todos los documentos que compartían el
+    original; el original se elimina, salvo con OPTIMIZACION_CONSERVAR_ORIGINAL,
+    que lo deja en Documento.ruta_original.
+    """
+
+    @staticmethod
+    def programar(documento_id):
+        """Encola la optimización de un documento recién cargado (si está habilitada)"""
+        if not current_app.config.get('OPTIMIZAR_DOCUMENTOS'):
+            return
+
+        app = current_app._get_current_object()
+        _obtener_pool(app).submit(OptimizacionService._ejecutar, app, documento_id)
+
+    @staticmethod
+    def _ejecutar(app, documento_id):
+        """Ejecuta una optimización dentro del pool (hilo sin contexto de petición)"""
+        with app.app_context():
+            try:
+                OptimizacionService.optimizar(documento_id)
+            except Exception as e:
+                db.session.rollback()
+                current_app.logger.warning(f"No se pudo optimizar el documento {documento_id}: {e}")
+            finally:
+                db.session.remove()
+
+    @staticmethod
+    def optimizar(documento_id):
+        """
+        Optimiza el archivo de un documento
+        Returns: Bytes ahorrados (0 si no se modificó)
+        """
+        documento = db.session.get(Documento, documento_id)
+        if not documento or documento.mime_type not in EXTENSION_POR_MIME:
+            return 0
+
+        ruta_anterior = documento.ruta_archivo
+        origen = resolver_ruta_documento(ruta_anterior)
+        if not os.path.exists(origen):
+            return 0
+
+        config = current_app.config
+        temporal = os.path.join(AlmacenService.carpeta_temporal(), f'{uuid.uuid4().hex}.opt')
+        try:
+            if documento.mime_type == 'application/pdf':
+                mime_type = comprimir_pdf(origen, temporal, config['OPTIMIZACION_DPI'], config['OPTIMIZACION_CALIDAD_JPEG'])
+            else:
+                mime_type = optimizar_imagen(origen, temporal, config['OPTIMIZACION_DPI'], config['OPTIMIZACION_CALIDAD_JPEG'])
+
+            tamano_anterior = os.path.getsize(origen)
+            if not mime_type or os.path.getsize(temporal) > tamano_anterior * (1 - AHORRO_MINIMO):
+                return 0
+
+            sha256, _, tamano = hash_archivo(temporal)
+            archivo = ArchivoIngerido(temporal, sha256, mime_type, tamano)
+            ruta_archivo, _ = AlmacenService.guardar(archivo)
+
+            extension = EXTENSION_POR_MIME[mime_type]
+            conservar = config.get('OPTIMIZACION_CONSERVAR_ORIGINAL')
+
+            # Todos los documentos con el mismo contenido pasan al archivo optimizado
+            for compartido in Documento.query.filter_by(ruta_archivo=ruta_anterior).all():
+                compartido.ruta_archivo = ruta_archivo
+                compartido.sha256 = sha256
+                compartido.mime_type = mime_type
+                compartido.tamaño_bytes = tamano
+                if MIME_POR_EXTENSION.get((compartido.extension or '').lower()) != mime_type:
+                    compartido.extension = extension
+                    compartido.nombre_archivo = f"{os.path.splitext(compartido.nombre_archivo)[0]}.{extension}"
+                if conservar:
+                    compartido.ruta_original = ruta_anterior
+            db.session.commit()
+            AlmacenService.confirmar(archivo)
+        finally:
+            if os.path.exists(temporal):
+                os.remove(temporal)
+
+        # Después del commit: una carga que reutilizó el original sin confirmarse aún lo repone
+        if not conservar:
+            AlmacenService.liberar(ruta_anterior)
+
+        current_app.logger.info(
+            f"Documento {documento_id} optimizado: {tamano_anterior // 1024} KB -> {tamano // 1024} KB"
+        )
+        return tamano_anterior - tamano
@@ -0,0 +1,149 @@
+from app.utils.helpers import resolver_ruta_documento
+from flask import current_app
+import hashlib
+import os
+import shutil
+import threading
+import uuid
+
+# Cambiar al modificar la forma en que se generan los PDFs unificados
+VERSION_PAQUETE = 1
+
+_lock = threading.Lock()
+
+class PaqueteService:
+    """
+    Caché de PDFs unificados (paquetes) direccionada por contenido
+
+    La clave de un paquete es un hash del alcance (aprendiz o grupo/colegio) y
+    de la lista ordenada de (Documento.id, tamaño en disco) de sus documentos
+    activos. Cargar o reemplazar un documento crea un Documento nuevo, así que
+    la clave cambia sola y el paquete anterior deja de usarse; los paquetes que
+    no se piden se eliminan por antigüedad de uso (LRU) cuando la caché supera
+    PAQUETES_CACHE_MAX_MB.
+
+    Cada paquete queda en PAQUETES_CACHE/<clave>/<nombre de descarga>.pdf
+    """
+
+    @staticmethod
+    def _carpeta():
+        return current_app.config['PAQUETES_CACHE']
+
+    @staticmethod
+    def calcular_clave(alcance, documentos):
+        """
+        Args:
+            alcance: Texto que identifica el paquete ('aprendiz:12', 'grupo:3:5')
+            documentos: Lista ordenada de tuplas (documento_id, ruta absoluta)
+        """
+        hash_paquete = hashlib.sha256(f'{VERSION_PAQUETE}|{alcance}'.encode())
+        for documento_id, ruta in documentos:
+            tamano = os.path.getsize(ruta) if os.path.exists(ruta) else -1
+            hash_paquete.update(f'|{documento_id}:{tamano}'.encode())
+        return hash_paquete.hexdigest()
+
+    @staticmethod
+    def clave_aprendiz(aprendiz, documentos):
+        """Clave del PDF unificado de un aprendiz (documentos: objetos Documento)"""
+        return PaqueteService.calcular_clave(
+            f'aprendiz:{aprendiz.id}',
+            [(documento.id, resolver_ruta_documento(documento.ruta_archivo)) for documento in documentos]
+        )
+
+    @staticmethod
+    def clave_grupo(grupo_id, colegio_id, entradas):
+        """Clave del PDF unificado de un grupo (entradas: manifiesto del grupo)"""
+        return PaqueteService.calcular_clave(
+            f'grupo:{grupo_id}:{colegio_id}',
+            [(entrada.documento_id, entrada.ruta) for entrada in entradas]
+        )
+
+    @staticmethod
+    def obtener(clave):
+        """
+        Ruta del paquete en caché o None
+        Marca el paquete como usado recientemente
+        """
+        carpeta = os.path.join(PaqueteService._carpeta(), clave)
+        try:
+            nombres = os.listdir(carpeta)
+        except FileNotFoundError:
+            return None
+
+        if not nombres:
+            return None
+
+        ruta = os.path.join(carpeta, nombres[0])
+        try:
+            os.utime(ruta)
+        except FileNotFoundError:
+            # Desalojado por otra petición en este momento
+            return None
+        return ruta
+
+    @staticmethod
+    def guardar(clave, ruta_generada):
+        """
+        Mueve un PDF recién generado a la caché y aplica el límite de tamaño
+        Returns: Ruta del paquete en caché
+        """
+        carpeta_cache = PaqueteService._carpeta()
+        destino = os.path.join(carpeta_cache, clave)
+
+        # Se arma en una carpeta temporal y se renombra completa para que
+        # obtener() nunca vea un paquete a medio copiar
+        temporal = os.path.join(carpeta_cache, f'.{clave}.{uuid.uuid4().hex}')
+        os.makedirs(temporal)
+        shutil.move(ruta_generada, os.path.join(temporal, os.path.basename(ruta_generada)))
+
+        try:
+            os.rename(temporal, destino)
+        except OSError:
+            # Otra petición generó el mismo paquete primero
+            shutil.rmtree(temporal, ignore_errors=True)
+
+        PaqueteService.desalojar(conservar=clave)
+        return PaqueteService.obtener(clave) or os.path.join(destino, os.path.basename(ruta_generada))
+
+    @staticmethod
+    def obtener_o_generar(clave, generar):
+        """
+        Retorna el paquete en caché o lo genera con generar() (que retorna la ruta del PDF)
+        Returns: (ruta, desde_cache)
+        """
+        ruta = PaqueteService.obtener(clave)
+        if ruta:
+            return ruta, True
+
+        return PaqueteService.guardar(clave, generar()), False
+
+    @staticmethod
+    def desalojar(conservar=None):
+        """Elimina los paquetes usados hace más tiempo hasta quedar bajo el límite de tamaño"""
+        limite = current_app.config.get('PAQUETES_CACHE_MAX_MB', 500) * 1024 * 1024
+        carpeta_cache = PaqueteService._carpeta()
+
+        with _lock:
+            paquetes = []
+            total = 0
+            with os.scandir(carpeta_cache) as entradas:
+                for entrada in entradas:
+                    if entrada.name.startswith('.') or not entrada.is_dir():
+                        continue
+                    for archivo in os.scandir(entrada.path):
+                        estado = archivo.stat()
+                        paquetes.append((estado.st_mtime, estado.st_size, entrada.name))
+                        total += estado.st_size
+
+            if total <= limite:
+                return
+
+            for _, tamano, clave in sorted(paquetes):
+                if total <= limite:
+                    break
+                if clave == conservar:
+                    continue
+                shutil.rmtree(os.path.join(carpeta_cache, clave), ignore_errors=True)
+                total -= tamano
+
+        current_app.logger.info(f"Caché de paquetes PDF desalojada hasta {total // (1024 * 1024)} MB")
@@ -1,14 +1,39 @@
 from reportlab.lib.pagesizes import letter, A4
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak
-from reportlab.lib import colors
-from reportlab.lib.enums import TA_CENTER, TA_LEFT
+from reportlab.platypus import SimpleDocTemplate, Table, LongTable, Paragraph, Spacer
 from openpyxl import Workbook
 from openpyxl.styles import Font, Alignment, PatternFill
 from datetime import datetime
+from io import StringIO
+from app.models import Matricula, Aprendiz, Usuario, Colegio, Grupo, Programa
+from app.utils.estilos_pdf import estilos_parrafo, estilos_tabla
+from app.utils.listado_pdf import ListadoPaginado
+from app.utils.xlsx_stream import generar_xlsx_stream
+from collections import Counter
+import csv
 import os
 
+ENCABEZADOS_MATRICULAS = [
+    'Documento', 'Nombres', 'Apellidos', 'Email', 'Teléfono',
+    'Colegio', 'Grupo', 'Programa', 'Estado', 'Fecha Envío'
+]
+
+# Nombres de columna para formatos de análisis (Parquet)
+COLUMNAS_MATRICULAS = [
+    'documento', 'nombres', 'apellidos', 'email', 'telefono',
+    'colegio', 'grupo', 'programa', 'estado', 'fecha_envio'
+]
+
+# Con más matrículas que esto, el listado del reporte PDF se arma por páginas
+FILAS_LISTADO_SIMPLE = 500
+
+# formato -> (mimetype, extensión)
+FORMATOS_REPORTE = {
+    'xlsx': ('application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', 'xlsx'),
+    'csv': ('text/csv; charset=utf-8', 'csv'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet')
+}
+
 class ReporteService:
     """Servicio para generación de reportes en PDF y Excel"""
 
@@ -23,22 +48,15 @@ class ReporteService:
 
         pdf_doc = SimpleDocTemplate(output_path, pagesize=letter)
         story = []
-        styles = getSampleStyleSheet()
+        estilos = estilos_parrafo()
+        estilos_tablas = estilos_tabla()
 
         # Título
-        title_style = ParagraphStyle(
-            'CustomTitle',
-            parent=styles['Heading1'],
-            fontSize=18,
-            textColor=colors.HexColor('#2E7D32'),
-            spaceAfter=30,
-            alignment=TA_CENTER
-        )
-        story.append(Paragraph("RESUMEN DE MATRÍCULA", title_style))
+        story.append(Paragraph("RESUMEN DE MATRÍCULA", estilos['titulo_resumen']))
         story.append(Spacer(1, 0.3 * inch))
 
         # Datos del aprendiz
-        story.append(Paragraph("<b>DATOS DEL APRENDIZ</b>", styles['Heading2']))
+        story.append(Paragraph("<b>DATOS DEL APRENDIZ</b>", estilos['seccion']))
         datos_aprendiz = [
             ['Documento:', aprendiz.usuario.documento],
             ['Nombre Completo:', aprendiz.usuario.nombre_completo],
@@ -48,19 +66,12 @@ class ReporteService:
         ]
 
         table = Table(datos_aprendiz, colWidths=[2 * inch, 4 * inch])
-        table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#E8F5E9')),
-            ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 10),
-            ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-        ]))
+        table.setStyle(estilos_tablas['ficha'])
         story.append(table)
         story.append(Spacer(1, 0.3 * inch))
 
         # Datos del acudiente
-        story.append(Paragraph("<b>DATOS DEL ACUDIENTE</b>", styles['Heading2']))
+        story.append(Paragraph("<b>DATOS DEL ACUDIENTE</b>", estilos['seccion']))
         datos_acudiente = [
             ['Documento:', aprendiz.acudiente_documento or 'N/A'],
             ['Nombre Completo:', aprendiz.acudiente_nombre_completo or 'N/A'],
@@ -69,19 +80,12 @@ class ReporteService:
         ]
 
         table = Table(datos_acudiente, colWidths=[2 * inch, 4 * inch])
-        table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#E8F5E9')),
-            ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 10),
-            ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-        ]))
+        table.setStyle(estilos_tablas['ficha'])
         story.append(table)
         story.append(Spacer(1, 0.3 * inch))
 
         # Datos académicos
-        story.append(Paragraph("<b>DATOS ACADÉMICOS</b>", styles['Heading2']))
+        story.append(Paragraph("<b>DATOS ACADÉMICOS</b>", estilos['seccion']))
         datos_academicos = [
             ['Colegio:', aprendiz.colegio.nombre if aprendiz.colegio else 'N/A'],
             ['Grupo:', aprendiz.grupo.nombre if aprendiz.grupo else 'N/A'],
@@ -89,19 +93,12 @@ class ReporteService:
         ]
 
         table = Table(datos_academicos, colWidths=[2 * inch, 4 * inch])
-        table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#E8F5E9')),
-            ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 10),
-            ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-        ]))
+        table.setStyle(estilos_tablas['ficha'])
         story.append(table)
         story.append(Spacer(1, 0.3 * inch))
 
         # Documentos cargados
-        story.append(Paragraph("<b>DOCUMENTOS CARGADOS</b>", styles['Heading2']))
+        story.append(Paragraph("<b>DOCUMENTOS CARGADOS</b>", estilos['seccion']))
         documentos_data = [['Tipo de Documento', 'Nombre Archivo', 'Validado']]
 
         for documento in matricula.documentos:
@@ -113,15 +110,7 @@ class ReporteService:
                 ])
 
         table = Table(documentos_data, colWidths=[2.5 * inch, 2.5 * inch, 1 * inch])
-        table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#2E7D32')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 9),
-            ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#F1F8E9')]),
-        ]))
+        table.setStyle(estilos_tablas['documentos'])
         story.append(table)
 
         # Generar PDF
@@ -147,10 +136,7 @@ class ReporteService:
         center_aligned = Alignment(horizontal="center", vertical="center")
 
         # Encabezados
-        headers = [
-            'Documento', 'Nombres', 'Apellidos', 'Email', 'Teléfono',
-            'Colegio', 'Grupo', 'Programa', 'Estado', 'Fecha Envío'
-        ]
+        headers = ENCABEZADOS_MATRICULAS
 
         for col, header in enumerate(headers, 1):
             cell = ws.cell(row=1, column=col, value=header)
@@ -182,8 +168,218 @@ class ReporteService:
         return output_path
 
     @staticmethod
-    def generar_pdf_reporte_docente(matriculas, titulo, colegio_nombre, filtros=None, output_path=None):
-        """Genera PDF con reporte de matrículas para docente"""
+    def consulta_matriculas(colegio_id=None, programa_id=None, grupo_id=None, estado=None,
+                            fecha_desde=None, fecha_hasta=None):
+        """
+        Consulta de matrículas unida a Aprendiz con los filtros de los formularios de reportes
+        Los filtros son valores simples (fechas 'YYYY-MM-DD') para poder guardarse en un trabajo
+        """
+        query = Matricula.query.join(Aprendiz)
+
+        if colegio_id:
+            query = query.filter(Aprendiz.colegio_id == int(colegio_id))
+
+        if programa_id:
+            query = query.filter(Aprendiz.programa_id == int(programa_id))
+
+        if grupo_id:
+            query = query.filter(Aprendiz.grupo_id == int(grupo_id))
+
+        if estado:
+            query = query.filter(Matricula.estado == estado)
+
+        if fecha_desde:
+            query = query.filter(Matricula.created_at >= datetime.strptime(fecha_desde, '%Y-%m-%d'))
+
+        if fecha_hasta:
+            query = query.filter(Matricula.created_at <= datetime.strptime(fecha_hasta, '%Y-%m-%d'))
+
+        return query
+
+    @staticmethod
+    def consulta_filas_matriculas(query):
+        """
+        Proyecta una consulta de matrículas (ya unida a Aprendiz y filtrada) a las
+        columnas del reporte, con un único JOIN a usuarios, colegios, grupos y programas
+        """
+        return query.join(
+            Usuario, Aprendiz.usuario_id == Usuario.id
+        ).outerjoin(
+            Colegio, Aprendiz.colegio_id == Colegio.id
+        ).outerjoin(
+            Grupo, Aprendiz.grupo_id == Grupo.id
+        ).outerjoin(
+            Programa, Aprendiz.programa_id == Programa.id
+        ).with_entities(
+            Usuario.documento,
+            Usuario.nombres,
+            Usuario.apellidos,
+            Usuario.email,
+            Usuario.telefono,
+            Colegio.nombre,
+            Grupo.nombre,
+            Programa.nombre,
+            Matricula.estado,
+            Matricula.fecha_envio
+        ).order_by(Matricula.id)
+
+    @staticmethod
+    def iterar_filas_matriculas(query, tamano_lote=1000):
+        """
+        Recorre las filas del reporte de matrículas por lotes con un cursor del lado del servidor
+        Cada fila tiene el mismo formato que generar_excel_matriculas
+        """
+        filas = ReporteService.consulta_filas_matriculas(query).execution_options(yield_per=tamano_lote)
+
+        for documento, nombres, apellidos, email, telefono, colegio, grupo, programa, estado, fecha_envio in filas:
+            yield [
+                documento,
+                nombres,
+                apellidos,
+                email,
+                telefono,
+                colegio or 'N/A',
+                grupo or 'N/A',
+                programa or 'N/A',
+                estado,
+                fecha_envio.strftime('%Y-%m-%d') if fecha_envio else 'N/A'
+            ]
+
+    @staticmethod
+    def generar_excel_matriculas_stream(query, tamano_lote=1000):
+        """
+        Genera el Excel de matrículas en streaming a partir de la consulta filtrada
+        Returns: iterador de bytes para usar en un Response de Flask
+        """
+        return generar_xlsx_stream(
+            ENCABEZADOS_MATRICULAS,
+            ReporteService.iterar_filas_matriculas(query, tamano_lote),
+            titulo_hoja='Matrículas'
+        )
+
+    @staticmethod
+    def generar_csv_matriculas_stream(query, tamano_lote=1000):
+        """
+        Genera el reporte de matrículas como CSV en streaming (UTF-8 con BOM para Excel)
+        Returns: iterador de bytes para usar en un Response de Flask
+        """
+        buffer = StringIO()
+        writer = csv.writer(buffer)
+
+        buffer.write('\ufeff')
+        writer.writerow(ENCABEZADOS_MATRICULAS)
+
+        for numero, fila in enumerate(ReporteService.iterar_filas_matriculas(query, tamano_lote), 1):
+            writer.writerow(fila)
+            if numero % tamano_lote == 0:
+                yield buffer.getvalue().encode('utf-8')
+                buffer.seek(0)
+                buffer.truncate()
+
+        yield buffer.getvalue().encode('utf-8')
+
+    @staticmethod
+    def generar_parquet_matriculas(query, tamano_lote=10000):
+        """
+        Genera el reporte de matrículas en formato Parquet (columnar, comprimido)
+        Los valores se conservan sin formatear: nulos como null y fecha_envio como timestamp
+        Requiere pyarrow (dependencia opcional)
+        Returns: bytes del archivo Parquet
+        """
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError('El formato Parquet requiere el paquete pyarrow, que no está instalado')
+
+        esquema = pa.schema(
+            [(columna, pa.string()) for columna in COLUMNAS_MATRICULAS[:-1]] +
+            [('fecha_envio', pa.timestamp('s'))]
+        )
+
+        filas = ReporteService.consulta_filas_matriculas(query).execution_options(yield_per=tamano_lote)
+        salida = pa.BufferOutputStream()
+
+        def escribir_lote(writer, lote):
+            columnas = list(zip(*lote))
+            writer.write_batch(pa.record_batch(
+                [pa.array(columna, type=campo.type) for columna, campo in zip(columnas, esquema)],
+                schema=esquema
+            ))
+
+        with pq.ParquetWriter(salida, esquema, compression='zstd') as writer:
+            lote = []
+            for fila in filas:
+                lote.append(tuple(fila))
+                if len(lote) >= tamano_lote:
+                    escribir_lote(writer, lote)
+                    lote = []
+
+            if lote:
+                escribir_lote(writer, lote)
+
+        return salida.getvalue().to_pybytes()
+
+    @staticmethod
+    def exportar_matriculas(query, formato='xlsx'):
+        """
+        Exporta el reporte de matrículas en el formato solicitado
+
+        Args:
+            query: Consulta de matrículas unida a Aprendiz y con los filtros aplicados
+            formato: 'xlsx', 'csv' o 'parquet'
+
+        Returns:
+            tuple: (contenido, mimetype, extension); contenido es un iterador de bytes
+                   (xlsx, csv) o bytes (parquet)
+        """
+        if formato not in FORMATOS_REPORTE:
+            raise ValueError(f'Formato de reporte no soportado: {formato}')
+
+        mimetype, extension = FORMATOS_REPORTE[formato]
+
+        if formato == 'csv':
+            contenido = ReporteService.generar_csv_matriculas_stream(query)
+        elif formato == 'parquet':
+            contenido = ReporteService.generar_parquet_matriculas(query)
+        else:
+            contenido = ReporteService.generar_excel_matriculas_stream(query)
+
+        return contenido, mimetype, extension
+
+    @staticmethod
+    def _filas_listado_docente(matriculas):
+        """Filas del listado del reporte docente (textos truncados a una línea)"""
+        for matricula in matriculas:
+            aprendiz = matricula.aprendiz
+            usuario = aprendiz.usuario
+
+            # Truncar nombres largos
+            nombre = usuario.nombre_completo
+            if len(nombre) > 30:
+                nombre = nombre[:27] + '...'
+
+            programa = aprendiz.programa.nombre[:25] if aprendiz.programa else 'N/A'
+            grupo = aprendiz.grupo.nombre if aprendiz.grupo else 'N/A'
+
+            yield [
+                usuario.documento,
+                nombre,
+                programa,
+                grupo,
+                matricula.estado
+            ]
+
+    @staticmethod
+    def generar_pdf_reporte_docente(matriculas, titulo, colegio_nombre, filtros=None, output_path=None, paginado=None):
+        """
+        Genera PDF con reporte de matrículas para docente
+
+        Args:
+            paginado: Arma el listado página por página (ListadoPaginado) en lugar
+                de una sola tabla. Por defecto se usa cuando hay más de
+                FILAS_LISTADO_SIMPLE matrículas.
+        """
         if not output_path:
             import tempfile
             temp_dir = tempfile.gettempdir()
@@ -191,119 +387,66 @@ class ReporteService:
 
         pdf_doc = SimpleDocTemplate(output_path, pagesize=A4)
         story = []
-        styles = getSampleStyleSheet()
+        estilos = estilos_parrafo()
+        estilos_tablas = estilos_tabla()
 
         # Título principal
-        title_style = ParagraphStyle(
-            'CustomTitle',
-            parent=styles['Heading1'],
-            fontSize=16,
-            textColor=colors.HexColor('#667eea'),
-            spaceAfter=20,
-            alignment=TA_CENTER
-        )
-        story.append(Paragraph(titulo, title_style))
+        story.append(Paragraph(titulo, estilos['titulo_reporte']))
 
         # Subtítulo con colegio
-        subtitle_style = ParagraphStyle(
-            'Subtitle',
-            parent=styles['Normal'],
-            fontSize=12,
-            textColor=colors.HexColor('#4a5568'),
-            spaceAfter=10,
-            alignment=TA_CENTER
-        )
-        story.append(Paragraph(f"<b>Colegio:</b> {colegio_nombre}", subtitle_style))
-        story.append(Paragraph(f"<b>Fecha:</b> {datetime.now().strftime('%d/%m/%Y %H:%M')}", subtitle_style))
+        story.append(Paragraph(f"<b>Colegio:</b> {colegio_nombre}", estilos['subtitulo']))
+        story.append(Paragraph(f"<b>Fecha:</b> {datetime.now().strftime('%d/%m/%Y %H:%M')}", estilos['subtitulo']))
         story.append(Spacer(1, 0.2 * inch))
 
         # Filtros aplicados
         if filtros:
-            story.append(Paragraph("<b>Filtros Aplicados:</b>", styles['Heading3']))
+            story.append(Paragraph("<b>Filtros Aplicados:</b>", estilos['subseccion']))
             filtros_text = "<br/>".join([f"• {k}: {v}" for k, v in filtros.items() if v])
-            story.append(Paragraph(filtros_text, styles['Normal']))
+            story.append(Paragraph(filtros_text, estilos['normal']))
             story.append(Spacer(1, 0.2 * inch))
 
-        # Estadísticas
-        stats = {
-            'total': len(matriculas),
-            'borrador': len([m for m in matriculas if m.estado == 'BORRADOR']),
-            'enviado': len([m for m in matriculas if m.estado == 'ENVIADO']),
-            'prematricula': len([m for m in matriculas if m.estado == 'PREMATRICULA']),
-            'matriculado': len([m for m in matriculas if m.estado == 'MATRICULADO'])
-        }
+        # Estadísticas (una sola pasada sobre las matrículas)
+        conteo = Counter(m.estado for m in matriculas)
 
-        story.append(Paragraph("<b>RESUMEN ESTADÍSTICO</b>", styles['Heading2']))
+        story.append(Paragraph("<b>RESUMEN ESTADÍSTICO</b>", estilos['seccion']))
         stats_data = [
             ['Estado', 'Cantidad'],
-            ['Total Matrículas', str(stats['total'])],
-            ['Borrador', str(stats['borrador'])],
-            ['Enviado', str(stats['enviado'])],
-            ['Pre-matrícula', str(stats['prematricula'])],
-            ['Matriculado', str(stats['matriculado'])]
+            ['Total Matrículas', str(len(matriculas))],
+            ['Borrador', str(conteo['BORRADOR'])],
+            ['Enviado', str(conteo['ENVIADO'])],
+            ['Pre-matrícula', str(conteo['PREMATRICULA'])],
+            ['Matriculado', str(conteo['MATRICULADO'])]
         ]
 
         table = Table(stats_data, colWidths=[3 * inch, 2 * inch])
-        table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#667eea')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 10),
-            ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f7fafc')]),
-        ]))
+        table.setStyle(estilos_tablas['estadisticas'])
         story.append(table)
         story.append(Spacer(1, 0.3 * inch))
 
         # Listado de matrículas
         if matriculas:
-            story.append(Paragraph("<b>LISTADO DE MATRÍCULAS</b>", styles['Heading2']))
-
-            matriculas_data = [['Documento', 'Aprendiz', 'Programa', 'Grupo', 'Estado']]
-
-            for matricula in matriculas:
-                aprendiz = matricula.aprendiz
-                usuario = aprendiz.usuario
+            story.append(Paragraph("<b>LISTADO DE MATRÍCULAS</b>", estilos['seccion']))
 
-                # Truncar nombres largos
-                nombre = usuario.nombre_completo
-                if len(nombre) > 30:
-                    nombre = nombre[:27] + '...'
+            encabezado = ['Documento', 'Aprendiz', 'Programa', 'Grupo', 'Estado']
+            anchos = [1.2*inch, 2*inch, 2*inch, 1*inch, 1.3*inch]
+            filas = ReporteService._filas_listado_docente(matriculas)
 
-                programa = aprendiz.programa.nombre[:25] if aprendiz.programa else 'N/A'
-                grupo = aprendiz.grupo.nombre if aprendiz.grupo else 'N/A'
+            if paginado is None:
+                paginado = len(matriculas) > FILAS_LISTADO_SIMPLE
 
-                matriculas_data.append([
-                    usuario.documento,
-                    nombre,
-                    programa,
-                    grupo,
-                    matricula.estado
-                ])
-
-            table = Table(matriculas_data, colWidths=[1.2*inch, 2*inch, 2*inch, 1*inch, 1.3*inch])
-            table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#667eea')),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, -1), 8),
-                ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-                ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f7fafc')]),
-            ]))
-            story.append(table)
+            if paginado:
+                # Una tabla por página, armada a medida que el documento avanza
+                story.append(ListadoPaginado(encabezado, filas, anchos, estilos_tablas['listado']))
+            else:
+                # LongTable: al partir la tabla entre páginas no vuelve a medir las
+                # filas restantes, y el encabezado se repite en cada página
+                table = LongTable([encabezado] + list(filas), colWidths=anchos, repeatRows=1)
+                table.setStyle(estilos_tablas['listado'])
+                story.append(table)
 
         # Pie de página
         story.append(Spacer(1, 0.5 * inch))
-        footer_style = ParagraphStyle(
-            'Footer',
-            parent=styles['Normal'],
-            fontSize=8,
-            textColor=colors.grey,
-            alignment=TA_CENTER
-        )
-        story.append(Paragraph(f"Reporte generado por Sistema de Matrículas SENA - {datetime.now().strftime('%d/%m/%Y %H:%M')}", footer_style))
+        story.append(Paragraph(f"Reporte generado por Sistema de Matrículas SENA - {datetime.now().strftime('%d/%m/%Y %H:%M')}", estilos['pie']))
 
         # Generar PDF
         pdf_doc.build(story)
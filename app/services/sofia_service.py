@@ -1,8 +1,7 @@
-from openpyxl import load_workbook
-from openpyxl.utils import get_column_letter
 import os
 from datetime import datetime
-from app.models import Aprendiz, Grupo, Programa, Colegio
+from app.models import db, Aprendiz, Grupo, Programa, Colegio, Usuario
+from app.utils.xlsx_stream import obtener_plantilla_xlsx
 from sqlalchemy.orm import joinedload
 
 
@@ -24,17 +23,25 @@ class SofiaService:
         """
         try:
             # Usar el nuevo template con formato correcto
-            template_path = os.path.join('formatos', 'Sofia new.xlsx')
+            base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+            template_path = os.path.join(base_dir, 'formatos', 'Sofia new.xlsx')
 
             if not os.path.exists(template_path):
                 return False, 'No se encontró el template del formato SOFIA', None
 
-            # Cargar el workbook del template (esto preserva todos los formatos)
-            wb = load_workbook(template_path)
-            ws = wb.active
+            # Template leído una sola vez por proceso (conserva todos los formatos)
+            plantilla = obtener_plantilla_xlsx(template_path)
 
-            # Obtener aprendices según filtro
-            query = Aprendiz.query.join(Aprendiz.usuario).join(Aprendiz.grupo)
+            # Obtener aprendices según filtro (solo las columnas del formato, sin cargar entidades)
+            query = db.session.query(
+                Usuario.tipo_documento,
+                Usuario.documento,
+                Grupo.nombre
+            ).select_from(Aprendiz).join(
+                Usuario, Aprendiz.usuario_id == Usuario.id
+            ).join(
+                Grupo, Aprendiz.grupo_id == Grupo.id
+            )
 
             # Validar permisos de docente
             if docente_colegio_id:
@@ -65,51 +72,29 @@ class SofiaService:
             else:
                 filtro_nombre = 'Todos'
 
-            aprendices = query.all()
+            total_aprendices = query.count()
 
-            if not aprendices:
+            if not total_aprendices:
                 return False, 'No se encontraron aprendices con los filtros seleccionados', None
 
-            # Escribir datos de aprendices a partir de la fila 3 (row 3 en openpyxl, indexado desde 1)
-            # Asumiendo que fila 1 es título y fila 2 son encabezados
-            row_idx = 3
-
-            for aprendiz in aprendices:
-                usuario = aprendiz.usuario
-                grupo = aprendiz.grupo
-
-                # Columna A (1): Resultado del Registro (vacío - reservado para sistema)
-                ws.cell(row=row_idx, column=1).value = ''
-
-                # Columna B (2): Tipo de Identificación
-                tipo_doc = usuario.tipo_documento if usuario.tipo_documento else 'CC'
-                ws.cell(row=row_idx, column=2).value = tipo_doc
-
-                # Columna C (3): Número de Identificación
-                ws.cell(row=row_idx, column=3).value = str(usuario.documento)
-
-                # Columna D (4): Código de la ficha (número del grupo)
-                codigo_ficha = grupo.nombre if grupo else ''
-                ws.cell(row=row_idx, column=4).value = codigo_ficha
-
-                # Columna E (5): Tipo Población Aspirante (siempre "NINGUNA")
-                ws.cell(row=row_idx, column=5).value = 'NINGUNA'
-
-                # Columnas F y G (6-7): Vacías
-                ws.cell(row=row_idx, column=6).value = ''
-                ws.cell(row=row_idx, column=7).value = ''
-
-                # Columnas H-I (8-9): Mantener metadata del template (no tocar)
-                # openpyxl preserva automáticamente el contenido y formato de estas columnas
-
-                row_idx += 1
+            def filas_sofia():
+                """Filas a partir de la 3 (fila 1 título y fila 2 encabezados del template)"""
+                for tipo_documento, documento, codigo_ficha in query.order_by(Aprendiz.id).yield_per(1000):
+                    yield (
+                        None,                       # A: Resultado del Registro (reservado para sistema)
+                        tipo_documento or 'CC',     # B: Tipo de Identificación
+                        str(documento),             # C: Número de Identificación
+                        codigo_ficha or '',         # D: Código de la ficha (número del grupo)
+                        'NINGUNA',                  # E: Tipo Población Aspirante (siempre "NINGUNA")
+                        None,                       # F y G: vacías
+                        None,
+                    )
 
             # Generar nombre de archivo
             timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
             filename = f'SOFIA_{filtro_tipo}_{filtro_nombre.replace(" ", "_")}_{timestamp}.xlsx'
 
             # Usar ruta absoluta al directorio temp del proyecto
-            base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
             temp_dir = os.path.join(base_dir, 'temp')
 
             # Crear directorio temp si no existe
@@ -118,10 +103,12 @@ class SofiaService:
 
             output_path = os.path.join(temp_dir, filename)
 
-            # Guardar archivo (openpyxl preserva todos los formatos del template)
-            wb.save(output_path)
+            # Escribir el archivo por bloques a medida que llegan las filas
+            with open(output_path, 'wb') as archivo:
+                for bloque in plantilla.generar(filas_sofia(), total_filas=total_aprendices):
+                    archivo.write(bloque)
 
-            return True, f'Formato SOFIA generado con {len(aprendices)} aprendices', output_path
+            return True, f'Formato SOFIA generado con {total_aprendices} aprendices', output_path
 
         except Exception as e:
             return False, f'Error al generar formato SOFIA: {str(e)}', None
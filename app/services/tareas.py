@@ -0,0 +1,160 @@
+"""
+Tareas ejecutables en segundo plano con TrabajoService
+
+Cada tarea recibe el Trabajo (sus parámetros están en trabajo.parametros),
+un callback de progreso y la carpeta donde debe dejar el archivo resultante.
+"""
+from app.models import db, Aprendiz, Grupo, Usuario
+from app.services.manifiesto_service import ManifiestoService
+from app.services.paquete_service import PaqueteService
+from app.services.reporte_service import ReporteService
+from app.services.trabajo_service import tarea
+from app.utils.zip_stream import generar_zip_stream
+from datetime import datetime
+from sqlalchemy.orm import joinedload
+import os
+import shutil
+
+MIMETYPE_XLSX = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def _mover_a_carpeta(ruta, carpeta):
+    """Mueve un archivo generado en temp/ a la carpeta del trabajo"""
+    destino = os.path.join(carpeta, os.path.basename(ruta))
+    shutil.move(ruta, destino)
+    return destino
+
+def _escribir_zip(ruta_zip, archivos, progreso, progreso_inicial=0):
+    """Escribe el ZIP en streaming a disco, informando el avance por archivo agregado"""
+    def archivos_con_progreso():
+        for indice, archivo in enumerate(archivos):
+            if indice % 50 == 0:
+                avance = progreso_inicial + (100 - progreso_inicial) * indice / len(archivos)
+                progreso(avance, f'Comprimiendo {indice + 1} de {len(archivos)} documentos')
+            yield archivo
+
+    with open(ruta_zip, 'wb') as salida:
+        for bloque in generar_zip_stream(archivos_con_progreso()):
+            salida.write(bloque)
+
+@tarea('zip_todos_grupos')
+def zip_todos_grupos(trabajo, progreso, carpeta):
+    """ZIP con los documentos de todos los grupos activos (Grupo_X/Aprendiz/documentos)"""
+    if not Grupo.query.filter_by(activo=True).first():
+        raise ValueError('No hay grupos activos en el sistema')
+
+    progreso(1, 'Buscando documentos...')
+    archivos = ManifiestoService.archivos_zip(
+        ManifiestoService.documentos_grupos(solo_grupos_activos=True),
+        carpeta_grupo=True
+    )
+
+    if not archivos:
+        raise ValueError('No se encontraron documentos para descargar en ningún grupo')
+
+    nombre_zip = f"Documentos_Todos_Grupos_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip"
+    ruta_zip = os.path.join(carpeta, nombre_zip)
+
+    _escribir_zip(ruta_zip, archivos, progreso, 5)
+
+    return ruta_zip, nombre_zip, 'application/zip'
+
+@tarea('pdf_grupo')
+def pdf_grupo(trabajo, progreso, carpeta):
+    """PDF unificado con los documentos de los aprendices de un grupo en un colegio"""
+    from app.services.formato_service import generar_pdf_unificado_grupo
+
+    parametros = trabajo.parametros
+    grupo = db.session.get(Grupo, parametros['grupo_id'])
+    if not grupo:
+        raise ValueError('El grupo no existe')
+
+    entradas = ManifiestoService.documentos_grupos(grupo_id=grupo.id, colegio_id=parametros['colegio_id'])
+    if not entradas:
+        raise ValueError('No hay documentos de aprendices en este grupo')
+
+    progreso(5, f'Uniendo {len(entradas)} documentos...')
+    pdf_cache, _ = PaqueteService.obtener_o_generar(
+        PaqueteService.clave_grupo(grupo.id, parametros['colegio_id'], entradas),
+        lambda: generar_pdf_unificado_grupo(grupo, entradas)
+    )
+
+    # La caché puede desalojar su copia: el trabajo conserva la suya hasta que vence
+    pdf_path = os.path.join(carpeta, os.path.basename(pdf_cache))
+    shutil.copyfile(pdf_cache, pdf_path)
+
+    return pdf_path, os.path.basename(pdf_path), 'application/pdf'
+
+@tarea('formatos_grupo')
+def formatos_grupo(trabajo, progreso, carpeta):
+    """ZIP con los formatos (Tratamiento de Datos / Compromiso) de todos los aprendices de un grupo"""
+    from app.services.formato_service import generar_formatos_grupo
+
+    parametros = trabajo.parametros
+    grupo = db.session.get(Grupo, parametros['grupo_id'])
+    if not grupo:
+        raise ValueError('El grupo no existe')
+
+    query = Aprendiz.query.options(
+        joinedload(Aprendiz.usuario),
+        joinedload(Aprendiz.grupo),
+        joinedload(Aprendiz.programa)
+    ).join(Usuario, Aprendiz.usuario_id == Usuario.id).filter(Aprendiz.grupo_id == grupo.id)
+
+    if parametros.get('colegio_id'):
+        query = query.filter(Aprendiz.colegio_id == parametros['colegio_id'])
+
+    aprendices = query.order_by(Usuario.apellidos, Usuario.nombres).all()
+    if not aprendices:
+        raise ValueError('No hay aprendices en este grupo')
+
+    nombre_zip = f"Formatos_Grupo_{grupo.nombre}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip"
+    ruta_zip = os.path.join(carpeta, nombre_zip)
+
+    generar_formatos_grupo(aprendices, parametros['tipos'], ruta_zip, progreso)
+
+    return ruta_zip, nombre_zip, 'application/zip'
+
+@tarea('sofia')
+def formato_sofia(trabajo, progreso, carpeta):
+    """Formato SOFIA Plus con los filtros del formulario"""
+    from app.services.sofia_service import SofiaService
+
+    parametros = trabajo.parametros
+    progreso(5, 'Generando formato SOFIA...')
+
+    success, message, file_path = SofiaService.generar_formato_sofia(
+        filtro_tipo=parametros['filtro_tipo'],
+        filtro_id=parametros.get('filtro_id'),
+        docente_colegio_id=parametros.get('docente_colegio_id')
+    )
+
+    if not success:
+        raise ValueError(message)
+
+    file_path = _mover_a_carpeta(file_path, carpeta)
+    return file_path, os.path.basename(file_path), MIMETYPE_XLSX
+
+@tarea('reporte_matriculas')
+def reporte_matriculas(trabajo, progreso, carpeta):
+    """Reporte de matrículas (xlsx, csv o parquet) escrito a disco por bloques"""
+    parametros = trabajo.parametros
+    query = ReporteService.consulta_matriculas(**parametros.get('filtros', {}))
+
+    total = query.count()
+    progreso(5, f'Exportando {total} matrículas...')
+
+    contenido, mimetype, extension = ReporteService.exportar_matriculas(query, parametros.get('formato', 'xlsx'))
+
+    nombre = f"{parametros.get('nombre', 'reporte_matriculas')}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{extension}"
+    ruta = os.path.join(carpeta, nombre)
+
+    with open(ruta, 'wb') as archivo:
+        if isinstance(contenido, bytes):
+            archivo.write(contenido)
+        else:
+            for bloque in contenido:
+                archivo.write(bloque)
+
+    return ruta, nombre, mimetype
@@ -0,0 +1,238 @@
+from app.models import db, Trabajo
+from flask import current_app
+from sqlalchemy import update
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+import os
+import shutil
+import threading
+import uuid
+
+# tipo -> función(trabajo, progreso, carpeta) que retorna (ruta, nombre_descarga, mimetype)
+_TAREAS = {}
+
+_pool = None
+_pool_lock = threading.Lock()
+
+# Cada cuántos segundos el ejecutor renueva actualizado_at aunque la tarea no informe avance
+SEGUNDOS_LATIDO = 60
+
+def tarea(tipo):
+    """
+    Registra una función como tarea ejecutable en segundo plano
+
+    La función recibe el Trabajo, un callback progreso(porcentaje, mensaje=None)
+    y la carpeta donde debe escribir el resultado. Debe retornar
+    (ruta_archivo, nombre_descarga, mimetype). El mensaje de la excepción se
+    muestra al usuario; las que no son ValueError además se registran en el log.
+    """
+    def decorador(funcion):
+        _TAREAS[tipo] = funcion
+        return funcion
+    return decorador
+
+def _obtener_pool(app):
+    """Pool de hilos compartido por el proceso (se crea con el primer trabajo)"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(
+                max_workers=app.config.get('TRABAJOS_WORKERS', 2),
+                thread_name_prefix='trabajo'
+            )
+        return _pool
+
+class TrabajoService:
+    """
+    Cola de trabajos en segundo plano sin broker externo
+
+    Los trabajos se registran en la tabla 'trabajos' y se ejecutan en un pool de
+    hilos del mismo proceso. Cada trabajo escribe su resultado en
+    REPORTS_FOLDER/trabajos/<id>/ y el usuario lo descarga cuando termina.
+    """
+
+    @staticmethod
+    def carpeta_trabajo(trabajo_id):
+        return os.path.join(current_app.config['REPORTS_FOLDER'], 'trabajos', trabajo_id)
+
+    @staticmethod
+    def encolar(tipo, usuario_id, mensaje=None, **parametros):
+        """
+        Registra un trabajo y lo envía al pool
+        Returns: Trabajo creado (estado PENDIENTE)
+        """
+        if tipo not in _TAREAS:
+            raise ValueError(f'Tipo de trabajo desconocido: {tipo}')
+
+        TrabajoService.limpiar_vencidos()
+
+        trabajo = Trabajo(
+            id=uuid.uuid4().hex,
+            tipo=tipo,
+            estado='PENDIENTE',
+            progreso=0,
+            mensaje=mensaje or 'En cola',
+            parametros=parametros,
+            usuario_id=usuario_id
+        )
+        db.session.add(trabajo)
+        db.session.commit()
+
+        app = current_app._get_current_object()
+        _obtener_pool(app).submit(TrabajoService._ejecutar, app, trabajo.id)
+        return trabajo
+
+    @staticmethod
+    def _actualizar(trabajo_id, **valores):
+        """
+        Actualiza el registro en una transacción propia, sin tocar la sesión de la tarea
+        Solo afecta trabajos EN_PROCESO: uno ya marcado como interrumpido no se reactiva
+        Returns: 1 si se actualizó, 0 si el trabajo ya no está en proceso
+        """
+        valores['actualizado_at'] = datetime.utcnow()
+        with db.engine.begin() as conexion:
+            return conexion.execute(
+                update(Trabajo)
+                .where(Trabajo.id == trabajo_id, Trabajo.estado == 'EN_PROCESO')
+                .values(**valores)
+            ).rowcount
+
+    @staticmethod
+    def _latido(app, trabajo_id, detener):
+        """Renueva actualizado_at cada SEGUNDOS_LATIDO hasta que termine la tarea"""
+        with app.app_context():
+            while not detener.wait(SEGUNDOS_LATIDO):
+                try:
+                    if not TrabajoService._actualizar(trabajo_id):
+                        return
+                except Exception as e:
+                    app.logger.warning(f"No se pudo renovar el trabajo {trabajo_id}: {e}")
+
+    @staticmethod
+    def _ejecutar(app, trabajo_id):
+        """Ejecuta un trabajo dentro del pool (hilo sin contexto de petición)"""
+        with app.app_context():
+            detener = threading.Event()
+            try:
+                # Solo un ejecutor puede tomar el trabajo (PENDIENTE -> EN_PROCESO)
+                with db.engine.begin() as conexion:
+                    tomado = conexion.execute(
+                        update(Trabajo)
+                        .where(Trabajo.id == trabajo_id, Trabajo.estado == 'PENDIENTE')
+                        .values(estado='EN_PROCESO', mensaje='Procesando...',
+                                iniciado_at=datetime.utcnow(), actualizado_at=datetime.utcnow())
+                    ).rowcount
+                if not tomado:
+                    return
+
+                threading.Thread(
+                    target=TrabajoService._latido,
+                    args=(app, trabajo_id, detener),
+                    name=f'latido-{trabajo_id[:8]}',
+                    daemon=True
+                ).start()
+
+                trabajo = db.session.get(Trabajo, trabajo_id)
+                ultimo = {'progreso': 0}
+
+                def progreso(porcentaje, mensaje=None):
+                    porcentaje = max(0, min(99, int(porcentaje)))
+                    if porcentaje == ultimo['progreso'] and mensaje is None:
+                        return
+                    ultimo['progreso'] = porcentaje
+                    valores = {'progreso': porcentaje}
+                    if mensaje:
+                        valores['mensaje'] = mensaje[:255]
+                    TrabajoService._actualizar(trabajo_id, **valores)
+
+                carpeta = TrabajoService.carpeta_trabajo(trabajo_id)
+                os.makedirs(carpeta, exist_ok=True)
+
+                ruta, nombre_descarga, mimetype = _TAREAS[trabajo.tipo](trabajo, progreso, carpeta)
+
+                TrabajoService._actualizar(
+                    trabajo_id,
+                    estado='COMPLETADO',
+                    progreso=100,
+                    mensaje='Archivo listo para descargar',
+                    ruta_resultado=ruta,
+                    nombre_descarga=nombre_descarga,
+                    mimetype=mimetype,
+                    finalizado_at=datetime.utcnow()
+                )
+
+            except Exception as e:
+                db.session.rollback()
+                if not isinstance(e, ValueError):
+                    app.logger.exception(f"Error en trabajo {trabajo_id}: {e}")
+                try:
+                    TrabajoService._actualizar(
+                        trabajo_id,
+                        estado='ERROR',
+                        mensaje='El trabajo falló',
+                        error=str(e),
+                        finalizado_at=datetime.utcnow()
+                    )
+                except Exception as e_registro:
+                    app.logger.error(f"No se pudo registrar el error del trabajo {trabajo_id}: {e_registro}")
+
+            finally:
+                detener.set()
+                db.session.remove()
+
+    @staticmethod
+    def obtener(trabajo_id, usuario_id):
+        """
+        Trabajo del usuario o None
+        Un trabajo EN_PROCESO sin latido del ejecutor durante TRABAJOS_MINUTOS_INACTIVIDAD
+        se marca como interrumpido (el proceso que lo ejecutaba se reinició). Los
+        PENDIENTE no se tocan: pueden estar esperando turno en el pool.
+        """
+        trabajo = Trabajo.query.filter_by(id=trabajo_id, usuario_id=usuario_id).first()
+
+        if trabajo and trabajo.estado == 'EN_PROCESO':
+            limite = datetime.utcnow() - timedelta(
+                minutes=current_app.config.get('TRABAJOS_MINUTOS_INACTIVIDAD', 30)
+            )
+            if (trabajo.actualizado_at or trabajo.iniciado_at) < limite:
+                # Condicionado al estado y al último latido por si el ejecutor termina a la vez
+                Trabajo.query.filter(
+                    Trabajo.id == trabajo_id,
+                    Trabajo.estado == 'EN_PROCESO',
+                    db.func.coalesce(Trabajo.actualizado_at, Trabajo.iniciado_at) < limite
+                ).update({
+                    'estado': 'ERROR',
+                    'mensaje': 'El trabajo falló',
+                    'error': 'El trabajo se interrumpió. Vuelva a solicitarlo.',
+                    'finalizado_at': datetime.utcnow()
+                }, synchronize_session=False)
+                db.session.commit()
+
+        return trabajo
+
+    @staticmethod
+    def listar(usuario_id, limite=20):
+        """Trabajos más recientes del usuario"""
+        return Trabajo.query.filter_by(usuario_id=usuario_id).order_by(
+            Trabajo.created_at.desc()
+        ).limit(limite).all()
+
+    @staticmethod
+    def limpiar_vencidos():
+        """Elimina los trabajos terminados hace más de TRABAJOS_HORAS_RETENCION y sus archivos"""
+        limite = datetime.utcnow() - timedelta(hours=current_app.config.get('TRABAJOS_HORAS_RETENCION', 24))
+
+        vencidos = [trabajo_id for (trabajo_id,) in db.session.query(Trabajo.id).filter(
+            Trabajo.estado.in_(['COMPLETADO', 'ERROR']),
+            Trabajo.finalizado_at < limite
+        ).all()]
+
+        if not vencidos:
+            return 0
+
+        for trabajo_id in vencidos:
+            shutil.rmtree(TrabajoService.carpeta_trabajo(trabajo_id), ignore_errors=True)
+
+        Trabajo.query.filter(Trabajo.id.in_(vencidos)).delete(synchronize_session=False)
+        db.session.commit()
+        return len(vencidos)
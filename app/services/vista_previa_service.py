@@ -0,0 +1,63 @@
+from app.utils.helpers import resolver_ruta_documento
+from app.utils.ingesta import MIME_POR_EXTENSION
+from app.utils.vista_previa import generar_miniatura, formato_miniatura, buscar_pdftoppm
+from flask import current_app
+import os
+
+class VistaPreviaService:
+    """
+    Miniaturas de documentos para revisar sin descargar el archivo completo
+
+    Se generan la primera vez que se piden y quedan en VISTAS_PREVIAS_CACHE con
+    el id del Documento como nombre. Si el archivo del documento es más reciente
+    que la miniatura (p. ej. porque se optimizó después de cargarlo) se genera
+    de nuevo.
+    """
+
+    @staticmethod
+    def _ruta_cache(documento_id):
+        extension, _ = formato_miniatura()
+        return os.path.join(current_app.config['VISTAS_PREVIAS_CACHE'], f'{documento_id}.{extension}')
+
+    @staticmethod
+    def obtener(documento):
+        """
+        Miniatura de un documento, generándola si hace falta
+
+        Returns:
+            (ruta, mime_type) de la miniatura, o (None, None) si el documento no
+            tiene archivo o no se puede dibujar
+        """
+        origen = resolver_ruta_documento(documento.ruta_archivo)
+        if not os.path.exists(origen):
+            return None, None
+
+        ruta = VistaPreviaService._ruta_cache(documento.id)
+        _, mime_miniatura = formato_miniatura()
+        if os.path.exists(ruta) and os.path.getmtime(ruta) >= os.path.getmtime(origen):
+            return ruta, mime_miniatura
+
+        config = current_app.config
+        mime_type = documento.mime_type or MIME_POR_EXTENSION.get((documento.extension or '').lower())
+        os.makedirs(config['VISTAS_PREVIAS_CACHE'], exist_ok=True)
+
+        try:
+            generada = generar_miniatura(
+                origen, mime_type, ruta, config['VISTA_PREVIA_LADO'],
+                pdftoppm=buscar_pdftoppm(config.get('PDFTOPPM_BIN'))
+            )
+        except Exception as e:
+            current_app.logger.warning(f"No se pudo generar la vista previa del documento {documento.id}: {e}")
+            return None, None
+
+        if not generada:
+            return None, None
+        return ruta, mime_miniatura
+
+    @staticmethod
+    def eliminar(documento_id):
+        """Elimina la miniatura de un documento (si existe)"""
+        for extension in ('webp', 'png'):
+            ruta = os.path.join(current_app.config['VISTAS_PREVIAS_CACHE'], f'{documento_id}.{extension}')
+            if os.path.exists(ruta):
+                os.remove(ruta)
@@ -0,0 +1,156 @@
+"""
+Conversión DOCX -> PDF con LibreOffice en modo headless
+
+LibreOffice tarda varios segundos en arrancar la primera vez con un perfil de
+usuario nuevo (lo crea y lo registra) y no admite dos instancias sobre el mismo
+perfil. El convertidor mantiene un perfil ya inicializado por cada worker y una
+cola de perfiles libres: cada conversión toma un perfil, ejecuta soffice sobre
+él y lo devuelve, de modo que N documentos se convierten de a N en paralelo y
+ninguno paga el arranque en frío. Cada conversión tiene un tiempo máximo; si se
+supera se termina todo el grupo de procesos de soffice.
+"""
+import logging
+import os
+import queue
+import shutil
+import signal
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+_convertidor = None
+_lock = threading.Lock()
+
+class ErrorConversion(Exception):
+    """La conversión de un documento falló o superó el tiempo máximo"""
+
+class ConvertidorLibreOffice:
+    """
+    Pool de workers de LibreOffice headless con perfiles precalentados
+
+    Args:
+        comando: Ejecutable de LibreOffice (soffice)
+        carpeta_perfiles: Carpeta donde se guardan los perfiles de los workers
+        workers: Conversiones simultáneas
+        timeout: Segundos máximos por documento
+    """
+
+    def __init__(self, comando, carpeta_perfiles, workers=2, timeout=60):
+        self.comando = comando
+        self.timeout = timeout
+        self.workers = max(1, workers)
+        self.rutas_perfiles = [os.path.join(carpeta_perfiles, f'worker_{indice}') for indice in range(self.workers)]
+        self.perfiles = queue.Queue()
+        self.pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='soffice')
+
+        for perfil in self.rutas_perfiles:
+            os.makedirs(perfil, exist_ok=True)
+            self.perfiles.put(perfil)
+
+    def _ejecutar(self, perfil, argumentos):
+        """Ejecuta soffice sobre un perfil, terminando su grupo de procesos si se excede el tiempo"""
+        proceso = subprocess.Popen(
+            [
+                self.comando,
+                f'-env:UserInstallation={Path(perfil).as_uri()}',
+                '--headless', '--invisible', '--nologo', '--nodefault',
+                '--nolockcheck', '--norestore', '--nofirststartwizard',
+                *argumentos
+            ],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            # soffice lanza soffice.bin como hijo: se mata el grupo completo
+            start_new_session=True
+        )
+        try:
+            salida, errores = proceso.communicate(timeout=self.timeout)
+        except subprocess.TimeoutExpired:
+            os.killpg(proceso.pid, signal.SIGKILL)
+            proceso.communicate()
+            raise ErrorConversion(f'LibreOffice superó el tiempo máximo de {self.timeout} s')
+
+        if proceso.returncode != 0:
+            raise ErrorConversion(errores.decode(errors='replace').strip() or f'soffice terminó con código {proceso.returncode}')
+        return salida
+
+    def calentar(self):
+        """Inicializa en paralelo los perfiles que aún no existen (antes de aceptar conversiones)"""
+        pendientes = [perfil for perfil in self.rutas_perfiles if not os.path.isdir(os.path.join(perfil, 'user'))]
+        for futuro in [self.pool.submit(self._ejecutar, perfil, ['--terminate_after_init']) for perfil in pendientes]:
+            futuro.result()
+
+    def _convertir(self, ruta_docx, carpeta_salida):
+        perfil = self.perfiles.get()
+        try:
+            self._ejecutar(perfil, ['--convert-to', 'pdf', '--outdir', carpeta_salida, ruta_docx])
+        finally:
+            self.perfiles.put(perfil)
+
+        ruta_pdf = os.path.join(carpeta_salida, Path(ruta_docx).stem + '.pdf')
+        if not os.path.exists(ruta_pdf):
+            raise ErrorConversion(f'LibreOffice no generó el PDF de {os.path.basename(ruta_docx)}')
+        return ruta_pdf
+
+    def convertir(self, ruta_docx, carpeta_salida=None):
+        """
+        Convierte un documento (espera su turno en la cola si todos los workers están ocupados)
+        Returns: Ruta del PDF generado
+        """
+        carpeta_salida = carpeta_salida or os.path.dirname(os.path.abspath(ruta_docx))
+        return self.pool.submit(self._convertir, os.path.abspath(ruta_docx), carpeta_salida).result()
+
+    def convertir_varios(self, rutas_docx, carpeta_salida=None):
+        """
+        Convierte varios documentos en paralelo
+        Returns: dict ruta_docx -> ruta del PDF, o la excepción si ese documento falló
+        """
+        futuros = {
+            ruta: self.pool.submit(
+                self._convertir,
+                os.path.abspath(ruta),
+                carpeta_salida or os.path.dirname(os.path.abspath(ruta))
+            )
+            for ruta in rutas_docx
+        }
+
+        resultados = {}
+        for ruta, futuro in futuros.items():
+            try:
+                resultados[ruta] = futuro.result()
+            except Exception as e:
+                logger.warning(f"No se pudo convertir {os.path.basename(ruta)}: {e}")
+                resultados[ruta] = e
+        return resultados
+
+def obtener_convertidor(config):
+    """
+    Convertidor compartido por el proceso, o None si LibreOffice no está instalado
+
+    Args:
+        config: Configuración de la aplicación (current_app.config)
+    """
+    global _convertidor
+
+    with _lock:
+        if _convertidor is None:
+            comando = shutil.which(config.get('LIBREOFFICE_BIN', 'soffice'))
+            if not comando:
+                return None
+
+            convertidor = ConvertidorLibreOffice(
+                comando,
+                os.path.join(config['CACHE_FOLDER'], 'libreoffice'),
+                workers=config.get('PDF_CONVERSION_WORKERS', 2),
+                timeout=config.get('PDF_CONVERSION_TIMEOUT', 60)
+            )
+            try:
+                convertidor.calentar()
+            except Exception as e:
+                # Las conversiones igual funcionan; el primer uso de cada perfil será lento
+                logger.warning(f"No se pudieron inicializar los perfiles de LibreOffice: {e}")
+            _convertidor = convertidor
+
+        return _convertidor
@@ -33,6 +33,22 @@ class CryptoService:
             current_app.logger.error(f"Error al encriptar: {e}")
             return None
 
+    @staticmethod
+    def encrypt_passwords(passwords):
+        """
+        Encripta varias contraseñas reutilizando el mismo objeto Fernet
+        Args:
+            passwords (list): Contraseñas en texto plano
+        Returns:
+            list: Contraseñas encriptadas (None en las que fallen)
+        """
+        try:
+            cipher = CryptoService._get_cipher()
+        except Exception as e:
+            current_app.logger.error(f"Error al encriptar: {e}")
+            return [None] * len(passwords)
+        return [cipher.encrypt(password.encode()).decode() for password in passwords]
+
     @staticmethod
     def decrypt_password(encrypted_password):
         """
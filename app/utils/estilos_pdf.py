@@ -0,0 +1,111 @@
+"""
+Estilos de los reportes PDF (reportlab)
+
+getSampleStyleSheet() crea unas 20 ParagraphStyle nuevas en cada llamada, y
+los reportes además armaban sus propios estilos y TableStyle idénticos en cada
+generación. Aquí se construyen una sola vez por proceso y se comparten: ni
+Paragraph ni Table.setStyle modifican el estilo que reciben, así que es seguro
+usarlos desde varios reportes (e hilos) a la vez. No se deben modificar.
+"""
+from functools import lru_cache
+
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_CENTER
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.platypus import TableStyle
+
+VERDE_SENA = colors.HexColor('#2E7D32')
+VERDE_CLARO = colors.HexColor('#E8F5E9')
+VERDE_FILA = colors.HexColor('#F1F8E9')
+MORADO = colors.HexColor('#667eea')
+GRIS_FILA = colors.HexColor('#f7fafc')
+GRIS_TEXTO = colors.HexColor('#4a5568')
+
+@lru_cache(maxsize=None)
+def hoja_estilos():
+    """Hoja de estilos base de reportlab (Normal, Heading1, Heading2...) compartida"""
+    return getSampleStyleSheet()
+
+@lru_cache(maxsize=None)
+def estilos_parrafo():
+    """
+    Estilos de párrafo de los reportes
+
+    Returns:
+        dict: nombre -> ParagraphStyle
+    """
+    base = hoja_estilos()
+    return {
+        'normal': base['Normal'],
+        'seccion': base['Heading2'],
+        'subseccion': base['Heading3'],
+        'titulo_resumen': ParagraphStyle(
+            'TituloResumen',
+            parent=base['Heading1'],
+            fontSize=18,
+            textColor=VERDE_SENA,
+            spaceAfter=30,
+            alignment=TA_CENTER
+        ),
+        'titulo_reporte': ParagraphStyle(
+            'TituloReporte',
+            parent=base['Heading1'],
+            fontSize=16,
+            textColor=MORADO,
+            spaceAfter=20,
+            alignment=TA_CENTER
+        ),
+        'subtitulo': ParagraphStyle(
+            'Subtitulo',
+            parent=base['Normal'],
+            fontSize=12,
+            textColor=GRIS_TEXTO,
+            spaceAfter=10,
+            alignment=TA_CENTER
+        ),
+        'pie': ParagraphStyle(
+            'Pie',
+            parent=base['Normal'],
+            fontSize=8,
+            textColor=colors.grey,
+            alignment=TA_CENTER
+        ),
+    }
+
+def _estilo_listado(color_encabezado, color_fila, tamano_fuente):
+    """Tabla con fila de encabezado de color y filas alternadas"""
+    return TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), color_encabezado),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, -1), tamano_fuente),
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, color_fila]),
+    ])
+
+@lru_cache(maxsize=None)
+def estilos_tabla():
+    """
+    Estilos de tabla de los reportes
+
+    Returns:
+        dict: nombre -> TableStyle
+            ficha: pares etiqueta/valor con la columna de etiquetas resaltada
+            documentos: listado de documentos del resumen del aprendiz
+            estadisticas: resumen por estado del reporte docente
+            listado: listado de matrículas del reporte docente
+    """
+    return {
+        'ficha': TableStyle([
+            ('BACKGROUND', (0, 0), (0, -1), VERDE_CLARO),
+            ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
+            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, -1), 10),
+            ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+        ]),
+        'documentos': _estilo_listado(VERDE_SENA, VERDE_FILA, 9),
+        'estadisticas': _estilo_listado(MORADO, GRIS_FILA, 10),
+        'listado': _estilo_listado(MORADO, GRIS_FILA, 8),
+    }
@@ -1,60 +1,20 @@
 import os
-from datetime import datetime
-from werkzeug.utils import secure_filename
 
-def get_upload_path(aprendiz, tipo_documento):
+def resolver_ruta_documento(ruta):
     """
-    Genera la ruta de carga estructurada para un documento
-    Formato: uploads/[TipoDoc]_[Nombre]_[Apellido]_[Ficha]_[Programa]/
+    Ruta absoluta de un archivo guardado en la base de datos
+    Las rutas relativas se buscan primero desde la carpeta app/ (donde se guardaban
+    las cargas) y luego desde la raíz del proyecto (almacén de documentos, ver
+    AlmacenService)
     """
-    from app.models import Documento
-    from flask import current_app
+    if os.path.isabs(ruta):
+        return ruta
 
-    usuario = aprendiz.usuario
-    programa = aprendiz.programa.nombre if aprendiz.programa else "SinPrograma"
-    grupo = aprendiz.grupo.nombre if aprendiz.grupo else "SinGrupo"
-
-    # Sanitizar nombres
-    nombres = usuario.nombres.replace(' ', '_')
-    apellidos = usuario.apellidos.replace(' ', '_')
-    programa_clean = programa.replace(' ', '_')
-    tipo_clean = tipo_documento.replace('_', '')
-
-    folder_name = f"{tipo_clean}_{nombres}_{apellidos}_{grupo}_{programa_clean}"
-
-    # Crear ruta completa absoluta desde el directorio de la app
-    base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    upload_folder = os.path.join(base_dir, 'uploads', folder_name)
-
-    return upload_folder
-
-def save_uploaded_file(file, aprendiz, tipo_documento):
-    """
-    Guarda un archivo cargado en la estructura correcta
-    Retorna la ruta relativa del archivo guardado
-    """
-    if not file:
-        return None
-
-    # Obtener la ruta de destino
-    upload_path = get_upload_path(aprendiz, tipo_documento)
-
-    # Crear el directorio si no existe
-    os.makedirs(upload_path, exist_ok=True)
-
-    # Generar nombre único del archivo
-    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    filename = secure_filename(file.filename)
-    name, ext = os.path.splitext(filename)
-    unique_filename = f"{name}_{timestamp}{ext}"
-
-    # Ruta completa del archivo
-    file_path = os.path.join(upload_path, unique_filename)
-
-    # Guardar el archivo
-    file.save(file_path)
-
-    return file_path
+    app_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    candidata = os.path.join(app_dir, ruta)
+    if os.path.exists(candidata):
+        return candidata
+    return os.path.join(os.path.dirname(app_dir), ruta)
 
 def format_file_size(size_bytes):
     """Formatea el tamaño de archivo a formato legible"""
@@ -84,3 +44,55 @@ def get_estado_badge_class(estado):
         'RECHAZADO': 'danger'
     }
     return badges.get(estado, 'secondary')
+
+def respuesta_trabajo_encolado(trabajo):
+    """
+    Respuesta de un endpoint que encoló un trabajo en segundo plano:
+    JSON con código 202 para peticiones AJAX o redirección a la página de estado
+    """
+    from flask import request, jsonify, flash, redirect, url_for
+
+    if request.is_json or request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+        return jsonify({
+            'success': True,
+            'trabajo_id': trabajo.id,
+            'url_estado': url_for('trabajos.estado', trabajo_id=trabajo.id),
+            'url_descarga': url_for('trabajos.descargar', trabajo_id=trabajo.id)
+        }), 202
+
+    flash('La generación del archivo quedó en proceso. Puede descargarlo desde esta página cuando termine.', 'info')
+    return redirect(url_for('trabajos.ver', trabajo_id=trabajo.id))
+
+def etag_documento(documento, prefijo=''):
+    """
+    ETag de un archivo de Documento: su id y el hash del contenido
+    (True, el ETag por fecha y tamaño de send_file, si aún no tiene hash)
+    """
+    if not documento.sha256:
+        return True
+    return f'{prefijo}{documento.id}-{documento.sha256}'
+
+def enviar_archivo_privado(ruta, etag=True, **kwargs):
+    """
+    send_file con caché privada del navegador revalidada en cada uso
+
+    El navegador guarda el archivo pero lo vuelve a pedir con If-None-Match /
+    If-Modified-Since (los permisos se verifican en cada petición); si no
+    cambió la respuesta es un 304 sin contenido. También atiende peticiones
+    Range (206), con las que los visores de PDF cargan por partes los archivos
+    grandes. add_no_cache_headers no reemplaza estas cabeceras.
+
+    Args:
+        ruta: Archivo a enviar
+        etag: ETag propio (p. ej. etag_documento) o True para el de send_file
+        **kwargs: mimetype, as_attachment, download_name de send_file
+    """
+    from flask import send_file
+
+    response = send_file(ruta, conditional=True, etag=etag, max_age=0, **kwargs)
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    # Werkzeug solo lo incluye en las respuestas 206; los visores de PDF lo
+    # buscan en la primera respuesta para empezar a pedir por partes
+    response.accept_ranges = 'bytes'
+    return response
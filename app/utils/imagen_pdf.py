@@ -0,0 +1,122 @@
+"""
+Conversión de imágenes subidas (JPG, PNG) a PDF para los PDFs unificados
+
+Cada imagen se reduce a un tamaño imprimible, se recomprime como JPEG y se
+guarda como un PDF de una página en la caché, con el id del Documento como
+nombre. Los documentos no se modifican después de subidos (un reemplazo crea
+un Documento nuevo), así que la página convertida sirve para todas las
+generaciones siguientes; si el archivo de origen es más reciente que la caché
+se vuelve a convertir.
+"""
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+EXTENSIONES_IMAGEN = {'.jpg', '.jpeg', '.png'}
+
+# Lado mayor de la página convertida: carta a 150 ppp
+LADO_MAXIMO = 1650
+RESOLUCION = 150
+CALIDAD_JPEG = 75
+
+# Por debajo de este número de imágenes no compensa levantar procesos
+MINIMO_PARALELO = 2
+
+def es_imagen(ruta):
+    return os.path.splitext(ruta)[1].lower() in EXTENSIONES_IMAGEN
+
+def ruta_en_cache(carpeta_cache, documento_id):
+    return os.path.join(carpeta_cache, f'{documento_id}.pdf')
+
+def _cache_vigente(ruta_pdf, ruta_imagen):
+    return os.path.exists(ruta_pdf) and os.path.getmtime(ruta_pdf) >= os.path.getmtime(ruta_imagen)
+
+def convertir_imagen_a_pdf(ruta_imagen, ruta_pdf):
+    """
+    Convierte una imagen en un PDF de una página (reducida y recomprimida)
+    Se ejecuta en los procesos del pool (función de módulo para poder enviarla)
+
+    Returns: None si se convirtió, o el mensaje de error
+    """
+    try:
+        from PIL import Image, ImageOps
+    except ImportError:
+        return 'La conversión de imágenes requiere el paquete Pillow, que no está instalado'
+
+    temporal = f'{ruta_pdf}.{os.getpid()}.tmp'
+    try:
+        with Image.open(ruta_imagen) as imagen:
+            # Fotos de celular: respetar la orientación EXIF
+            imagen = ImageOps.exif_transpose(imagen)
+            if imagen.mode in ('RGBA', 'LA', 'P'):
+                imagen = imagen.convert('RGBA')
+                fondo = Image.new('RGB', imagen.size, 'white')
+                fondo.paste(imagen, mask=imagen.getchannel('A'))
+                imagen = fondo
+            elif imagen.mode != 'RGB':
+                imagen = imagen.convert('RGB')
+
+            imagen.thumbnail((LADO_MAXIMO, LADO_MAXIMO))
+            imagen.save(temporal, 'PDF', resolution=RESOLUCION, quality=CALIDAD_JPEG, optimize=True)
+
+        # Reemplazo atómico: un lector concurrente nunca ve un PDF a medio escribir
+        os.replace(temporal, ruta_pdf)
+        return None
+    except Exception as e:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+        return str(e) or e.__class__.__name__
+
+def convertir_imagenes(imagenes, carpeta_cache, workers=None):
+    """
+    Asegura en la caché la página PDF de cada imagen
+
+    Args:
+        imagenes: Lista de tuplas (documento_id, ruta_imagen)
+        carpeta_cache: Carpeta de la caché de conversiones
+        workers: Procesos para convertir (por defecto, número de CPUs)
+
+    Returns:
+        dict: documento_id -> ruta del PDF convertido (solo las que se pudieron convertir)
+    """
+    os.makedirs(carpeta_cache, exist_ok=True)
+    convertidas = {}
+    pendientes = []
+
+    for documento_id, ruta_imagen in imagenes:
+        ruta_pdf = ruta_en_cache(carpeta_cache, documento_id)
+        if _cache_vigente(ruta_pdf, ruta_imagen):
+            convertidas[documento_id] = ruta_pdf
+        else:
+            pendientes.append((documento_id, ruta_imagen, ruta_pdf))
+
+    if not pendientes:
+        return convertidas
+
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1 or len(pendientes) < MINIMO_PARALELO:
+        errores = [convertir_imagen_a_pdf(ruta_imagen, ruta_pdf) for _, ruta_imagen, ruta_pdf in pendientes]
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(pendientes))) as pool:
+            errores = list(pool.map(
+                convertir_imagen_a_pdf,
+                [ruta_imagen for _, ruta_imagen, _ in pendientes],
+                [ruta_pdf for _, _, ruta_pdf in pendientes]
+            ))
+
+    for (documento_id, ruta_imagen, ruta_pdf), error in zip(pendientes, errores):
+        if error:
+            logger.warning(f"No se pudo convertir la imagen {os.path.basename(ruta_imagen)}: {error}")
+        else:
+            convertidas[documento_id] = ruta_pdf
+
+    logger.info(f"Imágenes convertidas a PDF: {errores.count(None)} de {len(pendientes)} pendientes")
+    return convertidas
+
+def eliminar_de_cache(carpeta_cache, documento_id):
+    """Elimina la página convertida de un documento (si existe)"""
+    ruta_pdf = ruta_en_cache(carpeta_cache, documento_id)
+    if os.path.exists(ruta_pdf):
+        os.remove(ruta_pdf)
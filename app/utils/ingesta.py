@@ -0,0 +1,169 @@
+"""
+Recepción de archivos cargados
+
+El archivo se copia al disco por bloques y, en la misma pasada, se calcula su
+SHA-256 y se identifica el tipo real de contenido por sus primeros bytes
+(firma o "magic bytes"), sin confiar en la extensión ni en el Content-Type que
+envía el navegador. Se escribe primero a un archivo temporal: quien lo recibe
+decide con el hash dónde guardarlo (mover) o si ya tiene ese mismo contenido
+guardado (descartar).
+"""
+import hashlib
+import os
+import shutil
+import uuid
+
+TAMANO_BLOQUE = 64 * 1024
+
+# Firma al inicio del archivo -> tipo MIME
+FIRMAS = [
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+]
+
+# Los lectores de PDF aceptan la cabecera en cualquier punto del primer KB (hay
+# escáneres y pasarelas de correo que agregan un BOM u otros bytes antes)
+FIRMA_PDF = b'%PDF-'
+LONGITUD_CABECERA = 1024
+
+EXTENSION_POR_MIME = {
+    'application/pdf': 'pdf',
+    'image/jpeg': 'jpg',
+    'image/png': 'png',
+}
+
+MIME_POR_EXTENSION = {
+    'pdf': 'application/pdf',
+    'jpg': 'image/jpeg',
+    'jpeg': 'image/jpeg',
+    'png': 'image/png',
+}
+
+class ErrorIngesta(ValueError):
+    """El contenido del archivo no es válido (vacío, tipo no reconocido o distinto al de la extensión)"""
+
+def detectar_mime(cabecera):
+    """Tipo MIME según los primeros bytes del archivo (hasta LONGITUD_CABECERA), o None si no se reconoce"""
+    for firma, mime_type in FIRMAS:
+        if cabecera.startswith(firma):
+            return mime_type
+    if FIRMA_PDF in cabecera[:LONGITUD_CABECERA]:
+        return 'application/pdf'
+    return None
+
+def _tipos_compatibles(mime_extension, mime_contenido):
+    # Un JPG guardado como .png (o al revés) se procesa igual: solo importa que
+    # un PDF sea PDF y una imagen sea imagen
+    return mime_extension == mime_contenido or (
+        mime_extension.startswith('image/') and mime_contenido.startswith('image/')
+    )
+
+class ArchivoIngerido:
+    """
+    Archivo recibido, aún con nombre temporal
+
+    Attributes:
+        ruta_temporal: Ruta del archivo recibido
+        sha256: Hash del contenido (hex)
+        mime_type: Tipo detectado por contenido
+        tamano: Bytes escritos
+    """
+
+    def __init__(self, ruta_temporal, sha256, mime_type, tamano):
+        self.ruta_temporal = ruta_temporal
+        self.sha256 = sha256
+        self.mime_type = mime_type
+        self.tamano = tamano
+
+    def mover(self, ruta_destino):
+        """Deja el archivo en su ruta definitiva (debe estar en el mismo sistema de archivos)"""
+        os.makedirs(os.path.dirname(ruta_destino), exist_ok=True)
+        os.replace(self.ruta_temporal, ruta_destino)
+        return ruta_destino
+
+    def enlazar(self, ruta_destino):
+        """
+        Publica el contenido en su ruta definitiva conservando el archivo temporal
+        (enlace duro; copia si el sistema de archivos no lo permite)
+        """
+        os.makedirs(os.path.dirname(ruta_destino), exist_ok=True)
+        try:
+            os.link(self.ruta_temporal, ruta_destino)
+        except FileExistsError:
+            pass
+        except OSError:
+            copia = f'{ruta_destino}.{uuid.uuid4().hex}.part'
+            shutil.copy2(self.ruta_temporal, copia)
+            os.replace(copia, ruta_destino)
+        return ruta_destino
+
+    def descartar(self):
+        """Elimina el archivo temporal (el contenido ya estaba guardado)"""
+        if os.path.exists(self.ruta_temporal):
+            os.remove(self.ruta_temporal)
+
+def hash_archivo(ruta):
+    """
+    Hash, tipo por contenido y tamaño de un archivo ya guardado
+    Returns: (sha256, mime_type o None, tamaño)
+    """
+    hash_contenido = hashlib.sha256()
+    tamano = 0
+    with open(ruta, 'rb') as archivo:
+        cabecera = archivo.read(LONGITUD_CABECERA)
+        archivo.seek(0)
+        for bloque in iter(lambda: archivo.read(TAMANO_BLOQUE), b''):
+            hash_contenido.update(bloque)
+            tamano += len(bloque)
+    return hash_contenido.hexdigest(), detectar_mime(cabecera), tamano
+
+def ingerir_archivo(origen, carpeta_temporal, extension):
+    """
+    Copia un archivo cargado por bloques calculando su hash y su tipo real
+
+    Args:
+        origen: Objeto tipo archivo (FileStorage.stream)
+        carpeta_temporal: Carpeta donde queda el archivo hasta moverlo (debe existir
+            y estar en el mismo sistema de archivos que el destino)
+        extension: Extensión declarada, sin punto
+
+    Returns:
+        ArchivoIngerido con nombre temporal
+
+    Raises:
+        ErrorIngesta: Si el contenido no corresponde a un tipo permitido
+    """
+    ruta_temporal = os.path.join(carpeta_temporal, f'{uuid.uuid4().hex}.part')
+
+    hash_contenido = hashlib.sha256()
+    cabecera = b''
+    tamano = 0
+
+    try:
+        with open(ruta_temporal, 'wb') as destino:
+            while True:
+                bloque = origen.read(TAMANO_BLOQUE)
+                if not bloque:
+                    break
+                if len(cabecera) < LONGITUD_CABECERA:
+                    cabecera += bloque[:LONGITUD_CABECERA - len(cabecera)]
+                hash_contenido.update(bloque)
+                destino.write(bloque)
+                tamano += len(bloque)
+
+        if not tamano:
+            raise ErrorIngesta('El archivo está vacío')
+
+        mime_type = detectar_mime(cabecera)
+        if not mime_type:
+            raise ErrorIngesta('El contenido del archivo no corresponde a un PDF, JPG o PNG')
+
+        mime_extension = MIME_POR_EXTENSION.get(extension.lower())
+        if not mime_extension or not _tipos_compatibles(mime_extension, mime_type):
+            raise ErrorIngesta(f'El contenido del archivo ({mime_type}) no corresponde a su extensión .{extension}')
+    except Exception:
+        if os.path.exists(ruta_temporal):
+            os.remove(ruta_temporal)
+        raise
+
+    return ArchivoIngerido(ruta_temporal, hash_contenido.hexdigest(), mime_type, tamano)
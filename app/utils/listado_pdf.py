@@ -0,0 +1,109 @@
+"""
+Listados largos en PDF (reportlab) partidos en bloques de una página
+
+Una Table con miles de filas se arma como un solo flowable: reportlab mide
+todas sus filas y, cada vez que la parte al final de una página, copia en una
+tabla nueva todas las filas que quedan, lo que vuelve la generación
+cuadrática. ListadoPaginado en cambio toma las filas de un iterador y, cada
+vez que el documento le pide partirse, arma solo la tabla (con su encabezado)
+que cabe en el espacio disponible. En memoria queda a lo sumo una página de
+filas, y cada fila se procesa una sola vez.
+
+Las filas deben ser de una sola línea (textos ya truncados), porque la altura
+de una fila se mide una vez y se usa para calcular cuántas caben.
+"""
+from collections import deque
+
+from reportlab.platypus import Flowable, Table
+
+class ListadoPaginado(Flowable):
+    """
+    Flowable que genera el listado página por página
+
+    Args:
+        encabezado: Fila de encabezado (se repite al comienzo de cada página)
+        filas: Iterable de filas (listas de textos); se recorre una sola vez
+        anchos: Ancho de cada columna
+        estilo: TableStyle de las tablas (se comparte entre todas)
+    """
+
+    def __init__(self, encabezado, filas, anchos, estilo):
+        super().__init__()
+        self.encabezado = encabezado
+        self.filas = iter(filas)
+        self.anchos = anchos
+        self.estilo = estilo
+        # Filas ya leídas del iterador que aún no se dibujaron
+        self.pendientes = deque()
+        self.alto_encabezado = None
+        self.alto_fila = None
+
+    def _hay_filas(self):
+        if not self.pendientes:
+            fila = next(self.filas, None)
+            if fila is None:
+                return False
+            self.pendientes.append(fila)
+        return True
+
+    def _tabla(self, filas):
+        tabla = Table([self.encabezado] + filas, colWidths=self.anchos, repeatRows=1)
+        tabla.setStyle(self.estilo)
+        return tabla
+
+    def _medir(self, ancho):
+        """Mide el encabezado y una fila con una tabla de prueba"""
+        tabla = self._tabla([self.pendientes[0]])
+        tabla.wrap(ancho, 1e6)
+        self.alto_encabezado, self.alto_fila = tabla._rowHeights
+
+    def _resto(self):
+        """
+        Continuación del listado para la página siguiente
+        (un objeto nuevo: el documento marca como pospuesto al que no cupo)
+        """
+        resto = ListadoPaginado(self.encabezado, self.filas, self.anchos, self.estilo)
+        resto.pendientes = self.pendientes
+        resto.alto_encabezado = self.alto_encabezado
+        resto.alto_fila = self.alto_fila
+        return resto
+
+    def wrap(self, availWidth, availHeight):
+        # Con filas por dibujar se declara más alto que el espacio disponible
+        # para que el documento siempre lo parta con split()
+        if not self._hay_filas():
+            return 0, 0
+        return availWidth, availHeight + 1
+
+    def split(self, availWidth, availHeight):
+        if not self._hay_filas():
+            return []
+
+        if self.alto_fila is None:
+            self._medir(availWidth)
+
+        cantidad = int((availHeight - self.alto_encabezado) // self.alto_fila)
+        if cantidad < 1:
+            # No cabe ni una fila: el documento pasa a la página siguiente
+            return []
+
+        while len(self.pendientes) < cantidad:
+            fila = next(self.filas, None)
+            if fila is None:
+                break
+            self.pendientes.append(fila)
+
+        bloque = [self.pendientes.popleft() for _ in range(min(cantidad, len(self.pendientes)))]
+        tabla = self._tabla(bloque)
+
+        # Por si alguna fila resultó más alta que la medida
+        while tabla.wrap(availWidth, availHeight)[1] > availHeight and len(bloque) > 1:
+            self.pendientes.appendleft(bloque.pop())
+            tabla = self._tabla(bloque)
+
+        if not self._hay_filas():
+            return [tabla]
+        return [tabla, self._resto()]
+
+    def draw(self):
+        pass
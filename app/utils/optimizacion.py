@@ -0,0 +1,116 @@
+"""
+Optimización de documentos cargados
+
+Las fotos de celular (4 a 12 MP) y los PDFs escaneados ocupan mucho más de lo
+necesario para leerlos o imprimirlos. Las imágenes se reducen para que su lado
+mayor corresponda a una hoja carta a la resolución configurada y se
+recomprimen como JPEG; en los PDFs se reducen del mismo modo las imágenes JPEG
+de cada página (escaneos) y se comprimen los flujos de contenido.
+
+Las funciones escriben el resultado en otra ruta y no deciden si conviene:
+quien las llama compara tamaños y conserva el más pequeño.
+"""
+from io import BytesIO
+
+from PyPDF2 import PdfReader, PdfWriter
+from PyPDF2.generic import NameObject, NumberObject
+
+# Lado mayor de una hoja carta en pulgadas
+PULGADAS_LADO_MAYOR = 11
+
+def lado_maximo(resolucion):
+    """Lado mayor en píxeles de una hoja carta a la resolución dada (ppp)"""
+    return int(resolucion * PULGADAS_LADO_MAYOR)
+
+def _importar_pil():
+    try:
+        from PIL import Image, ImageOps
+    except ImportError:
+        raise RuntimeError('La optimización de imágenes requiere el paquete Pillow, que no está instalado')
+    return Image, ImageOps
+
+def optimizar_imagen(ruta, ruta_salida, resolucion, calidad):
+    """
+    Reduce una imagen a la resolución dada y la guarda como JPEG
+    Returns: Tipo MIME del resultado
+    """
+    Image, ImageOps = _importar_pil()
+    lado = lado_maximo(resolucion)
+
+    with Image.open(ruta) as imagen:
+        # Fotos de celular: respetar la orientación EXIF (el JPEG nuevo no la conserva)
+        imagen = ImageOps.exif_transpose(imagen)
+        if imagen.mode in ('RGBA', 'LA', 'P'):
+            imagen = imagen.convert('RGBA')
+            fondo = Image.new('RGB', imagen.size, 'white')
+            fondo.paste(imagen, mask=imagen.getchannel('A'))
+            imagen = fondo
+        elif imagen.mode not in ('RGB', 'L'):
+            imagen = imagen.convert('RGB')
+
+        imagen.thumbnail((lado, lado))
+        imagen.save(ruta_salida, 'JPEG', quality=calidad, optimize=True, progressive=True)
+
+    return 'image/jpeg'
+
+def _reducir_imagenes_pagina(pagina, lado, calidad, vistas, Image):
+    """Reduce las imágenes JPEG de una página que superan el lado máximo"""
+    recursos = pagina.get('/Resources')
+    if recursos is None:
+        return
+    xobjetos = recursos.get_object().get('/XObject')
+    if xobjetos is None:
+        return
+
+    for referencia in xobjetos.get_object().values():
+        objeto = referencia.get_object()
+        # Una misma imagen puede repetirse en varias páginas
+        if id(objeto) in vistas or objeto.get('/Subtype') != '/Image':
+            continue
+        vistas.add(id(objeto))
+
+        # JPEG, directo o envuelto en otros filtros (p. ej. ASCII85)
+        filtro = objeto.get('/Filter')
+        filtros = [filtro] if isinstance(filtro, str) else list(filtro or [])
+        if not filtros or filtros[-1] != '/DCTDecode':
+            continue
+        if max(objeto['/Width'], objeto['/Height']) <= lado:
+            continue
+
+        with Image.open(BytesIO(objeto.get_data())) as imagen:
+            if imagen.mode not in ('RGB', 'L'):
+                continue
+            imagen.thumbnail((lado, lado))
+            salida = BytesIO()
+            imagen.save(salida, 'JPEG', quality=calidad, optimize=True)
+            ancho, alto = imagen.size
+
+        objeto._data = salida.getvalue()
+        objeto[NameObject('/Filter')] = NameObject('/DCTDecode')
+        objeto.pop('/DecodeParms', None)
+        objeto[NameObject('/Width')] = NumberObject(ancho)
+        objeto[NameObject('/Height')] = NumberObject(alto)
+
+def comprimir_pdf(ruta, ruta_salida, resolucion, calidad):
+    """
+    Reduce las imágenes escaneadas de un PDF y comprime sus flujos de contenido
+    Returns: Tipo MIME del resultado, o None si el PDF no se puede modificar (cifrado)
+    """
+    Image, _ = _importar_pil()
+    lado = lado_maximo(resolucion)
+
+    lector = PdfReader(ruta)
+    if lector.is_encrypted:
+        return None
+
+    escritor = PdfWriter()
+    vistas = set()
+    for pagina in lector.pages:
+        _reducir_imagenes_pagina(pagina, lado, calidad, vistas, Image)
+        escritor.add_page(pagina)
+        escritor.pages[-1].compress_content_streams()
+
+    with open(ruta_salida, 'wb') as salida:
+        escritor.write(salida)
+
+    return 'application/pdf'
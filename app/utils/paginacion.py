@@ -0,0 +1,163 @@
+import base64
+import json
+from datetime import datetime, date
+from sqlalchemy import and_, or_
+
+POR_PAGINA_DEFECTO = 50
+POR_PAGINA_MAXIMO = 200
+
+def orden_recientes(modelo):
+    """Orden estándar de los listados: más recientes primero (created_at, id)"""
+    return [(modelo.created_at, 'desc'), (modelo.id, 'desc')]
+
+def _codificar_valor(valor):
+    if isinstance(valor, datetime):
+        return {'dt': valor.isoformat()}
+    if isinstance(valor, date):
+        return {'d': valor.isoformat()}
+    return valor
+
+def _decodificar_valor(valor):
+    if isinstance(valor, dict):
+        if 'dt' in valor:
+            return datetime.fromisoformat(valor['dt'])
+        if 'd' in valor:
+            return date.fromisoformat(valor['d'])
+    return valor
+
+def codificar_cursor(valores):
+    """Codifica los valores de las columnas de orden en un cursor opaco (base64 url-safe)"""
+    datos = json.dumps([_codificar_valor(v) for v in valores], separators=(',', ':'))
+    return base64.urlsafe_b64encode(datos.encode()).decode().rstrip('=')
+
+def decodificar_cursor(cursor, n_columnas):
+    """
+    Decodifica un cursor generado por codificar_cursor
+    Retorna la lista de valores o None si el cursor es inválido
+    """
+    if not cursor:
+        return None
+    try:
+        relleno = '=' * (-len(cursor) % 4)
+        valores = json.loads(base64.urlsafe_b64decode(cursor + relleno).decode())
+        if not isinstance(valores, list) or len(valores) != n_columnas:
+            return None
+        return [_decodificar_valor(v) for v in valores]
+    except (ValueError, TypeError):
+        return None
+
+def _condicion_despues(orden, valores):
+    """
+    Condición "fila posterior al cursor" para un orden compuesto:
+    (c1 > v1) OR (c1 = v1 AND c2 > v2) OR ... respetando la dirección de cada columna
+    """
+    condiciones = []
+    for i, (columna, direccion) in enumerate(orden):
+        comparacion = columna < valores[i] if direccion == 'desc' else columna > valores[i]
+        iguales = [orden[j][0] == valores[j] for j in range(i)]
+        condiciones.append(and_(*iguales, comparacion) if iguales else comparacion)
+    return or_(*condiciones)
+
+def _invertir(orden):
+    return [(columna, 'asc' if direccion == 'desc' else 'desc') for columna, direccion in orden]
+
+def _order_by(orden):
+    return [columna.desc() if direccion == 'desc' else columna.asc() for columna, direccion in orden]
+
+class Pagina:
+    """
+    Página de resultados obtenida por paginación keyset (seek)
+
+    Se puede iterar y evaluar como una lista, de modo que los templates
+    existentes siguen funcionando con `{% for x in pagina %}`.
+    El total de registros se calcula solo si se consulta `pagina.total`.
+    """
+
+    def __init__(self, items, query, orden, por_pagina, tiene_anterior, tiene_siguiente):
+        self.items = items
+        self.por_pagina = por_pagina
+        self.tiene_anterior = tiene_anterior
+        self.tiene_siguiente = tiene_siguiente
+        self._query = query
+        self._orden = orden
+        self._total = None
+
+    def _cursor(self, item):
+        return codificar_cursor([getattr(item, columna.key) for columna, _ in self._orden])
+
+    @property
+    def cursor_anterior(self):
+        if not self.tiene_anterior or not self.items:
+            return None
+        return self._cursor(self.items[0])
+
+    @property
+    def cursor_siguiente(self):
+        if not self.tiene_siguiente or not self.items:
+            return None
+        return self._cursor(self.items[-1])
+
+    @property
+    def total(self):
+        """Total de registros del listado (consulta COUNT diferida y cacheada)"""
+        if self._total is None:
+            self._total = self._query.order_by(None).count()
+        return self._total
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    def __bool__(self):
+        return bool(self.items)
+
+def paginar_keyset(query, orden, despues=None, antes=None, por_pagina=POR_PAGINA_DEFECTO):
+    """
+    Pagina una consulta con keyset/seek sobre las columnas de `orden`
+
+    Args:
+        query: Query de SQLAlchemy sin order_by
+        orden: Lista de tuplas (columna, 'asc'|'desc'); la última debe ser única (id)
+        despues: Cursor de la última fila de la página anterior (avanzar)
+        antes: Cursor de la primera fila de la página siguiente (retroceder)
+        por_pagina: Cantidad de filas por página
+
+    Returns:
+        Pagina
+    """
+    n_columnas = len(orden)
+    valores_despues = decodificar_cursor(despues, n_columnas)
+    valores_antes = decodificar_cursor(antes, n_columnas) if valores_despues is None else None
+
+    if valores_antes is not None:
+        # Retroceder: recorrer en orden inverso y voltear el resultado
+        filas = query.filter(_condicion_despues(_invertir(orden), valores_antes)) \
+            .order_by(*_order_by(_invertir(orden))).limit(por_pagina + 1).all()
+        tiene_anterior = len(filas) > por_pagina
+        items = list(reversed(filas[:por_pagina]))
+        return Pagina(items, query, orden, por_pagina, tiene_anterior, True)
+
+    paginada = query
+    if valores_despues is not None:
+        paginada = paginada.filter(_condicion_despues(orden, valores_despues))
+
+    filas = paginada.order_by(*_order_by(orden)).limit(por_pagina + 1).all()
+    tiene_siguiente = len(filas) > por_pagina
+    return Pagina(filas[:por_pagina], query, orden, por_pagina, valores_despues is not None, tiene_siguiente)
+
+def paginar_desde_request(query, orden):
+    """Pagina una consulta leyendo los parámetros 'despues', 'antes' y 'por_pagina' del request"""
+    from flask import request
+
+    por_pagina = request.args.get('por_pagina', POR_PAGINA_DEFECTO, type=int) or POR_PAGINA_DEFECTO
+    por_pagina = max(1, min(por_pagina, POR_PAGINA_MAXIMO))
+
+    return paginar_keyset(
+        query,
+        orden,
+        despues=request.args.get('despues'),
+        antes=request.args.get('antes'),
+        por_pagina=por_pagina
+    )
@@ -0,0 +1,321 @@
+"""
+Unificación de PDFs en paralelo y con escritura incremental
+
+Cada PDF de origen se analiza y serializa en un proceso del pool como un
+fragmento con números de objeto locales escritos a ancho fijo. El proceso
+principal solo reubica esos números (parcheando bytes en posiciones conocidas),
+escribe el fragmento al archivo de salida y lo descarta, de modo que en memoria
+nunca hay más que unos pocos documentos a la vez. Al final se escriben el árbol
+de páginas, los marcadores (uno por aprendiz con un hijo por documento), el
+catálogo y la tabla xref.
+"""
+import logging
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+
+from PyPDF2 import PdfReader
+from PyPDF2.generic import (
+    ArrayObject, DictionaryObject, IndirectObject, StreamObject, TextStringObject
+)
+
+logger = logging.getLogger(__name__)
+
+# Objetos fijos del archivo de salida
+ID_CATALOGO = 1
+ID_PAGINAS = 2
+PRIMER_ID_LIBRE = 3
+
+# Ancho fijo de los números de objeto locales (se reescriben en el mismo espacio)
+ANCHO_ID = 10
+
+# Por debajo de este número de archivos no compensa levantar procesos
+MINIMO_PARALELO = 4
+
+class _Fragmento:
+    """Serializa los objetos alcanzables desde las páginas de un PDF con ids locales"""
+
+    def __init__(self, reader):
+        self.reader = reader
+        self.salida = BytesIO()
+        self.posiciones_ids = []
+        self.objetos = []
+        self.ids = {}
+        self.pendientes = deque()
+
+    def _id_local(self, referencia):
+        clave = (referencia.idnum, referencia.generation)
+        if clave not in self.ids:
+            self.ids[clave] = len(self.ids) + 1
+            self.pendientes.append((self.ids[clave], referencia))
+        return self.ids[clave]
+
+    def _escribir_id(self, id_local):
+        self.posiciones_ids.append(self.salida.tell())
+        self.salida.write(f'{id_local:0{ANCHO_ID}d}'.encode())
+
+    def _escribir_valor(self, valor, es_pagina=False):
+        escribir = self.salida.write
+
+        if isinstance(valor, IndirectObject):
+            destino = valor.get_object()
+            if isinstance(destino, DictionaryObject) and destino.get('/Type') == '/Pages':
+                # Nodos del árbol de páginas de origen -> árbol de páginas de salida
+                escribir(f'{ID_PAGINAS} 0 R'.encode())
+            else:
+                self._escribir_id(self._id_local(valor))
+                escribir(b' 0 R')
+
+        elif isinstance(valor, DictionaryObject):
+            escribir(b'<<')
+            for clave, item in valor.items():
+                if clave == '/Length' and isinstance(valor, StreamObject):
+                    continue
+                escribir(b'\n')
+                clave.write_to_stream(self.salida, None)
+                escribir(b' ')
+                if es_pagina and clave == '/Parent':
+                    escribir(f'{ID_PAGINAS} 0 R'.encode())
+                else:
+                    self._escribir_valor(item)
+
+            if isinstance(valor, StreamObject):
+                datos = valor._data
+                if isinstance(datos, str):
+                    datos = datos.encode('latin-1')
+                escribir(f'\n/Length {len(datos)}\n>>\nstream\n'.encode())
+                escribir(datos)
+                escribir(b'\nendstream')
+            else:
+                escribir(b'\n>>')
+
+        elif isinstance(valor, ArrayObject):
+            escribir(b'[')
+            for indice, item in enumerate(valor):
+                if indice:
+                    escribir(b' ')
+                self._escribir_valor(item)
+            escribir(b']')
+
+        elif valor is None:
+            escribir(b'null')
+
+        else:
+            valor.write_to_stream(self.salida, None)
+
+    def serializar(self):
+        paginas = [self._id_local(pagina.indirect_reference) for pagina in self.reader.pages]
+        ids_pagina = set(paginas)
+
+        while self.pendientes:
+            id_local, referencia = self.pendientes.popleft()
+            self.objetos.append((id_local, self.salida.tell()))
+            self._escribir_id(id_local)
+            self.salida.write(b' 0 obj\n')
+            self._escribir_valor(referencia.get_object(), es_pagina=id_local in ids_pagina)
+            self.salida.write(b'\nendobj\n')
+
+        return {
+            'datos': self.salida.getvalue(),
+            'posiciones_ids': self.posiciones_ids,
+            'objetos': self.objetos,
+            'paginas': paginas,
+            'total_objetos': len(self.ids)
+        }
+
+def serializar_pdf(ruta):
+    """
+    Analiza y valida un PDF y lo serializa como fragmento reubicable
+    Se ejecuta en los procesos del pool (función de módulo para poder enviarla)
+
+    Returns: dict con el fragmento, o {'error': mensaje} si el PDF no es válido
+    """
+    try:
+        reader = PdfReader(ruta, strict=False)
+        if reader.is_encrypted and not reader.decrypt(''):
+            return {'error': 'PDF protegido con contraseña'}
+        if len(reader.pages) == 0:
+            return {'error': 'PDF sin páginas'}
+        return _Fragmento(reader).serializar()
+    except Exception as e:
+        return {'error': str(e) or e.__class__.__name__}
+
+def _texto_pdf(texto):
+    salida = BytesIO()
+    TextStringObject(texto).write_to_stream(salida, None)
+    return salida.getvalue()
+
+class EscritorPDFUnificado:
+    """Escribe un PDF de salida a partir de fragmentos, directamente a disco"""
+
+    def __init__(self, ruta_salida):
+        self.archivo = open(ruta_salida, 'wb')
+        self.archivo.write(b'%PDF-1.7\n%\xe2\xe3\xcf\xd3\n')
+        self.offsets = {}
+        self.siguiente_id = PRIMER_ID_LIBRE
+        self.paginas = []
+        # [(titulo, primera_pagina, [(subtitulo, pagina), ...])]
+        self.marcadores = []
+
+    def agregar(self, fragmento, marcador=None, submarcador=None):
+        """Reubica los ids del fragmento, lo escribe y registra sus páginas y marcadores"""
+        base = self.siguiente_id - 1
+        datos = bytearray(fragmento['datos'])
+
+        for posicion in fragmento['posiciones_ids']:
+            id_local = int(datos[posicion:posicion + ANCHO_ID])
+            datos[posicion:posicion + ANCHO_ID] = f'{id_local + base:0{ANCHO_ID}d}'.encode()
+
+        inicio = self.archivo.tell()
+        self.archivo.write(datos)
+        for id_local, offset in fragmento['objetos']:
+            self.offsets[id_local + base] = inicio + offset
+
+        self.siguiente_id += fragmento['total_objetos']
+        primera_pagina = fragmento['paginas'][0] + base
+        self.paginas.extend(pagina + base for pagina in fragmento['paginas'])
+
+        if marcador:
+            if not self.marcadores or self.marcadores[-1][0] != marcador:
+                self.marcadores.append((marcador, primera_pagina, []))
+            if submarcador:
+                self.marcadores[-1][2].append((submarcador, primera_pagina))
+
+    def _escribir_objeto(self, id_objeto, contenido):
+        self.offsets[id_objeto] = self.archivo.tell()
+        self.archivo.write(f'{id_objeto} 0 obj\n'.encode() + contenido + b'\nendobj\n')
+
+    def _reservar_id(self):
+        id_objeto = self.siguiente_id
+        self.siguiente_id += 1
+        return id_objeto
+
+    def _escribir_marcadores(self):
+        """Árbol de marcadores: aprendiz (cerrado) -> documentos"""
+        id_raiz = self._reservar_id()
+        ids = [self._reservar_id() for _ in self.marcadores]
+
+        for indice, (titulo, pagina, hijos) in enumerate(self.marcadores):
+            ids_hijos = [self._reservar_id() for _ in hijos]
+            partes = [
+                b'<< /Title ', _texto_pdf(titulo),
+                f' /Parent {id_raiz} 0 R /Dest [{pagina} 0 R /Fit]'.encode()
+            ]
+            if indice > 0:
+                partes.append(f' /Prev {ids[indice - 1]} 0 R'.encode())
+            if indice < len(ids) - 1:
+                partes.append(f' /Next {ids[indice + 1]} 0 R'.encode())
+            if ids_hijos:
+                partes.append(f' /First {ids_hijos[0]} 0 R /Last {ids_hijos[-1]} 0 R /Count -{len(ids_hijos)}'.encode())
+            partes.append(b' >>')
+            self._escribir_objeto(ids[indice], b''.join(partes))
+
+            for indice_hijo, (subtitulo, pagina_hijo) in enumerate(hijos):
+                partes = [
+                    b'<< /Title ', _texto_pdf(subtitulo),
+                    f' /Parent {ids[indice]} 0 R /Dest [{pagina_hijo} 0 R /Fit]'.encode()
+                ]
+                if indice_hijo > 0:
+                    partes.append(f' /Prev {ids_hijos[indice_hijo - 1]} 0 R'.encode())
+                if indice_hijo < len(ids_hijos) - 1:
+                    partes.append(f' /Next {ids_hijos[indice_hijo + 1]} 0 R'.encode())
+                partes.append(b' >>')
+                self._escribir_objeto(ids_hijos[indice_hijo], b''.join(partes))
+
+        self._escribir_objeto(
+            id_raiz,
+            f'<< /Type /Outlines /First {ids[0]} 0 R /Last {ids[-1]} 0 R /Count {len(ids)} >>'.encode()
+        )
+        return id_raiz
+
+    def cerrar(self):
+        """Escribe árbol de páginas, marcadores, catálogo, xref y trailer"""
+        try:
+            kids = ' '.join(f'{pagina} 0 R' for pagina in self.paginas)
+            self._escribir_objeto(
+                ID_PAGINAS,
+                f'<< /Type /Pages /Kids [{kids}] /Count {len(self.paginas)} >>'.encode()
+            )
+
+            catalogo = f'<< /Type /Catalog /Pages {ID_PAGINAS} 0 R'
+            if self.marcadores:
+                catalogo += f' /Outlines {self._escribir_marcadores()} 0 R /PageMode /UseOutlines'
+            self._escribir_objeto(ID_CATALOGO, (catalogo + ' >>').encode())
+
+            inicio_xref = self.archivo.tell()
+            total = self.siguiente_id
+            lineas = [f'xref\n0 {total}\n'.encode(), b'0000000000 65535 f \n']
+            for id_objeto in range(1, total):
+                lineas.append(f'{self.offsets[id_objeto]:010d} 00000 n \n'.encode())
+            self.archivo.write(b''.join(lineas))
+            self.archivo.write(
+                f'trailer\n<< /Size {total} /Root {ID_CATALOGO} 0 R >>\nstartxref\n{inicio_xref}\n%%EOF\n'.encode()
+            )
+        finally:
+            self.archivo.close()
+
+    def descartar(self):
+        """Cierra y elimina la salida incompleta"""
+        self.archivo.close()
+        os.remove(self.archivo.name)
+
+def unificar_pdfs(archivos, ruta_salida, workers=None):
+    """
+    Une varios PDFs en uno solo con marcadores
+
+    Args:
+        archivos: Lista de tuplas (ruta, marcador, submarcador). Los archivos
+            consecutivos con el mismo marcador quedan agrupados bajo él y cada
+            submarcador apunta a la primera página de su archivo
+        ruta_salida: Ruta del PDF a generar
+        workers: Procesos para analizar los PDFs (por defecto, número de CPUs)
+
+    Returns:
+        tuple: (documentos_agregados, omitidos) donde omitidos es una lista de
+               (ruta, motivo) de los PDFs que no se pudieron leer
+    """
+    workers = workers or os.cpu_count() or 1
+    rutas = [ruta for ruta, _, _ in archivos]
+    escritor = EscritorPDFUnificado(ruta_salida)
+    agregados = 0
+    omitidos = []
+
+    def procesar(indice, fragmento):
+        nonlocal agregados
+        ruta, marcador, submarcador = archivos[indice]
+        if 'error' in fragmento:
+            logger.warning(f"No se pudo agregar {os.path.basename(ruta)}: {fragmento['error']}")
+            omitidos.append((ruta, fragmento['error']))
+            return
+        escritor.agregar(fragmento, marcador, submarcador)
+        agregados += 1
+
+    try:
+        if workers <= 1 or len(rutas) < MINIMO_PARALELO:
+            for indice, ruta in enumerate(rutas):
+                procesar(indice, serializar_pdf(ruta))
+        else:
+            # Ventana acotada de trabajos en vuelo: la memoria no crece con el número de archivos
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                en_vuelo = deque()
+                for indice, ruta in enumerate(rutas):
+                    en_vuelo.append((indice, pool.submit(serializar_pdf, ruta)))
+                    if len(en_vuelo) >= workers * 2:
+                        procesar(*_resultado(en_vuelo.popleft()))
+                while en_vuelo:
+                    procesar(*_resultado(en_vuelo.popleft()))
+    except Exception:
+        escritor.descartar()
+        raise
+
+    if agregados:
+        escritor.cerrar()
+    else:
+        escritor.descartar()
+
+    return agregados, omitidos
+
+def _resultado(pendiente):
+    indice, futuro = pendiente
+    return indice, futuro.result()
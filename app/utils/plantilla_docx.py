@@ -0,0 +1,119 @@
+"""
+Plantillas DOCX compiladas
+
+Una plantilla se compila una sola vez por proceso: se abre con python-docx, se
+aplican los reemplazos y casillas usando marcadores en lugar de los datos
+reales y el document.xml resultante se parte en segmentos de bytes alrededor
+de cada marcador. Generar un documento consiste solo en unir esos segmentos con
+los valores (escapados para XML) y agregar el document.xml a una copia en
+memoria del resto del paquete, que ya está comprimido.
+"""
+import os
+import re
+import threading
+import zipfile
+from io import BytesIO
+from xml.sax.saxutils import escape
+
+from docx import Document
+from docx.oxml.ns import qn
+
+PARTE_DOCUMENTO = 'word/document.xml'
+
+# Caracteres de uso privado: no aparecen en las plantillas ni en las claves de reemplazo
+_INICIO_MARCADOR = '\ue000'
+_FIN_MARCADOR = '\ue001'
+# El campo va codificado como un carácter de uso privado más (su índice), de modo
+# que ninguna clave de reemplazo puede coincidir dentro de un marcador
+_BASE_INDICE = 0xE100
+_PATRON_MARCADOR = re.compile(f'{_INICIO_MARCADOR}(.){_FIN_MARCADOR}', re.S)
+
+_plantillas = {}
+_lock = threading.Lock()
+
+class PlantillaDocx:
+    """
+    Plantilla compilada
+
+    Args:
+        ruta: Ruta del .docx
+        preparar: función(doc, campo) que modifica el Document de python-docx
+            (reemplazos, casillas, resaltados). campo(nombre) retorna el marcador
+            que se debe escribir donde irá el valor de ese campo.
+    """
+
+    def __init__(self, ruta, preparar):
+        self.ruta = ruta
+        self.mtime = os.path.getmtime(ruta)
+
+        nombres = []
+
+        def campo(nombre):
+            """Marcador de un campo dentro del texto de la plantilla"""
+            if nombre not in nombres:
+                nombres.append(nombre)
+            return f'{_INICIO_MARCADOR}{chr(_BASE_INDICE + nombres.index(nombre))}{_FIN_MARCADOR}'
+
+        doc = Document(ruta)
+        preparar(doc, campo)
+
+        # Los valores pueden empezar o terminar en espacio: Word los recortaría sin xml:space
+        for elemento_t in doc.element.body.iter(qn('w:t')):
+            if elemento_t.text and _INICIO_MARCADOR in elemento_t.text:
+                elemento_t.set(qn('xml:space'), 'preserve')
+
+        partes = _PATRON_MARCADOR.split(doc.part.blob.decode('utf-8'))
+        # [literal, campo, literal, campo, ..., literal]
+        self.segmentos = [literal.encode('utf-8') for literal in partes[0::2]]
+        self.campos = [nombres[ord(indice) - _BASE_INDICE] for indice in partes[1::2]]
+
+        self.paquete_base = self._empaquetar_sin_documento(ruta)
+
+    @staticmethod
+    def _empaquetar_sin_documento(ruta):
+        """ZIP con todas las partes del paquete excepto document.xml (comprimido una sola vez)"""
+        salida = BytesIO()
+        with zipfile.ZipFile(ruta) as origen, zipfile.ZipFile(salida, 'w') as destino:
+            for info in origen.infolist():
+                if info.filename != PARTE_DOCUMENTO:
+                    destino.writestr(info, origen.read(info), compress_type=info.compress_type)
+        return salida.getvalue()
+
+    def renderizar(self, valores):
+        """
+        Args:
+            valores: dict campo -> texto (los campos sin valor quedan vacíos)
+
+        Returns:
+            bytes: Contenido del .docx
+        """
+        partes = [self.segmentos[0]]
+        for nombre, segmento in zip(self.campos, self.segmentos[1:]):
+            partes.append(escape(str(valores.get(nombre) or '')).encode())
+            partes.append(segmento)
+
+        salida = BytesIO(self.paquete_base)
+        with zipfile.ZipFile(salida, 'a') as paquete:
+            paquete.writestr(PARTE_DOCUMENTO, b''.join(partes), compress_type=zipfile.ZIP_DEFLATED)
+        return salida.getvalue()
+
+    def guardar(self, valores, ruta_salida):
+        with open(ruta_salida, 'wb') as archivo:
+            archivo.write(self.renderizar(valores))
+        return ruta_salida
+
+def obtener_plantilla(ruta, preparar):
+    """
+    Plantilla compilada en caché (se recompila si el archivo cambió en disco)
+    """
+    mtime = os.path.getmtime(ruta)
+    plantilla = _plantillas.get(ruta)
+    if plantilla is not None and plantilla.mtime == mtime:
+        return plantilla
+
+    with _lock:
+        plantilla = _plantillas.get(ruta)
+        if plantilla is None or plantilla.mtime != mtime:
+            plantilla = PlantillaDocx(ruta, preparar)
+            _plantillas[ruta] = plantilla
+        return plantilla
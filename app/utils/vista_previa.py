@@ -0,0 +1,172 @@
+"""
+Miniaturas de documentos para las pantallas de revisión
+
+Una imagen se reduce directamente. De un PDF se dibuja la primera página con
+pdftoppm (Poppler) si está instalado; si no, se usa la imagen más grande de la
+primera página, que en los documentos escaneados es la página completa. Las
+miniaturas se guardan en WebP (PNG si Pillow no tiene soporte WebP).
+"""
+import logging
+import os
+import shutil
+import subprocess
+import uuid
+from io import BytesIO
+
+from PyPDF2 import PdfReader
+
+logger = logging.getLogger(__name__)
+
+# Segundos máximos para dibujar una página con pdftoppm
+TIMEOUT_PDFTOPPM = 20
+CALIDAD_WEBP = 75
+
+def _importar_pil():
+    try:
+        from PIL import Image, ImageOps, features
+    except ImportError:
+        raise RuntimeError('Las vistas previas requieren el paquete Pillow, que no está instalado')
+    return Image, ImageOps, features
+
+def formato_miniatura():
+    """
+    Formato de las miniaturas según el soporte de Pillow
+    Returns: (extensión, tipo MIME)
+    """
+    _, _, features = _importar_pil()
+    if features.check('webp'):
+        return 'webp', 'image/webp'
+    return 'png', 'image/png'
+
+def _guardar(imagen, ruta_salida, lado):
+    """Reduce una imagen de Pillow y la guarda como miniatura (escritura atómica)"""
+    Image, ImageOps, _ = _importar_pil()
+
+    imagen = ImageOps.exif_transpose(imagen)
+    if imagen.mode in ('RGBA', 'LA', 'P'):
+        imagen = imagen.convert('RGBA')
+        fondo = Image.new('RGB', imagen.size, 'white')
+        fondo.paste(imagen, mask=imagen.getchannel('A'))
+        imagen = fondo
+    elif imagen.mode not in ('RGB', 'L'):
+        imagen = imagen.convert('RGB')
+    imagen.thumbnail((lado, lado))
+
+    extension, _ = formato_miniatura()
+    temporal = f'{ruta_salida}.{uuid.uuid4().hex}.tmp'
+    try:
+        if extension == 'webp':
+            imagen.save(temporal, 'WEBP', quality=CALIDAD_WEBP, method=4)
+        else:
+            imagen.save(temporal, 'PNG', optimize=True)
+        os.replace(temporal, ruta_salida)
+    finally:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+
+def _miniatura_imagen(ruta, ruta_salida, lado):
+    Image, _, _ = _importar_pil()
+    with Image.open(ruta) as imagen:
+        # En JPEG decodifica directamente a una escala reducida (mucho más rápido en fotos grandes)
+        imagen.draft('RGB', (lado, lado))
+        _guardar(imagen, ruta_salida, lado)
+
+def _miniatura_pdftoppm(comando, ruta, ruta_salida, lado):
+    """Dibuja la primera página con pdftoppm. Returns: True si se generó"""
+    prefijo = f'{ruta_salida}.{uuid.uuid4().hex}.pagina'
+    try:
+        subprocess.run(
+            [comando, '-f', '1', '-l', '1', '-singlefile', '-png', '-scale-to', str(lado), ruta, prefijo],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            timeout=TIMEOUT_PDFTOPPM,
+            check=True
+        )
+        Image, _, _ = _importar_pil()
+        with Image.open(f'{prefijo}.png') as imagen:
+            _guardar(imagen, ruta_salida, lado)
+        return True
+    except (subprocess.SubprocessError, OSError) as e:
+        logger.warning(f"pdftoppm no pudo dibujar {os.path.basename(ruta)}: {e}")
+        return False
+    finally:
+        if os.path.exists(f'{prefijo}.png'):
+            os.remove(f'{prefijo}.png')
+
+# Espacios de color de las imágenes sin comprimir como JPEG -> modo de Pillow
+MODOS_COLOR = {'/DeviceRGB': 'RGB', '/DeviceGray': 'L', '/DeviceCMYK': 'CMYK'}
+
+def _abrir_imagen_pdf(objeto, Image):
+    """Imagen de Pillow de un XObject de imagen, o None si su formato no se soporta"""
+    filtro = objeto.get('/Filter')
+    filtros = [filtro] if isinstance(filtro, str) else list(filtro or [])
+
+    # JPEG (escaneos), directo o envuelto en otros filtros
+    if filtros and filtros[-1] == '/DCTDecode':
+        return Image.open(BytesIO(objeto.get_data()))
+
+    modo = MODOS_COLOR.get(objeto.get('/ColorSpace'))
+    if filtros and filtros[-1] not in ('/FlateDecode', '/ASCII85Decode'):
+        return None
+    if not modo or objeto.get('/BitsPerComponent') != 8:
+        return None
+    return Image.frombytes(modo, (objeto['/Width'], objeto['/Height']), objeto.get_data())
+
+def _miniatura_imagen_incrustada(ruta, ruta_salida, lado):
+    """Usa la imagen más grande de la primera página. Returns: True si se generó"""
+    Image, _, _ = _importar_pil()
+
+    lector = PdfReader(ruta)
+    if lector.is_encrypted or not lector.pages:
+        return False
+
+    recursos = lector.pages[0].get('/Resources')
+    xobjetos = recursos.get_object().get('/XObject') if recursos is not None else None
+    if xobjetos is None:
+        return False
+
+    imagenes = [
+        objeto for objeto in (referencia.get_object() for referencia in xobjetos.get_object().values())
+        if objeto.get('/Subtype') == '/Image'
+    ]
+    if not imagenes:
+        return False
+
+    mayor = max(imagenes, key=lambda objeto: objeto['/Width'] * objeto['/Height'])
+    imagen = _abrir_imagen_pdf(mayor, Image)
+    if imagen is None:
+        return False
+
+    with imagen:
+        imagen.draft('RGB', (lado, lado))
+        _guardar(imagen, ruta_salida, lado)
+    return True
+
+def generar_miniatura(ruta, mime_type, ruta_salida, lado, pdftoppm=None):
+    """
+    Genera la miniatura de un documento
+
+    Args:
+        ruta: Archivo del documento
+        mime_type: Tipo del documento (application/pdf, image/jpeg, image/png)
+        ruta_salida: Ruta de la miniatura
+        lado: Lado mayor de la miniatura en píxeles
+        pdftoppm: Ruta del ejecutable de pdftoppm, o None si no está instalado
+
+    Returns:
+        True si se generó, False si el documento no tiene vista previa posible
+    """
+    if mime_type and mime_type.startswith('image/'):
+        _miniatura_imagen(ruta, ruta_salida, lado)
+        return True
+
+    if mime_type != 'application/pdf':
+        return False
+
+    if pdftoppm and _miniatura_pdftoppm(pdftoppm, ruta, ruta_salida, lado):
+        return True
+    return _miniatura_imagen_incrustada(ruta, ruta_salida, lado)
+
+def buscar_pdftoppm(comando):
+    """Ruta del ejecutable de pdftoppm, o None si no está instalado"""
+    return shutil.which(comando) if comando else None
@@ -0,0 +1,247 @@
+"""
+Escritor XLSX en streaming
+
+Genera un libro de una sola hoja fila por fila y entrega los bytes del ZIP
+a medida que se producen, sin mantener el libro en memoria ni usar archivos
+temporales (el modo write-only de openpyxl sigue escribiendo a disco).
+
+PlantillaXlsx hace lo mismo partiendo de un libro existente: conserva tal cual
+sus partes (estilos, encabezados, comentarios) y agrega las filas al final de
+la primera hoja.
+"""
+import os
+import re
+import threading
+import zipfile
+from datetime import date, datetime
+from xml.sax.saxutils import escape
+from app.utils.zip_stream import BufferSalida
+
+# Caracteres de control no permitidos en XML 1.0
+_CARACTERES_INVALIDOS = re.compile(r'[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '<Override PartName="/xl/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+    '</Types>'
+)
+
+_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+
+_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>'
+    '<Relationship Id="rId2" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" Target="styles.xml"/>'
+    '</Relationships>'
+)
+
+# Estilo 0: normal. Estilo 1: encabezado (negrita blanca, relleno verde SENA, centrado)
+_STYLES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<fonts count="2">'
+    '<font><sz val="11"/><name val="Calibri"/></font>'
+    '<font><b/><sz val="11"/><color rgb="FFFFFFFF"/><name val="Calibri"/></font>'
+    '</fonts>'
+    '<fills count="3">'
+    '<fill><patternFill patternType="none"/></fill>'
+    '<fill><patternFill patternType="gray125"/></fill>'
+    '<fill><patternFill patternType="solid"><fgColor rgb="FF2E7D32"/><bgColor rgb="FF2E7D32"/></patternFill></fill>'
+    '</fills>'
+    '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="2">'
+    '<xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+    '<xf numFmtId="0" fontId="1" fillId="2" borderId="0" xfId="0" applyFont="1" applyFill="1" applyAlignment="1">'
+    '<alignment horizontal="center" vertical="center"/></xf>'
+    '</cellXfs>'
+    '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+    '</styleSheet>'
+)
+
+def _letra_columna(indice):
+    """1 -> A, 27 -> AA"""
+    letras = ''
+    while indice:
+        indice, resto = divmod(indice - 1, 26)
+        letras = chr(65 + resto) + letras
+    return letras
+
+def _celda(referencia, valor, estilo=0):
+    atributo_estilo = f' s="{estilo}"' if estilo else ''
+
+    if isinstance(valor, bool):
+        return f'<c r="{referencia}" t="b"{atributo_estilo}><v>{int(valor)}</v></c>'
+    if isinstance(valor, (int, float)):
+        return f'<c r="{referencia}"{atributo_estilo}><v>{valor}</v></c>'
+    if isinstance(valor, datetime):
+        valor = valor.strftime('%Y-%m-%d %H:%M:%S')
+    elif isinstance(valor, date):
+        valor = valor.strftime('%Y-%m-%d')
+
+    texto = escape(_CARACTERES_INVALIDOS.sub('', str(valor)))
+    return f'<c r="{referencia}" t="inlineStr"{atributo_estilo}><is><t xml:space="preserve">{texto}</t></is></c>'
+
+def _fila(numero, valores, estilo=0):
+    celdas = ''.join(
+        _celda(f'{_letra_columna(columna)}{numero}', valor, estilo)
+        for columna, valor in enumerate(valores, 1)
+        if valor is not None
+    )
+    return f'<row r="{numero}">{celdas}</row>'
+
+def generar_xlsx_stream(encabezados, filas, titulo_hoja='Hoja1', ancho_columna=15, filas_por_bloque=500):
+    """
+    Genera un archivo XLSX como un iterador de bloques de bytes
+
+    Args:
+        encabezados: Lista con los títulos de las columnas (fila 1, con estilo de encabezado)
+        filas: Iterable de listas/tuplas con los valores de cada fila
+        titulo_hoja: Nombre de la hoja
+        ancho_columna: Ancho aplicado a todas las columnas
+        filas_por_bloque: Cada cuántas filas se entregan los bytes acumulados
+
+    Yields:
+        bytes del archivo XLSX, listos para enviarse en una respuesta HTTP
+    """
+    buffer = BufferSalida()
+
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr('[Content_Types].xml', _CONTENT_TYPES)
+        zf.writestr('_rels/.rels', _RELS)
+        zf.writestr('xl/workbook.xml', (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+            'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+            f'<sheets><sheet name="{escape(titulo_hoja[:31], {chr(34): "&quot;"})}" sheetId="1" r:id="rId1"/></sheets>'
+            '</workbook>'
+        ))
+        zf.writestr('xl/_rels/workbook.xml.rels', _WORKBOOK_RELS)
+        zf.writestr('xl/styles.xml', _STYLES)
+        yield buffer.vaciar()
+
+        with zf.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as hoja:
+            hoja.write((
+                '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+                f'<cols><col min="1" max="{len(encabezados)}" width="{ancho_columna}" customWidth="1"/></cols>'
+                '<sheetData>'
+            ).encode('utf-8'))
+            hoja.write(_fila(1, encabezados, estilo=1).encode('utf-8'))
+
+            bloque = []
+            for numero, valores in enumerate(filas, 2):
+                bloque.append(_fila(numero, valores))
+                if len(bloque) >= filas_por_bloque:
+                    hoja.write(''.join(bloque).encode('utf-8'))
+                    bloque = []
+                    yield buffer.vaciar()
+
+            if bloque:
+                hoja.write(''.join(bloque).encode('utf-8'))
+            hoja.write(b'</sheetData></worksheet>')
+
+    yield buffer.vaciar()
+
+_plantillas = {}
+_lock_plantillas = threading.Lock()
+
+class PlantillaXlsx:
+    """
+    Libro .xlsx usado como plantilla, leído una sola vez
+
+    Guarda en memoria las partes del paquete y el XML de la hoja partido en
+    el punto donde termina <sheetData>, que es donde se insertan las filas.
+    """
+
+    def __init__(self, ruta, hoja='xl/worksheets/sheet1.xml'):
+        self.ruta = ruta
+        self.hoja = hoja
+        self.mtime = os.path.getmtime(ruta)
+
+        with zipfile.ZipFile(ruta) as origen:
+            self.partes = [(info, origen.read(info)) for info in origen.infolist()]
+
+        xml = dict((info.filename, datos) for info, datos in self.partes)[hoja].decode('utf-8')
+        inicio, fin = xml.split('</sheetData>', 1)
+
+        # La dimensión cambia con las filas agregadas: se reescribe en cada generación
+        self.inicio_hoja = inicio
+        self.fin_hoja = ('</sheetData>' + fin).encode('utf-8')
+        self.ultima_fila = max((int(numero) for numero in re.findall(r'<row r="(\d+)"', inicio)), default=0)
+
+    def _inicio_hoja(self, total_filas):
+        """Inicio de la hoja con la dimensión ajustada (o sin ella si no se conoce el total)"""
+        if total_filas is None:
+            return re.sub(r'<dimension [^>]*/>', '', self.inicio_hoja).encode('utf-8')
+
+        ultima_fila = self.ultima_fila + total_filas
+        return re.sub(
+            r'<dimension ref="([A-Z]+\d+):([A-Z]+)\d+"/>',
+            lambda dimension: f'<dimension ref="{dimension.group(1)}:{dimension.group(2)}{ultima_fila}"/>',
+            self.inicio_hoja
+        ).encode('utf-8')
+
+    def generar(self, filas, total_filas=None, filas_por_bloque=500):
+        """
+        Genera el libro con las filas agregadas después de las de la plantilla
+
+        Args:
+            filas: Iterable de listas/tuplas con los valores de cada fila (None deja la celda vacía)
+            total_filas: Número de filas, para escribir la dimensión de la hoja (opcional)
+            filas_por_bloque: Cada cuántas filas se entregan los bytes acumulados
+
+        Yields:
+            bytes del archivo XLSX
+        """
+        buffer = BufferSalida()
+
+        with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as zf:
+            for info, datos in self.partes:
+                if info.filename != self.hoja:
+                    zf.writestr(info, datos, compress_type=info.compress_type)
+                    continue
+
+                with zf.open(self.hoja, 'w', force_zip64=True) as hoja:
+                    hoja.write(self._inicio_hoja(total_filas))
+
+                    bloque = []
+                    for numero, valores in enumerate(filas, self.ultima_fila + 1):
+                        bloque.append(_fila(numero, valores))
+                        if len(bloque) >= filas_por_bloque:
+                            hoja.write(''.join(bloque).encode('utf-8'))
+                            bloque = []
+                            yield buffer.vaciar()
+
+                    if bloque:
+                        hoja.write(''.join(bloque).encode('utf-8'))
+                    hoja.write(self.fin_hoja)
+
+                yield buffer.vaciar()
+
+        yield buffer.vaciar()
+
+def obtener_plantilla_xlsx(ruta):
+    """Plantilla en caché (se vuelve a leer si el archivo cambió en disco)"""
+    mtime = os.path.getmtime(ruta)
+    plantilla = _plantillas.get(ruta)
+    if plantilla is not None and plantilla.mtime == mtime:
+        return plantilla
+
+    with _lock_plantillas:
+        plantilla = _plantillas.get(ruta)
+        if plantilla is None or plantilla.mtime != mtime:
+            plantilla = PlantillaXlsx(ruta)
+            _plantillas[ruta] = plantilla
+        return plantilla
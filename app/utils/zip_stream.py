@@ -0,0 +1,73 @@
+"""
+Escritor ZIP en streaming
+
+Agrega archivos de disco a un ZIP leyendo por bloques y entrega los bytes del
+archivo a medida que se producen, de modo que la memoria usada no depende del
+tamaño total del ZIP. Los formatos que ya vienen comprimidos (PDF, JPG, PNG)
+se guardan sin recomprimir (ZIP_STORED).
+"""
+import os
+import zipfile
+
+# Extensiones que no ganan nada con DEFLATE y solo gastarían CPU
+EXTENSIONES_COMPRIMIDAS = {'.pdf', '.jpg', '.jpeg', '.png', '.zip', '.gz', '.docx', '.xlsx'}
+
+TAMANO_BLOQUE = 1024 * 1024
+
+class BufferSalida:
+    """Destino no posicionable para ZipFile; acumula bytes hasta que se vacían"""
+
+    def __init__(self):
+        self._partes = []
+        self.tamano = 0
+
+    def write(self, datos):
+        self._partes.append(bytes(datos))
+        self.tamano += len(datos)
+        return len(datos)
+
+    def flush(self):
+        pass
+
+    def vaciar(self):
+        datos = b''.join(self._partes)
+        self._partes.clear()
+        self.tamano = 0
+        return datos
+
+def tipo_compresion(nombre):
+    """ZIP_STORED para formatos ya comprimidos, ZIP_DEFLATED para el resto"""
+    extension = os.path.splitext(nombre)[1].lower()
+    return zipfile.ZIP_STORED if extension in EXTENSIONES_COMPRIMIDAS else zipfile.ZIP_DEFLATED
+
+def generar_zip_stream(archivos, tamano_bloque=TAMANO_BLOQUE):
+    """
+    Genera un archivo ZIP como un iterador de bloques de bytes
+
+    Args:
+        archivos: Iterable de tuplas (ruta_en_disco, nombre_en_zip)
+        tamano_bloque: Bytes leídos por lectura y tamaño aproximado de cada bloque entregado
+
+    Yields:
+        bytes del archivo ZIP, listos para enviarse en una respuesta HTTP o escribirse a disco
+    """
+    buffer = BufferSalida()
+
+    with zipfile.ZipFile(buffer, 'w') as zf:
+        for ruta, nombre_en_zip in archivos:
+            zinfo = zipfile.ZipInfo.from_file(ruta, nombre_en_zip)
+            zinfo.compress_type = tipo_compresion(ruta)
+
+            with open(ruta, 'rb') as origen, zf.open(zinfo, 'w') as destino:
+                while True:
+                    bloque = origen.read(tamano_bloque)
+                    if not bloque:
+                        break
+                    destino.write(bloque)
+                    if buffer.tamano >= tamano_bloque:
+                        yield buffer.vaciar()
+
+            if buffer.tamano >= tamano_bloque:
+                yield buffer.vaciar()
+
+    yield buffer.vaciar()
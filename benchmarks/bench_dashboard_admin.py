@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark: estadísticas del dashboard del administrador
+
+Compara el cálculo original (un COUNT por contador + un COUNT por programa)
+con EstadisticasService.get_estadisticas_admin (dos consultas agregadas).
+
+Uso:
+    python -m benchmarks.bench_dashboard_admin [n_aprendices]
+"""
+
+import sys
+
+from app.models import db, Usuario, Aprendiz, Colegio, Programa, Matricula, DocumentoSIMAT
+from app.services.estadisticas_service import EstadisticasService
+from benchmarks.utils import crear_app_benchmark, sembrar_datos, medir
+
+REPETICIONES = 5
+
+def estadisticas_originales():
+    """Cálculo previo de admin.dashboard (referencia)"""
+    stats = {
+        'total_usuarios': Usuario.query.count(),
+        'total_aprendices': Aprendiz.query.count(),
+        'total_colegios': Colegio.query.filter_by(activo=True).count(),
+        'total_programas': Programa.query.filter_by(activo=True).count(),
+        'matriculas_pendientes': Matricula.query.filter(
+            Matricula.estado.in_(['ENVIADO', 'PENDIENTE'])
+        ).count(),
+        'simat_pendientes': DocumentoSIMAT.query.filter_by(estado='PENDIENTE').count(),
+        'programas': []
+    }
+    for programa in Programa.query.filter_by(activo=True).all():
+        stats['programas'].append({
+            'nombre': programa.nombre,
+            'aprendices_count': Aprendiz.query.filter_by(programa_id=programa.id).count()
+        })
+    return stats
+
+def main():
+    n_aprendices = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    app = crear_app_benchmark()
+
+    with app.app_context():
+        print(f"Sembrando {n_aprendices} aprendices...")
+        sembrar_datos(n_aprendices)
+        engine = db.engine
+
+        print(f"\nDashboard administrador ({REPETICIONES} repeticiones)")
+        with medir('original', engine, REPETICIONES):
+            for _ in range(REPETICIONES):
+                original = estadisticas_originales()
+                db.session.expire_all()
+
+        with medir('EstadisticasService', engine, REPETICIONES):
+            for _ in range(REPETICIONES):
+                agregado = EstadisticasService.get_estadisticas_admin()
+
+        for clave in ('total_usuarios', 'total_aprendices', 'total_colegios', 'total_programas',
+                      'matriculas_pendientes', 'simat_pendientes', 'programas'):
+            assert original[clave] == agregado[clave], f"Diferencia en '{clave}'"
+        print("\nResultados idénticos")
+
+if __name__ == '__main__':
+    main()
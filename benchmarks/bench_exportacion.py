@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark: exportación del reporte de matrículas
+
+Compara el Excel original (openpyxl en memoria + relaciones perezosas) con
+los formatos de ReporteService.exportar_matriculas: XLSX en streaming, CSV
+en streaming y Parquet (si pyarrow está instalado).
+
+Uso:
+    python -m benchmarks.bench_exportacion [n_aprendices]
+"""
+
+import os
+import sys
+
+from app.models import db, Matricula, Aprendiz
+from app.services.reporte_service import ReporteService
+from benchmarks.utils import crear_app_benchmark, sembrar_datos, medir
+
+REPETICIONES = 1
+
+def consumir(contenido):
+    """Recorre el contenido exportado y retorna su tamaño en bytes"""
+    if isinstance(contenido, bytes):
+        return len(contenido)
+    return sum(len(bloque) for bloque in contenido)
+
+def main():
+    n_aprendices = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    app = crear_app_benchmark()
+
+    with app.app_context():
+        print(f"Sembrando {n_aprendices} aprendices...")
+        sembrar_datos(n_aprendices)
+        engine = db.engine
+        query = Matricula.query.join(Aprendiz)
+        tamanos = {}
+
+        print(f"\nExportación de {query.count()} matrículas")
+        with medir('xlsx original', engine, REPETICIONES):
+            ruta = ReporteService.generar_excel_matriculas(query.all())
+            tamanos['xlsx original'] = os.path.getsize(ruta)
+            os.remove(ruta)
+            db.session.expire_all()
+
+        for formato in ('xlsx', 'csv', 'parquet'):
+            try:
+                with medir(f'{formato} (exportar_matriculas)', engine, REPETICIONES):
+                    contenido, _, _ = ReporteService.exportar_matriculas(query, formato)
+                    tamanos[formato] = consumir(contenido)
+            except RuntimeError as e:
+                print(f"  {formato:<35} omitido: {e}")
+
+        print("\nTamaño de los archivos")
+        for nombre, tamano in tamanos.items():
+            print(f"  {nombre:<35} {tamano / 1024:>10.1f} KB")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark: PDF unificado de un grupo
+
+Compara la unión original con PyPDF2.PdfMerger (todo el árbol de páginas en
+memoria hasta write) con app.utils.pdf_unificado.unificar_pdfs (análisis en
+un pool de procesos y escritura incremental con marcadores).
+
+Genera PDFs sintéticos con reportlab (texto + una imagen por página).
+La memoria reportada es el pico de asignaciones Python del proceso principal.
+
+Uso:
+    python -m benchmarks.bench_pdf_unificado [n_aprendices] [documentos_por_aprendiz] [procesos]
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from PIL import Image
+from PyPDF2 import PdfMerger, PdfReader
+from reportlab.pdfgen import canvas
+
+from app.utils.pdf_unificado import unificar_pdfs
+
+def generar_pdfs(carpeta, n_aprendices, documentos_por_aprendiz):
+    """Crea los PDFs de origen y retorna la lista (ruta, marcador, submarcador)"""
+    imagen = os.path.join(carpeta, 'escaneo.jpg')
+    Image.effect_noise((800, 600), 40).convert('RGB').save(imagen, quality=70)
+
+    archivos = []
+    for aprendiz in range(n_aprendices):
+        for documento in range(documentos_por_aprendiz):
+            ruta = os.path.join(carpeta, f'aprendiz_{aprendiz}_doc_{documento}.pdf')
+            pdf = canvas.Canvas(ruta)
+            for pagina in range(documento % 3 + 1):
+                pdf.drawString(72, 760, f'Aprendiz {aprendiz} - documento {documento} - página {pagina + 1}')
+                pdf.drawImage(imagen, 72, 300, 400, 300)
+                pdf.showPage()
+            pdf.save()
+            archivos.append((ruta, f'Aprendiz {aprendiz}', f'Documento {documento}'))
+    return archivos
+
+def medir(nombre, funcion):
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    funcion()
+    segundos = time.perf_counter() - inicio
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"  {nombre:<35} {segundos:>8.2f} s  {pico / 1024 / 1024:>8.1f} MB pico")
+
+def main():
+    n_aprendices = int(sys.argv[1]) if len(sys.argv) > 1 else 40
+    documentos_por_aprendiz = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    workers = int(sys.argv[3]) if len(sys.argv) > 3 else (os.cpu_count() or 1)
+    carpeta = tempfile.mkdtemp(prefix='bench_pdf_')
+
+    try:
+        print(f"Generando {n_aprendices * documentos_por_aprendiz} PDFs de origen...")
+        archivos = generar_pdfs(carpeta, n_aprendices, documentos_por_aprendiz)
+        salidas = {}
+
+        def original():
+            ruta = os.path.join(carpeta, 'original.pdf')
+            merger = PdfMerger()
+            for ruta_origen, _, _ in archivos:
+                merger.append(ruta_origen)
+            merger.write(ruta)
+            merger.close()
+            salidas['PdfMerger'] = ruta
+
+        def nuevo(nombre, workers):
+            def ejecutar():
+                ruta = os.path.join(carpeta, f'unificado_{workers}.pdf')
+                unificar_pdfs(archivos, ruta, workers=workers)
+                salidas[nombre] = ruta
+            return nombre, ejecutar
+
+        print(f"\nUnión de {len(archivos)} PDFs")
+        medir('PdfMerger (original)', original)
+        medir(*nuevo('unificar_pdfs (1 proceso)', 1))
+        if workers > 1:
+            medir(*nuevo(f'unificar_pdfs ({workers} procesos)', workers))
+
+        print("\nArchivos generados")
+        for nombre, ruta in salidas.items():
+            lector = PdfReader(ruta)
+            print(f"  {nombre:<35} {len(lector.pages):>6} páginas  {len(lector.outline):>4} marcadores  "
+                  f"{os.path.getsize(ruta) / 1024 / 1024:>8.1f} MB")
+    finally:
+        shutil.rmtree(carpeta, ignore_errors=True)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark: reporte PDF de matrículas del docente
+
+Compara el listado como una sola tabla (LongTable, que reportlab copia en una
+tabla nueva con las filas restantes cada vez que la parte entre páginas) con
+el listado por páginas (ListadoPaginado, que arma una tabla por página a
+medida que el documento avanza).
+
+Las matrículas se cargan con sus relaciones antes de medir: solo se mide la
+generación del PDF. La memoria reportada es el pico de asignaciones Python
+durante la generación (tracemalloc hace más lentas ambas variantes por igual).
+
+Uso:
+    python -m benchmarks.bench_reporte_pdf [tamaños separados por coma] [limite_tabla_unica]
+
+    limite_tabla_unica: tamaño máximo para el que se mide la tabla única
+    (con 50000 filas tarda varios minutos). Por defecto se miden todos.
+"""
+
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from PyPDF2 import PdfReader
+
+from app.models import db, Matricula, Aprendiz
+from app.services.reporte_service import ReporteService
+from benchmarks.utils import crear_app_benchmark, sembrar_datos
+
+def medir(nombre, funcion):
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    ruta = funcion()
+    segundos = time.perf_counter() - inicio
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    paginas = len(PdfReader(ruta).pages)
+    print(f"  {nombre:<35} {segundos:>8.2f} s  {pico / 1024 / 1024:>8.1f} MB pico  {paginas:>6} páginas")
+    os.remove(ruta)
+
+def main():
+    tamanos = [int(n) for n in sys.argv[1].split(',')] if len(sys.argv) > 1 else [1000, 10000, 50000]
+    limite_tabla_unica = int(sys.argv[2]) if len(sys.argv) > 2 else max(tamanos)
+    app = crear_app_benchmark()
+
+    with app.app_context():
+        print(f"Sembrando {max(tamanos)} aprendices...")
+        sembrar_datos(max(tamanos))
+        carpeta = tempfile.mkdtemp(prefix='bench_reporte_')
+
+        for tamano in tamanos:
+            matriculas = Matricula.query.join(Aprendiz).options(
+                db.joinedload(Matricula.aprendiz).joinedload(Aprendiz.usuario),
+                db.joinedload(Matricula.aprendiz).joinedload(Aprendiz.grupo),
+                db.joinedload(Matricula.aprendiz).joinedload(Aprendiz.programa)
+            ).order_by(Matricula.id).limit(tamano).all()
+
+            def generar(paginado):
+                def ejecutar():
+                    return ReporteService.generar_pdf_reporte_docente(
+                        matriculas,
+                        'Reporte de Matrículas',
+                        'Colegio de prueba',
+                        output_path=os.path.join(carpeta, f'reporte_{tamano}_{paginado}.pdf'),
+                        paginado=paginado
+                    )
+                return ejecutar
+
+            print(f"\nReporte de {len(matriculas)} matrículas")
+            if tamano <= limite_tabla_unica:
+                medir('tabla única (LongTable)', generar(False))
+            else:
+                print(f"  {'tabla única (LongTable)':<35} omitido")
+            medir('por páginas (ListadoPaginado)', generar(True))
+
+            db.session.expunge_all()
+
+        os.rmdir(carpeta)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+"""
+Utilidades compartidas por los benchmarks
+
+Crea una aplicación Flask mínima contra una base de datos propia (SQLite por
+defecto, o la indicada en BENCH_DATABASE_URI), siembra datos sintéticos y
+cuenta las consultas SQL ejecutadas.
+"""
+
+import os
+import time
+from contextlib import contextmanager
+from datetime import datetime, date
+
+from flask import Flask
+from sqlalchemy import event, insert
+
+from app.models import db, Usuario, Aprendiz, Colegio, Programa, Grupo, Matricula, Documento, DocumentoSIMAT
+
+ESTADOS = ['BORRADOR', 'ENVIADO', 'PENDIENTE', 'COMPLETO', 'PREMATRICULA', 'MATRICULADO', 'RECHAZADO']
+TIPOS_DOCUMENTO = list(Documento.TIPOS_LABELS.keys())
+
+def crear_app_benchmark(database_uri=None):
+    """Crea una app Flask mínima (sin blueprints) enlazada a la base de datos del benchmark"""
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = database_uri or os.getenv('BENCH_DATABASE_URI', 'sqlite://')
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['SECRET_KEY'] = 'benchmark'
+    db.init_app(app)
+    return app
+
+class ContadorConsultas:
+    """Cuenta las sentencias SQL ejecutadas sobre el engine mientras está activo"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.total = 0
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.total += 1
+
+    def __enter__(self):
+        self.total = 0
+        event.listen(self.engine, 'before_cursor_execute', self._on_execute)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, 'before_cursor_execute', self._on_execute)
+
+@contextmanager
+def medir(nombre, engine, repeticiones=5):
+    """Ejecuta el bloque y reporta consultas y latencia media por repetición"""
+    resultado = {'nombre': nombre, 'consultas': 0, 'ms': 0.0}
+    contador = ContadorConsultas(engine)
+    inicio = time.perf_counter()
+    with contador:
+        yield resultado
+    resultado['ms'] = (time.perf_counter() - inicio) * 1000 / repeticiones
+    resultado['consultas'] = contador.total // repeticiones
+    print(f"  {nombre:<35} {resultado['consultas']:>8} consultas  {resultado['ms']:>10.1f} ms")
+
+def _insertar_en_lotes(modelo, filas, tamano_lote=5000):
+    for i in range(0, len(filas), tamano_lote):
+        db.session.execute(insert(modelo), filas[i:i + tamano_lote])
+
+def sembrar_datos(n_aprendices=50000, n_colegios=50, n_programas=30, docs_por_matricula=4):
+    """
+    Siembra la base de datos con datos sintéticos
+    Returns: dict con los ids de colegios, programas y grupos creados
+    """
+    ahora = datetime.utcnow()
+    db.drop_all()
+    db.create_all()
+
+    _insertar_en_lotes(Programa, [
+        {'id': i, 'codigo': f'P{i:04d}', 'nombre': f'Técnico en Programa {i}', 'activo': True, 'created_at': ahora}
+        for i in range(1, n_programas + 1)
+    ])
+    _insertar_en_lotes(Colegio, [
+        {'id': i, 'nombre': f'Colegio {i}', 'tipo_colegio': 'PUBLICO', 'activo': True, 'created_at': ahora}
+        for i in range(1, n_colegios + 1)
+    ])
+    grupos = []
+    for colegio_id in range(1, n_colegios + 1):
+        for j in range(4):
+            grupos.append({
+                'id': len(grupos) + 1,
+                'nombre': f'{2800000 + len(grupos)}',
+                'colegio_id': colegio_id,
+                'programa_id': (colegio_id + j) % n_programas + 1,
+                'jornada': 'UNICA',
+                'año_lectivo': ahora.year,
+                'activo': True,
+                'created_at': ahora
+            })
+    _insertar_en_lotes(Grupo, grupos)
+
+    usuarios, aprendices, matriculas, documentos = [], [], [], []
+    for i in range(1, n_aprendices + 1):
+        grupo = grupos[i % len(grupos)]
+        usuarios.append({
+            'id': i,
+            'documento': f'{1000000000 + i}',
+            'tipo_documento': 'TI' if i % 3 else 'CC',
+            'nombres': f'Nombre{i}',
+            'apellidos': f'Apellido{i}',
+            'fecha_nacimiento': date(2008, 1 + i % 12, 1 + i % 28),
+            'email': f'aprendiz{i}@example.com',
+            'password_hash': 'x',
+            'rol': 'APRENDIZ',
+            'activo': True,
+            'created_at': ahora
+        })
+        aprendices.append({
+            'id': i,
+            'usuario_id': i,
+            'colegio_id': grupo['colegio_id'],
+            'grupo_id': grupo['id'],
+            'programa_id': grupo['programa_id'],
+            'created_at': ahora
+        })
+        matriculas.append({
+            'id': i,
+            'aprendiz_id': i,
+            'estado': ESTADOS[i % len(ESTADOS)],
+            'created_at': ahora
+        })
+        for k in range(docs_por_matricula):
+            documentos.append({
+                'matricula_id': i,
+                'tipo_documento': TIPOS_DOCUMENTO[k % len(TIPOS_DOCUMENTO)],
+                'nombre_archivo': f'doc_{i}_{k}.pdf',
+                'ruta_archivo': f'uploads/doc_{i}_{k}.pdf',
+                'tamaño_bytes': 1024,
+                'extension': 'pdf',
+                'validado': (None, True, False)[(i + k) % 3],
+                'created_at': ahora
+            })
+
+    _insertar_en_lotes(Usuario, usuarios)
+    _insertar_en_lotes(Aprendiz, aprendices)
+    _insertar_en_lotes(Matricula, matriculas)
+    _insertar_en_lotes(Documento, documentos)
+    _insertar_en_lotes(DocumentoSIMAT, [
+        {'tipo': 'COLEGIO', 'colegio_id': c, 'ruta_archivo': f'uploads/simat/SIMAT_{c}.pdf',
+         'nombre_archivo_original': f'SIMAT_{c}.pdf', 'estado': 'PENDIENTE' if c % 2 else 'APROBADO',
+         'created_at': ahora}
+        for c in range(1, n_colegios + 1)
+    ])
+    db.session.commit()
+
+    return {
+        'colegios': list(range(1, n_colegios + 1)),
+        'programas': list(range(1, n_programas + 1)),
+        'grupos': [g['id'] for g in grupos]
+    }
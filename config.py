@@ -33,10 +33,50 @@ class Config:
     # Configuración de archivos
     BASE_DIR = os.path.abspath(os.path.dirname(__file__))
     UPLOAD_FOLDER = os.path.join(BASE_DIR, 'uploads')
+    # Documentos cargados, guardados una sola vez por contenido (ver AlmacenService)
+    ALMACEN_FOLDER = os.path.join(UPLOAD_FOLDER, 'contenido')
     REPORTS_FOLDER = os.path.join(BASE_DIR, 'reports')
+    CACHE_FOLDER = os.path.join(BASE_DIR, 'cache')
     MAX_CONTENT_LENGTH = int(os.getenv('MAX_FILE_SIZE', 5 * 1024 * 1024))  # 5MB por defecto
     ALLOWED_EXTENSIONS = {'pdf', 'jpg', 'jpeg', 'png'}
 
+    # Trabajos en segundo plano (ZIP, PDF unificado, SOFIA y reportes grandes)
+    TRABAJOS_WORKERS = int(os.getenv('TRABAJOS_WORKERS', 2))
+    TRABAJOS_HORAS_RETENCION = int(os.getenv('TRABAJOS_HORAS_RETENCION', 24))
+    TRABAJOS_MINUTOS_INACTIVIDAD = int(os.getenv('TRABAJOS_MINUTOS_INACTIVIDAD', 30))
+
+    # Procesos para analizar PDFs al generar el PDF unificado (por defecto, número de CPUs)
+    PDF_WORKERS = int(os.getenv('PDF_WORKERS', 0)) or None
+
+    # Procesos para calcular las contraseñas de una importación masiva (por defecto, número de CPUs)
+    IMPORTACION_WORKERS = int(os.getenv('IMPORTACION_WORKERS', 0)) or None
+
+    # Páginas PDF de las imágenes subidas, reutilizadas entre PDFs unificados
+    IMAGENES_PDF_CACHE = os.path.join(CACHE_FOLDER, 'imagenes_pdf')
+
+    # PDFs unificados ya generados (se desalojan los menos usados al superar el límite)
+    PAQUETES_CACHE = os.path.join(CACHE_FOLDER, 'paquetes')
+    PAQUETES_CACHE_MAX_MB = int(os.getenv('PAQUETES_CACHE_MAX_MB', 500))
+
+    # Miniaturas de los documentos para las pantallas de revisión (imagen o primera página del PDF)
+    VISTAS_PREVIAS_CACHE = os.path.join(CACHE_FOLDER, 'vistas_previas')
+    VISTA_PREVIA_LADO = int(os.getenv('VISTA_PREVIA_LADO', 480))
+    # Poppler, para dibujar la primera página de PDFs sin imágenes escaneadas (opcional)
+    PDFTOPPM_BIN = os.getenv('PDFTOPPM_BIN', 'pdftoppm')
+
+    # Conversión DOCX -> PDF con LibreOffice headless (workers con perfil precalentado)
+    LIBREOFFICE_BIN = os.getenv('LIBREOFFICE_BIN', 'soffice')
+    PDF_CONVERSION_WORKERS = int(os.getenv('PDF_CONVERSION_WORKERS', 2))
+    PDF_CONVERSION_TIMEOUT = int(os.getenv('PDF_CONVERSION_TIMEOUT', 60))
+
+    # Optimización de documentos después de cargarlos (imágenes reducidas, PDFs recomprimidos)
+    OPTIMIZAR_DOCUMENTOS = os.getenv('OPTIMIZAR_DOCUMENTOS', 'false').lower() in ('1', 'true', 'si')
+    OPTIMIZACION_DPI = int(os.getenv('OPTIMIZACION_DPI', 150))
+    OPTIMIZACION_CALIDAD_JPEG = int(os.getenv('OPTIMIZACION_CALIDAD_JPEG', 80))
+    OPTIMIZACION_WORKERS = int(os.getenv('OPTIMIZACION_WORKERS', 1))
+    # Conservar en el almacén el archivo tal como se cargó (Documento.ruta_original)
+    OPTIMIZACION_CONSERVAR_ORIGINAL = os.getenv('OPTIMIZACION_CONSERVAR_ORIGINAL', 'false').lower() in ('1', 'true', 'si')
+
     # Encriptación
     ENCRYPTION_KEY = os.getenv('ENCRYPTION_KEY', '')
 
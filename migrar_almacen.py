@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+"""
+Migración de documentos al almacén por contenido
+
+Recorre los documentos cuyo archivo sigue en las carpetas antiguas
+(uploads/<TipoDoc>_<Nombres>_<Apellidos>_<Grupo>_<Programa>/), calcula el
+SHA-256 de cada archivo y lo enlaza en el almacén (ver AlmacenService) con un
+enlace duro: no se copia ningún byte y los archivos con el mismo contenido
+quedan como uno solo. Luego actualiza ruta_archivo, sha256, mime_type y
+tamaño_bytes de cada documento.
+
+Los archivos originales se conservan salvo que se use --eliminar-originales
+(como el almacén tiene otro enlace al mismo contenido, eliminarlos solo libera
+el espacio de los duplicados). Si el almacén está en otro sistema de archivos,
+el archivo se copia.
+
+Ejecutar migrations/add_hash_documentos.sql antes.
+
+Uso:
+    python migrar_almacen.py [--simular] [--eliminar-originales]
+"""
+
+import argparse
+import io
+import os
+import shutil
+import sys
+
+# Configurar encoding para Windows
+if sys.platform == 'win32':
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+    sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
+
+# Añadir el directorio raíz al path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import create_app, db
+from app.models import Documento
+from app.services.almacen_service import AlmacenService
+from app.utils.helpers import resolver_ruta_documento
+from app.utils.ingesta import hash_archivo, EXTENSION_POR_MIME, MIME_POR_EXTENSION
+
+TAMANO_LOTE = 500
+
+def enlazar(origen, destino):
+    """Enlace duro de origen en destino (copia si no es posible)"""
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
+    try:
+        os.link(origen, destino)
+    except FileExistsError:
+        pass
+    except OSError:
+        shutil.copy2(origen, destino)
+
+def migrar(simular=False, eliminar_originales=False):
+    ids = [
+        documento_id for documento_id, ruta_archivo in
+        db.session.query(Documento.id, Documento.ruta_archivo).order_by(Documento.id)
+        if not AlmacenService.es_del_almacen(ruta_archivo)
+    ]
+    print(f"\n📁 Documentos por migrar: {len(ids)}")
+
+    migrados = faltantes = nuevos = 0
+    bytes_duplicados = 0
+    originales = set()
+    # Contenidos agregados en esta ejecución (con --simular no se crea el enlace en el almacén)
+    agregados = set()
+
+    for inicio in range(0, len(ids), TAMANO_LOTE):
+        lote = Documento.query.filter(Documento.id.in_(ids[inicio:inicio + TAMANO_LOTE])).all()
+
+        for documento in lote:
+            origen = resolver_ruta_documento(documento.ruta_archivo)
+            if not os.path.exists(origen):
+                faltantes += 1
+                print(f"   ⚠️  Documento {documento.id}: archivo no encontrado ({documento.ruta_archivo})")
+                continue
+
+            sha256, mime_type, tamano = hash_archivo(origen)
+            mime_type = mime_type or MIME_POR_EXTENSION.get((documento.extension or '').lower())
+            extension = EXTENSION_POR_MIME.get(mime_type) or (documento.extension or 'bin').lower()
+
+            ruta_archivo = AlmacenService.ruta_relativa(sha256, extension)
+            destino = resolver_ruta_documento(ruta_archivo)
+
+            if sha256 in agregados or os.path.exists(destino):
+                bytes_duplicados += tamano
+            else:
+                nuevos += 1
+                agregados.add(sha256)
+                if not simular:
+                    enlazar(origen, destino)
+
+            if not simular:
+                documento.ruta_archivo = ruta_archivo
+                documento.sha256 = sha256
+                documento.mime_type = mime_type
+                documento.tamaño_bytes = tamano
+            originales.add(origen)
+            migrados += 1
+
+        if not simular:
+            db.session.commit()
+        db.session.expunge_all()
+        print(f"   ✓ {min(inicio + TAMANO_LOTE, len(ids))} de {len(ids)} revisados")
+
+    print(f"\n✅ Documentos migrados: {migrados}")
+    print(f"   Archivos distintos agregados al almacén: {nuevos}")
+    print(f"   Contenido duplicado: {bytes_duplicados / 1024 / 1024:.1f} MB")
+    print(f"   Documentos sin archivo: {faltantes}")
+
+    if simular:
+        print("\nSimulación: no se modificó ningún archivo ni documento\n")
+        return
+
+    if eliminar_originales:
+        eliminados = 0
+        for origen in originales:
+            if os.path.exists(origen):
+                os.remove(origen)
+                eliminados += 1
+        print(f"\n🗑️  Archivos originales eliminados: {eliminados}\n")
+
+def main():
+    parser = argparse.ArgumentParser(description='Migra los documentos al almacén por contenido')
+    parser.add_argument('--simular', action='store_true', help='Solo calcula y muestra el resultado')
+    parser.add_argument('--eliminar-originales', action='store_true',
+                        help='Elimina los archivos de las carpetas antiguas al terminar')
+    argumentos = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        migrar(simular=argumentos.simular, eliminar_originales=argumentos.eliminar_originales)
+
+if __name__ == '__main__':
+    main()
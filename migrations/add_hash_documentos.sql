@@ -0,0 +1,10 @@
+-- Migración: Agregar hash y tipo de contenido a documentos
+-- Fecha: 2026-10-18
+-- Descripción: SHA-256 y tipo MIME detectado al recibir cada archivo; permiten
+-- reutilizar el archivo ya guardado cuando se vuelve a cargar el mismo contenido
+
+ALTER TABLE documentos
+ADD COLUMN sha256 CHAR(64) NULL COMMENT 'SHA-256 del contenido del archivo' AFTER extension,
+ADD COLUMN mime_type VARCHAR(100) NULL COMMENT 'Tipo MIME detectado por el contenido' AFTER sha256;
+
+CREATE INDEX ix_documentos_sha256 ON documentos (sha256);
@@ -0,0 +1,10 @@
+-- Migración: Agregar ruta del archivo original a documentos
+-- Fecha: 2026-10-18
+-- Descripción: Cuando se optimiza un documento después de cargarlo (imagen reducida o
+-- PDF recomprimido) y OPTIMIZACION_CONSERVAR_ORIGINAL está activo, guarda la ruta del
+-- archivo tal como se cargó
+
+ALTER TABLE documentos
+ADD COLUMN ruta_original VARCHAR(500) NULL COMMENT 'Archivo tal como se cargó, si se conservó al optimizarlo' AFTER mime_type;
+
+CREATE INDEX ix_documentos_ruta_original ON documentos (ruta_original);
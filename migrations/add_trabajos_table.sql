@@ -0,0 +1,30 @@
+-- Migración: Agregar tabla trabajos para la cola de trabajos en segundo plano
+-- Fecha: 2026-10-18
+-- Descripción: Registro de trabajos de generación (ZIP, PDF unificado, SOFIA, reportes) ejecutados fuera de la petición
+
+CREATE TABLE IF NOT EXISTS trabajos (
+    id VARCHAR(32) NOT NULL PRIMARY KEY COMMENT 'Identificador aleatorio (uuid hex)',
+    tipo VARCHAR(50) NOT NULL COMMENT 'Tarea registrada en TrabajoService',
+    estado ENUM('PENDIENTE', 'EN_PROCESO', 'COMPLETADO', 'ERROR') NOT NULL DEFAULT 'PENDIENTE',
+    progreso INT NOT NULL DEFAULT 0 COMMENT 'Porcentaje de avance (0-100)',
+    mensaje VARCHAR(255) NULL,
+    parametros JSON NULL COMMENT 'Parámetros de la tarea',
+    usuario_id INT NULL COMMENT 'Usuario que solicitó el trabajo',
+    ruta_resultado VARCHAR(500) NULL COMMENT 'Archivo generado',
+    nombre_descarga VARCHAR(255) NULL,
+    mimetype VARCHAR(100) NULL,
+    error TEXT NULL,
+    created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    iniciado_at DATETIME NULL,
+    finalizado_at DATETIME NULL,
+    actualizado_at DATETIME NULL COMMENT 'Última señal de vida del ejecutor',
+
+    -- Claves foráneas
+    CONSTRAINT fk_trabajos_usuario FOREIGN KEY (usuario_id) REFERENCES usuarios(id) ON DELETE SET NULL,
+
+    -- Índices
+    INDEX idx_trabajos_tipo (tipo),
+    INDEX idx_trabajos_estado (estado),
+    INDEX idx_trabajos_usuario (usuario_id),
+    INDEX idx_trabajos_created (created_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;